@@ -1,10 +1,10 @@
 from .protocol import OpCode, GamePacket
-from .room import GameRoom
+from .room import GameRoom, RoomManager
 
 __version__ = "1.0.0"
 __author__ = "Jesse Jhonz INC"
 
-__all__ = ["OpCode", "GamePacket", "GameRoom"]
+__all__ = ["OpCode", "GamePacket", "GameRoom", "RoomManager"]
 
 import logging
 logging.basicConfig(level=logging.INFO)
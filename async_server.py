@@ -0,0 +1,165 @@
+import asyncio
+import threading
+
+from outbound import OutboundStats
+from protocol import FrameDecoder, FrameError
+from server import GameServer, LISTEN_BACKLOG, make_metrics, parse_args
+from gamelog import get_logger, setup_logging, stop_logging
+
+# Frames queued for a client beyond this many bytes are dropped instead of
+# buffered, so one slow reader cannot grow server memory without bound.
+MAX_PENDING_WRITE = 256 * 1024
+WRITE_HIGH_WATER = 64 * 1024
+
+log = get_logger('async_server')
+
+
+class TransportConnection:
+    """Socket-like wrapper so GameServer can send to an asyncio transport.
+
+    Writes never block: they are appended to the transport's buffer, and once
+    that buffer is over MAX_PENDING_WRITE further frames are refused. Frames
+    written and refused are counted in ``stats``, shared by every connection.
+    """
+
+    def __init__(self, transport, max_pending=MAX_PENDING_WRITE, stats=None):
+        self.transport = transport
+        self.max_pending = max_pending
+        self.stats = stats if stats is not None else OutboundStats()
+
+    def buffered(self):
+        return self.transport.get_write_buffer_size()
+
+    def sendall(self, data, key=None):
+        # The transport buffer cannot coalesce, so ``key`` is ignored.
+        if self.transport.is_closing():
+            raise ConnectionError("connection closed")
+        if self.transport.get_write_buffer_size() > self.max_pending:
+            self.stats.record(dropped=1)
+            raise ConnectionError("send buffer full")
+        self.transport.write(data)
+        self.stats.record(frames_written=1)
+
+    def close(self):
+        self.transport.close()
+
+
+class GameProtocol(asyncio.BufferedProtocol):
+    def __init__(self, server):
+        self.server = server
+        self.decoder = FrameDecoder()
+        self.transport = None
+        self.connection = None
+        self.address = None
+        self.player_id = None
+
+    def connection_made(self, transport):
+        self.transport = transport
+        self.address = transport.get_extra_info('peername')
+        self.connection = TransportConnection(transport, stats=self.server.outbound_stats)
+        transport.set_write_buffer_limits(high=WRITE_HIGH_WATER)
+
+    def get_buffer(self, sizehint):
+        return self.decoder.get_buffer()
+
+    def buffer_updated(self, nbytes):
+        try:
+            frames = self.decoder.buffer_updated(nbytes)
+            self.player_id = self.server.dispatch_frames(self.player_id, frames, self.connection, self.address)
+        except FrameError as e:
+            log.warning("Bad frame from Cowboy %s: %s", self.player_id, e)
+            self.transport.close()
+        except Exception as e:
+            log.warning("Error from Cowboy %s: %s", self.player_id, e)
+            self.transport.close()
+
+    # Backpressure: while this client is not draining what we send it, stop
+    # reading from it so it cannot make us produce even more output.
+    def pause_writing(self):
+        self.transport.pause_reading()
+
+    def resume_writing(self):
+        if not self.transport.is_closing():
+            self.transport.resume_reading()
+
+    def eof_received(self):
+        return False
+
+    def connection_lost(self, exc):
+        if self.player_id is not None:
+            self.server.unregister_client(self.player_id)
+            self.player_id = None
+
+
+class AsyncGameServer(GameServer):
+    """GameServer driven by a single asyncio event loop instead of a thread per connection."""
+
+    def __init__(self, *args, **kwargs):
+        # Transports may only be written from the loop thread, so rooms are
+        # ticked inline rather than on a worker pool.
+        kwargs['room_workers'] = 0
+        super().__init__(*args, **kwargs)
+
+    def queue_stats(self):
+        # There are no send queues here: report the transports' write buffers.
+        totals = self.outbound_stats.totals()
+        buffered = [player['socket'].buffered() for player in self.clients.values()
+                    if hasattr(player['socket'], 'buffered')]
+        totals['live_buffer_bytes'] = sum(buffered)
+        totals['max_live_buffer_bytes'] = max(buffered, default=0)
+        return totals
+
+    async def serve(self):
+        loop = asyncio.get_running_loop()
+        server = await loop.create_server(lambda: GameProtocol(self), self.host, self.port,
+                                          reuse_address=True, backlog=LISTEN_BACKLOG)
+        log.info("🤠 Desert Arena Server (asyncio) started on %s:%s", self.host, self.port)
+        log.info("Waiting for cowboys to connect...")
+        async with server:
+            await self.tick_loop_async()
+
+    async def tick_loop_async(self):
+        loop = asyncio.get_running_loop()
+        interval = 1.0 / self.simulation_rate
+        next_tick = loop.time()
+        while self.running:
+            self.tick()
+            next_tick += interval
+            delay = next_tick - loop.time()
+            if delay > 0:
+                await asyncio.sleep(delay)
+            else:
+                next_tick = loop.time()
+                await asyncio.sleep(0)
+
+    def run(self):
+        log.info("🤠 Server is running. Press Ctrl+C to stop.")
+        try:
+            asyncio.run(self.serve())
+        except KeyboardInterrupt:
+            log.info("🤠 Server shutting down...")
+        finally:
+            self.running = False
+            log.info("📦 Wire stats: %s", self.wire_stats())
+            log.info("📦 Snapshot stats: %s", self.snapshot_stats())
+            log.info("📦 Send buffer stats: %s", self.queue_stats())
+            if self.metrics is not None:
+                log.info("%s", self.metrics.format())
+            log.info("🤠 Server stopped.")
+
+
+if __name__ == "__main__":
+    args = parse_args()
+    setup_logging(args.log_level)
+    metrics = make_metrics(args)
+    server = AsyncGameServer(host=args.host, port=args.port, tick_rate=args.tick_rate,
+                             max_room_size=args.max_room_size, metrics=metrics)
+    if metrics is not None:
+        metrics.add_gauge('send_queues', server.queue_stats)
+    if metrics is not None and args.stats_interval:
+        threading.Thread(target=metrics.dump_every, args=(args.stats_interval, lambda: server.running),
+                         daemon=True).start()
+    try:
+        server.run()
+    finally:
+        stop_logging()
@@ -0,0 +1,78 @@
+import math
+import random
+import time
+
+import numpy as np
+
+from bullets import BulletPool
+from spatial import SpatialHash
+
+BULLET_COUNTS = (50, 200, 500, 1000)
+PLAYERS = 8
+FRAMES = 200
+HIT_RADIUS = 25
+
+
+def make_players(rng):
+    return {player_id: (rng.uniform(0, 800), rng.uniform(0, 600)) for player_id in range(1, PLAYERS + 1)}
+
+
+def new_bullet(rng):
+    angle = rng.uniform(0, 2 * math.pi)
+    return rng.uniform(0, 800), rng.uniform(0, 600), math.cos(angle), math.sin(angle), rng.randint(1, PLAYERS)
+
+
+def run_dicts(bullet_count, rng):
+    # What update_bullets used to do: a list of dicts, a grid of players and list.remove.
+    players = make_players(rng)
+    grid = SpatialHash()
+    bullets = []
+    elapsed = 0.0
+    for _ in range(FRAMES):
+        while len(bullets) < bullet_count:
+            x, y, dx, dy, owner = new_bullet(rng)
+            bullets.append({'x': x, 'y': y, 'dx': dx, 'dy': dy, 'owner': owner})
+        start = time.perf_counter()
+        for player_id, (x, y) in players.items():
+            grid.move(player_id, x, y)
+        for bullet in bullets[:]:
+            bullet['x'] += bullet['dx'] * 8
+            bullet['y'] += bullet['dy'] * 8
+            stopped = False
+            for player_id in grid.query_radius(bullet['x'], bullet['y'], HIT_RADIUS):
+                if player_id != bullet['owner']:
+                    stopped = True
+                    break
+            if stopped or bullet['x'] < 0 or bullet['x'] > 800 or bullet['y'] < 0 or bullet['y'] > 600:
+                bullets.remove(bullet)
+        elapsed += time.perf_counter() - start
+    return elapsed / FRAMES
+
+
+def run_pool(bullet_count, rng):
+    players = make_players(rng)
+    pool = BulletPool(hit_radius=HIT_RADIUS)
+    elapsed = 0.0
+    for _ in range(FRAMES):
+        while len(pool) < bullet_count:
+            pool.spawn(*new_bullet(rng))
+        start = time.perf_counter()
+        ids = np.array(list(players), dtype=np.int64)
+        positions = np.array(list(players.values()), dtype=np.float32)
+        pool.update(ids, positions)
+        elapsed += time.perf_counter() - start
+    return elapsed / FRAMES
+
+
+def main():
+    print(f"{PLAYERS} players, {FRAMES} frames, bullets topped up every frame")
+    print(f"{'bullets':>8} {'dicts ms':>9} {'pool ms':>8} {'speedup':>8}")
+    print("=" * 36)
+    for bullet_count in BULLET_COUNTS:
+        dicts = run_dicts(bullet_count, random.Random(1))
+        pool = run_pool(bullet_count, random.Random(1))
+        print(f"{bullet_count:>8} {dicts * 1000:>9.3f} {pool * 1000:>8.3f} {dicts / pool:>7.1f}x")
+
+
+if __name__ == "__main__":
+    main()
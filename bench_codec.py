@@ -0,0 +1,44 @@
+import time
+
+from protocol import OpCode, GamePacket, Codec
+
+ITERATIONS = 200000
+
+
+def make_move(i):
+    return GamePacket(OpCode.MOVE, i % 64, {
+        'x': 100.5 + i % 600,
+        'y': 100.25 + i % 400,
+        'health': 100 - i % 100,
+        'direction': 'right' if i % 2 else 'left'
+    })
+
+
+def bench(codec):
+    packets = [make_move(i) for i in range(1000)]
+
+    start = time.perf_counter()
+    for i in range(ITERATIONS):
+        packets[i % 1000].encode(codec)
+    encode_time = time.perf_counter() - start
+
+    payloads = [packet.encode(codec) for packet in packets]
+    start = time.perf_counter()
+    for i in range(ITERATIONS):
+        GamePacket.decode(payloads[i % 1000])
+    decode_time = time.perf_counter() - start
+
+    size = sum(len(payload) for payload in payloads) / len(payloads)
+    return size, encode_time / ITERATIONS * 1e6, decode_time / ITERATIONS * 1e6
+
+
+if __name__ == "__main__":
+    print(f"MOVE packets, {ITERATIONS} iterations")
+    print("=" * 60)
+    results = {codec: bench(codec) for codec in (Codec.JSON, Codec.BINARY)}
+    for codec, (size, encode_us, decode_us) in results.items():
+        print(f"{codec:>6}: {size:6.1f} bytes  encode {encode_us:5.2f} us  decode {decode_us:5.2f} us")
+    json_result, binary_result = results[Codec.JSON], results[Codec.BINARY]
+    print(f"binary vs json: {json_result[0] / binary_result[0]:.1f}x fewer bytes, "
+          f"{json_result[1] / binary_result[1]:.1f}x faster encode, "
+          f"{json_result[2] / binary_result[2]:.1f}x faster decode")
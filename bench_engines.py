@@ -0,0 +1,152 @@
+import argparse
+import asyncio
+import os
+import socket
+import subprocess
+import sys
+import tempfile
+import time
+
+from protocol import OpCode, GamePacket, FrameDecoder, Codec
+
+SERVER_SCRIPT = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'server.py')
+CLOCK_TICKS = os.sysconf('SC_CLK_TCK')
+
+
+def server_cpu_seconds(pid):
+    with open(f'/proc/{pid}/stat') as f:
+        fields = f.read().rsplit(')', 1)[1].split()
+    return (int(fields[11]) + int(fields[12])) / CLOCK_TICKS
+
+
+def start_server(engine, port, workdir, tick_rate=0, max_room_size=None):
+    command = [sys.executable, SERVER_SCRIPT, '--engine', engine, '--port', str(port), '--tick-rate', str(tick_rate)]
+    if max_room_size is not None:
+        command += ['--max-room-size', str(max_room_size)]
+    process = subprocess.Popen(command, cwd=workdir, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+    deadline = time.time() + 10
+    while time.time() < deadline:
+        try:
+            socket.create_connection(('127.0.0.1', port), timeout=1).close()
+            return process
+        except OSError:
+            time.sleep(0.1)
+    process.kill()
+    raise RuntimeError(f"{engine} server did not start on port {port}")
+
+
+# Every simulated client joins this room, so each MOVE fans out to all the others.
+BENCH_ROOM = 'bench'
+
+
+class SimulatedClient:
+    def __init__(self):
+        self.reader = None
+        self.writer = None
+        self.player_id = None
+        self.decoder = FrameDecoder()
+        self.frames = 0
+        self.joined = asyncio.Event()
+
+    async def connect(self, port):
+        self.reader, self.writer = await asyncio.open_connection('127.0.0.1', port)
+        self.writer.write(GamePacket(OpCode.JOIN, 0, {'codecs': [Codec.BINARY], 'room_id': BENCH_ROOM}).to_frame())
+        asyncio.ensure_future(self.read_loop())
+
+    async def read_loop(self):
+        try:
+            while True:
+                data = await self.reader.read(65536)
+                if not data:
+                    break
+                frames = self.decoder.feed(data)
+                if self.player_id is None and frames:
+                    self.player_id = GamePacket.decode(frames[0]).data['assigned_id']
+                    self.joined.set()
+                self.frames += len(frames)
+        except (ConnectionError, asyncio.CancelledError):
+            pass
+
+    def send_move(self, step):
+        packet = GamePacket(OpCode.MOVE, self.player_id, {
+            'x': 100.0 + step % 600,
+            'y': 100.0 + step % 400,
+            'health': 100,
+            'direction': 'right'
+        })
+        self.writer.write(packet.to_frame(Codec.BINARY))
+
+    def close(self):
+        self.writer.close()
+
+
+async def run_load(port, client_count, duration, move_rate, pid):
+    clients = [SimulatedClient() for _ in range(client_count)]
+    for i in range(0, client_count, 50):
+        await asyncio.gather(*(client.connect(port) for client in clients[i:i + 50]))
+    await asyncio.wait_for(asyncio.gather(*(client.joined.wait() for client in clients)), 60)
+    await asyncio.sleep(1.0)
+
+    # Idle phase: every client connected, nobody moving.
+    idle_start = server_cpu_seconds(pid)
+    await asyncio.sleep(duration)
+    idle_cpu = (server_cpu_seconds(pid) - idle_start) / duration
+
+    # Load phase: move_rate MOVE packets per second spread across all clients.
+    for client in clients:
+        client.frames = 0
+    cpu_start = server_cpu_seconds(pid)
+    start = time.perf_counter()
+    interval = 1.0 / move_rate
+    step = 0
+    while time.perf_counter() - start < duration:
+        clients[step % client_count].send_move(step)
+        step += 1
+        await asyncio.sleep(max(0.0, start + step * interval - time.perf_counter()))
+    await asyncio.sleep(1.0)
+    elapsed = time.perf_counter() - start
+    load_cpu = (server_cpu_seconds(pid) - cpu_start) / elapsed
+
+    delivered = sum(client.frames for client in clients)
+    expected = step * (client_count - 1)
+    for client in clients:
+        client.close()
+    return {
+        'idle_cpu': idle_cpu,
+        'load_cpu': load_cpu,
+        'moves_sent': step,
+        'delivered_per_sec': delivered / elapsed,
+        'delivery_ratio': delivered / expected if expected else 0.0
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark threaded vs asyncio server engines")
+    parser.add_argument('--clients', type=int, nargs='+', default=[50, 200, 1000])
+    parser.add_argument('--engines', nargs='+', default=['threaded', 'asyncio'])
+    parser.add_argument('--duration', type=float, default=5.0)
+    parser.add_argument('--move-rate', type=float, default=100.0,
+                        help="total MOVE packets per second across all clients")
+    parser.add_argument('--port', type=int, default=5600)
+    parser.add_argument('--tick-rate', type=float, default=0,
+                        help="server snapshot rate; the default 0 measures raw MOVE fan-out")
+    args = parser.parse_args()
+
+    print(f"{'engine':>9} {'clients':>7} {'idle cpu':>9} {'load cpu':>9} {'frames/s':>10} {'delivered':>9}")
+    print("=" * 60)
+    with tempfile.TemporaryDirectory() as workdir:
+        for client_count in args.clients:
+            for engine in args.engines:
+                process = start_server(engine, args.port, workdir, args.tick_rate, max_room_size=client_count)
+                try:
+                    result = asyncio.run(run_load(args.port, client_count, args.duration,
+                                                  args.move_rate, process.pid))
+                finally:
+                    process.terminate()
+                    process.wait()
+                print(f"{engine:>9} {client_count:>7} {result['idle_cpu']:>8.1%} {result['load_cpu']:>8.1%} "
+                      f"{result['delivered_per_sec']:>10,.0f} {result['delivery_ratio']:>8.1%}")
+
+
+if __name__ == "__main__":
+    main()
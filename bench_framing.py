@@ -0,0 +1,47 @@
+import time
+
+from protocol import OpCode, GamePacket, FrameDecoder
+
+FRAME_COUNT = 200000
+CHUNK_SIZES = [1024, 4096, 65536]
+
+
+def build_stream(count):
+    frames = []
+    for i in range(count):
+        packet = GamePacket(OpCode.MOVE, i % 64, {
+            'x': 100 + i % 600,
+            'y': 100 + i % 400,
+            'health': 100,
+            'direction': 'right' if i % 2 else 'left'
+        })
+        frames.append(packet.to_frame())
+    return b''.join(frames)
+
+
+def bench_decode(stream, chunk_size, parse=False):
+    decoder = FrameDecoder()
+    view = memoryview(stream)
+    decoded = 0
+    start = time.perf_counter()
+    for offset in range(0, len(stream), chunk_size):
+        frames = decoder.feed(view[offset:offset + chunk_size])
+        if parse:
+            for frame in frames:
+                GamePacket.from_json(frame)
+        decoded += len(frames)
+    elapsed = time.perf_counter() - start
+    assert decoded == FRAME_COUNT
+    return decoded / elapsed
+
+
+if __name__ == "__main__":
+    print("Building stream...")
+    stream = build_stream(FRAME_COUNT)
+    print(f"{FRAME_COUNT} MOVE frames, {len(stream)} bytes ({len(stream) / FRAME_COUNT:.1f} bytes/frame)")
+    print("=" * 60)
+    for chunk_size in CHUNK_SIZES:
+        frames_per_sec = bench_decode(stream, chunk_size)
+        packets_per_sec = bench_decode(stream, chunk_size, parse=True)
+        print(f"recv chunk {chunk_size:>6}: {frames_per_sec:>12,.0f} frames/sec split, "
+              f"{packets_per_sec:>10,.0f} packets/sec parsed")
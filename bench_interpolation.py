@@ -0,0 +1,68 @@
+import random
+
+from interpolation import Interpolator
+
+FPS = 60
+SECONDS = 20
+SPEED = 200.0
+# The simulated player turns around this often.
+TURN_EVERY = 1.0
+LATENCY = 0.05
+JITTER = 0.03
+SEND_RATES = (60, 30, 20, 10)
+
+
+def true_x(t):
+    leg, into = divmod(t, TURN_EVERY)
+    return SPEED * into if int(leg) % 2 == 0 else SPEED * (TURN_EVERY - into)
+
+
+def arrivals(send_rate, rng):
+    """(arrival time, x) of every MOVE, in order, as TCP would deliver them."""
+    packets = []
+    arrived = 0.0
+    for n in range(int(SECONDS * send_rate)):
+        sent = n / send_rate
+        arrived = max(arrived, sent + LATENCY + rng.uniform(0, JITTER))
+        packets.append((arrived, true_x(sent)))
+    return packets
+
+
+def drawn_positions(packets, interpolator):
+    """x drawn each frame: the newest packet's, or the interpolator's."""
+    drawn = []
+    x = next_packet = 0
+    for frame in range(1, SECONDS * FPS):
+        now = frame / FPS
+        while next_packet < len(packets) and packets[next_packet][0] <= now:
+            arrived, x = packets[next_packet]
+            if interpolator is not None:
+                interpolator.push(1, x, 0, arrived)
+            next_packet += 1
+        if interpolator is not None and 1 in interpolator:
+            x = interpolator.sample(1, now)[0]
+        drawn.append(x)
+    return drawn
+
+
+def smoothness(drawn):
+    """Mean and worst per-frame error against a steady SPEED / FPS step."""
+    steady = SPEED / FPS
+    errors = [abs(abs(b - a) - steady) for a, b in zip(drawn[FPS:], drawn[FPS + 1:])]
+    return sum(errors) / len(errors), max(errors)
+
+
+def main():
+    print(f"{SPEED:.0f} px/s, {LATENCY * 1000:.0f} ms latency + up to {JITTER * 1000:.0f} ms jitter, "
+          f"{FPS} FPS; a steady frame step is {SPEED / FPS:.2f} px")
+    print(f"{'send Hz':>8} {'method':>13} {'mean step err':>14} {'worst step err':>15}")
+    print("=" * 53)
+    for send_rate in SEND_RATES:
+        packets = arrivals(send_rate, random.Random(send_rate))
+        for name, interpolator in (('latest', None), ('interpolated', Interpolator())):
+            mean, worst = smoothness(drawn_positions(packets, interpolator))
+            print(f"{send_rate:>8} {name:>13} {mean:>14.2f} {worst:>15.2f}")
+
+
+if __name__ == "__main__":
+    main()
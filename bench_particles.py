@@ -0,0 +1,88 @@
+import math
+import os
+import random
+import time
+
+os.environ.setdefault('SDL_VIDEODRIVER', 'dummy')
+import pygame
+
+from particles import ParticleSystem
+
+PARTICLES = 10000
+FRAMES = 120
+# Particles are given lives long enough that about PARTICLES stay alive.
+LIFE = 60
+FRAME_BUDGET_MS = 1000 / 60
+
+
+def emit_dicts(particles, amount):
+    # What the client's effects used to do: one dict per particle.
+    for _ in range(amount):
+        angle = random.uniform(0, 2 * math.pi)
+        speed = random.uniform(0.5, 2)
+        particles.append({
+            'x': random.uniform(100, 700),
+            'y': random.uniform(100, 500),
+            'vx': math.cos(angle) * speed,
+            'vy': math.sin(angle) * speed,
+            'color': (200, 0, 0),
+            'life': LIFE,
+            'size': random.randint(2, 5)
+        })
+
+
+def update_dicts(particles):
+    for particle in particles[:]:
+        particle['x'] += particle['vx']
+        particle['y'] += particle['vy']
+        particle['vy'] += 0.1
+        particle['life'] -= 1
+        if particle['life'] <= 0:
+            particles.remove(particle)
+
+
+def draw_dicts(particles, surface):
+    for particle in particles:
+        pygame.draw.circle(surface, particle['color'], (int(particle['x']), int(particle['y'])), particle['size'])
+
+
+def emit_arrays(system, amount):
+    # Same spread of spawn points, in bursts like the real effects.
+    for _ in range(amount // 20):
+        system.emit(random.uniform(100, 700), random.uniform(100, 500), 20, (200, 0, 0), LIFE,
+                    speed=(0.5, 2), size=(2, 5))
+
+
+def run(emit, update, draw, particles, surface):
+    # Start full, then top up each frame by what died, like a steady stream of effects.
+    emit(particles, PARTICLES)
+    update_ms = draw_ms = 0.0
+    for _ in range(FRAMES):
+        emit(particles, PARTICLES // LIFE)
+        start = time.perf_counter()
+        update(particles)
+        middle = time.perf_counter()
+        draw(particles, surface)
+        update_ms += (middle - start) * 1000
+        draw_ms += (time.perf_counter() - middle) * 1000
+    return update_ms / FRAMES, draw_ms / FRAMES, len(particles)
+
+
+def main():
+    pygame.init()
+    surface = pygame.Surface((800, 600))
+    print(f"{PARTICLES} particles, {FRAMES} frames, 60 FPS budget {FRAME_BUDGET_MS:.1f} ms")
+    print(f"{'engine':>10} {'update ms':>10} {'draw ms':>8} {'alive':>7} {'frame ms':>9}")
+    print("=" * 48)
+    cases = [
+        ('dicts', emit_dicts, update_dicts, lambda p, s: draw_dicts(p, s), []),
+        ('numpy', emit_arrays, lambda p: p.update(), lambda p, s: p.draw(s), ParticleSystem(seed=1))
+    ]
+    for name, emit, update, draw, particles in cases:
+        random.seed(1)
+        update_ms, draw_ms, alive = run(emit, update, draw, particles, surface)
+        print(f"{name:>10} {update_ms:>10.2f} {draw_ms:>8.2f} {alive:>7} {update_ms + draw_ms:>9.2f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,105 @@
+import time
+import tracemalloc
+from operator import itemgetter
+
+from records import PlayerRecord, RemotePlayer
+from snapshots import STATE_FIELDS, player_state
+
+COUNTS = (1000, 10000)
+ROUNDS = 50
+
+
+def server_dict(player_id):
+    # What register_client used to build, plus the movement fields a
+    # record carries now.
+    return {
+        'socket': None, 'address': ('127.0.0.1', player_id), 'codec': 'binary', 'room_id': 'arena-1',
+        'acked_tick': 0, 'x': 100, 'y': 100, 'health': 100, 'score': 0, 'total_score': 0,
+        'username': f'Player_{player_id}', 'kills': 0, 'deaths': 0, 'direction': 'right',
+        'last_seen': time.time(), 'input_seq': 0, 'move_clock': 0.0
+    }
+
+
+def server_record(player_id):
+    return PlayerRecord(address=('127.0.0.1', player_id), codec='binary', room_id='arena-1',
+                        x=100, y=100, username=f'Player_{player_id}')
+
+
+def client_dict(player_id):
+    return {'x': 400, 'y': 300, 'health': 100, 'direction': 'right'}
+
+
+def client_record(player_id):
+    return RemotePlayer()
+
+
+def bytes_per_player(make, count):
+    tracemalloc.start()
+    before = tracemalloc.get_traced_memory()[0]
+    players = {player_id: make(player_id) for player_id in range(count)}
+    after = tracemalloc.get_traced_memory()[0]
+    tracemalloc.stop()
+    return (after - before) / count, players
+
+
+def timed(loop, players):
+    start = time.perf_counter()
+    for _ in range(ROUNDS):
+        loop(players)
+    return (time.perf_counter() - start) / ROUNDS * 1000
+
+
+dict_state = itemgetter(*STATE_FIELDS)
+
+
+def snapshot_dicts(players):
+    return {player_id: dict_state(player) for player_id, player in players.items()}
+
+
+def snapshot_records(players):
+    return {player_id: player_state(player) for player_id, player in players.items()}
+
+
+def broadcast_dicts(players):
+    # The per-recipient reads in GameRoom.broadcast and send_snapshots.
+    for player in players.values():
+        player['codec'], player['socket'], player['acked_tick']
+
+
+def broadcast_records(players):
+    for player in players.values():
+        player.codec, player.socket, player.acked_tick
+
+
+def render_dicts(players):
+    # The visible-player pass of the client's draw loop.
+    for player in players.values():
+        if player['health'] > 0:
+            player['x'] - 10, player['y'] - 10
+
+
+def render_records(players):
+    for player in players.values():
+        if player.health > 0:
+            player.x - 10, player.y - 10
+
+
+def main():
+    print(f"{'players':>8} {'record':>13} {'bytes':>7} {'ms/pass':>8} {'pass':>10}")
+    print("=" * 50)
+    cases = [
+        ('server', server_dict, server_record, [('snapshot', snapshot_dicts, snapshot_records),
+                                                ('broadcast', broadcast_dicts, broadcast_records)]),
+        ('client', client_dict, client_record, [('render', render_dicts, render_records)])
+    ]
+    for count in COUNTS:
+        for side, make_dict, make_record, loops in cases:
+            dict_bytes, dicts = bytes_per_player(make_dict, count)
+            record_bytes, records = bytes_per_player(make_record, count)
+            for name, dict_loop, record_loop in loops:
+                print(f"{count:>8} {side + ' dict':>13} {dict_bytes:>7.0f} {timed(dict_loop, dicts):>8.3f} {name:>10}")
+                print(f"{count:>8} {side + ' slot':>13} {record_bytes:>7.0f} {timed(record_loop, records):>8.3f} {name:>10}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,65 @@
+import random
+
+from protocol import Codec
+from snapshots import SnapshotHistory, build_snapshot_packet, apply_snapshot
+
+PLAYER_COUNTS = [8, 32, 64]
+TICKS = 600
+# Fraction of players that move on a given tick and chance of a health change.
+MOVING_FRACTION = 0.4
+HIT_CHANCE = 0.01
+# Ticks between a snapshot being sent and its ACK reaching the server.
+ACK_LAG = 3
+
+
+def simulate(player_count, codec, seed=1):
+    rng = random.Random(seed)
+    state = {
+        player_id: (float(rng.randint(100, 700)), float(rng.randint(100, 500)), 100, 'right', 0)
+        for player_id in range(1, player_count + 1)
+    }
+    history = SnapshotHistory()
+    client_history = SnapshotHistory()
+    client_state = {}
+    pending_acks = []
+    acked_tick = 0
+    full_bytes = delta_bytes = 0
+
+    for tick in range(1, TICKS + 1):
+        for player_id, (x, y, health, direction, input_seq) in list(state.items()):
+            if rng.random() < MOVING_FRACTION:
+                input_seq += 2
+                x = max(50.0, min(750.0, x + rng.uniform(-4, 4)))
+                y = max(50.0, min(550.0, y + rng.uniform(-4, 4)))
+                direction = 'right' if rng.random() < 0.5 else direction
+            if rng.random() < HIT_CHANCE:
+                health = max(0, health - 10)
+            state[player_id] = (x, y, health, direction, input_seq)
+        current = dict(state)
+        history.add(tick, current)
+
+        full_bytes += len(build_snapshot_packet(tick, current).to_frame(codec))
+        baseline = history.get(acked_tick) if acked_tick else None
+        packet = build_snapshot_packet(tick, current, acked_tick, baseline)
+        delta_bytes += len(packet.to_frame(codec))
+
+        # Client side: rebuild from its own copy of the baseline and ack.
+        client_baseline = client_history.get(packet.data['baseline']) if packet.data['baseline'] else {}
+        client_state = apply_snapshot(client_baseline, packet.data)
+        client_history.add(tick, client_state)
+        assert client_state == current
+        pending_acks.append((tick + ACK_LAG, tick))
+        while pending_acks and pending_acks[0][0] <= tick:
+            acked_tick = pending_acks.pop(0)[1]
+
+    return full_bytes / TICKS, delta_bytes / TICKS
+
+
+if __name__ == "__main__":
+    print(f"{TICKS} ticks, {MOVING_FRACTION:.0%} of players moving per tick, ack lag {ACK_LAG} ticks")
+    print("=" * 60)
+    for codec in (Codec.BINARY, Codec.JSON):
+        for player_count in PLAYER_COUNTS:
+            full, delta = simulate(player_count, codec)
+            print(f"{codec:>6} {player_count:>3} players: full {full:8.0f} B/tick  delta {delta:8.0f} B/tick  "
+                  f"saved {1 - delta / full:6.1%}")
@@ -0,0 +1,83 @@
+import math
+import random
+import time
+
+from spatial import SpatialHash
+
+PLAYERS = 100
+BULLETS = 2000
+FRAMES = 120
+WORLD_WIDTH, WORLD_HEIGHT = 800, 600
+HIT_RADIUS = 25
+
+
+def make_world(seed=1):
+    rng = random.Random(seed)
+    players = {player_id: [rng.uniform(0, WORLD_WIDTH), rng.uniform(0, WORLD_HEIGHT)]
+               for player_id in range(1, PLAYERS + 1)}
+    bullets = []
+    for _ in range(BULLETS):
+        angle = rng.uniform(0, 2 * math.pi)
+        bullets.append([rng.uniform(0, WORLD_WIDTH), rng.uniform(0, WORLD_HEIGHT), math.cos(angle), math.sin(angle)])
+    return rng, players, bullets
+
+
+def step(rng, players, bullets):
+    for position in players.values():
+        position[0] = min(WORLD_WIDTH, max(0.0, position[0] + rng.uniform(-4, 4)))
+        position[1] = min(WORLD_HEIGHT, max(0.0, position[1] + rng.uniform(-4, 4)))
+    for bullet in bullets:
+        bullet[0] = (bullet[0] + bullet[2] * 8) % WORLD_WIDTH
+        bullet[1] = (bullet[1] + bullet[3] * 8) % WORLD_HEIGHT
+
+
+def brute_force(players, bullets):
+    # What update_bullets used to do: every bullet against every player with sqrt.
+    hits = 0
+    for x, y, _, _ in bullets:
+        for px, py in players.values():
+            if math.sqrt((x - px) ** 2 + (y - py) ** 2) < HIT_RADIUS:
+                hits += 1
+    return hits
+
+
+def make_grid_check(cell_size):
+    grid = SpatialHash(cell_size)
+
+    def grid_check(players, bullets):
+        for player_id, (px, py) in players.items():
+            grid.move(player_id, px, py)
+        hits = 0
+        for x, y, _, _ in bullets:
+            hits += len(grid.query_radius(x, y, HIT_RADIUS))
+        return hits
+
+    return grid_check
+
+
+def run(check):
+    rng, players, bullets = make_world()
+    hits = 0
+    elapsed = 0.0
+    for _ in range(FRAMES):
+        step(rng, players, bullets)
+        start = time.perf_counter()
+        hits += check(players, bullets)
+        elapsed += time.perf_counter() - start
+    return elapsed / FRAMES, hits
+
+
+def main():
+    print(f"{PLAYERS} players, {BULLETS} bullets, {FRAMES} frames, hit radius {HIT_RADIUS}")
+    print(f"{'method':>16} {'ms/frame':>9} {'hits':>7} {'speedup':>8}")
+    print("=" * 44)
+    baseline, expected = run(brute_force)
+    print(f"{'brute force':>16} {baseline * 1000:>9.2f} {expected:>7} {1.0:>7.1f}x")
+    for cell_size in (25, 50, 100, 200):
+        per_frame, hits = run(make_grid_check(cell_size))
+        assert hits == expected
+        print(f"{f'grid {cell_size}px':>16} {per_frame * 1000:>9.2f} {hits:>7} {baseline / per_frame:>7.1f}x")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,102 @@
+import math
+import os
+import random
+import time
+
+os.environ.setdefault('SDL_VIDEODRIVER', 'dummy')
+import pygame
+
+from sprites import SpriteCache, PLAYER_SPRITE_SIZE, BULLET_SPRITE_SIZE
+
+PLAYERS = 8
+BULLETS = 300
+FRAMES = 120
+COLORS = {'body': (255, 100, 100), 'hat': (100, 200, 100), 'gun': (150, 150, 150)}
+
+
+def draw_player_calls(screen, font, x, y, player_id, facing):
+    # What draw_player used to do for every player every frame.
+    pygame.draw.circle(screen, (50, 50, 50, 150), (int(x + 3), int(y + 3)), 15)
+    pygame.draw.circle(screen, COLORS['body'], (int(x), int(y)), 15)
+    pygame.draw.polygon(screen, COLORS['hat'], [(x - 15, y - 10), (x + 15, y - 10), (x + 12, y - 25), (x - 12, y - 25)])
+    pygame.draw.rect(screen, (80, 80, 80), (x - 18, y - 12, 36, 4))
+    pygame.draw.circle(screen, (255, 220, 180), (int(x), int(y - 5)), 8)
+    pygame.draw.circle(screen, (50, 50, 100), (int(x + 3 * facing), int(y - 5)), 3)
+    pygame.draw.circle(screen, (50, 50, 100), (int(x + 8 * facing), int(y - 7)), 2)
+    pygame.draw.line(screen, COLORS['gun'], (x, y - 5), (x + 25 * facing, y - 5), 5)
+    pygame.draw.rect(screen, (100, 70, 30), (x - 3, y - 8, 6, 10))
+    if player_id == 1:
+        glow_surf = pygame.Surface((40, 40), pygame.SRCALPHA)
+        pygame.draw.circle(glow_surf, (255, 255, 255, 50), (20, 20), 15 + abs(math.sin(time.time() * 3)) * 10)
+        screen.blit(glow_surf, (x - 20, y - 20))
+    label = font.render(f"Cowboy {player_id}", True, (255, 255, 200))
+    screen.blit(label, (x - label.get_width() // 2, y - 45))
+
+
+def draw_bullet_calls(screen, x, y, dx, dy):
+    for i in range(10):
+        pygame.draw.circle(screen, (255, 255, 100, int(255 * (1 - i / 10))),
+                           (int(x - dx * i * 2), int(y - dy * i * 2)), 2)
+    pygame.draw.circle(screen, (255, 255, 0), (int(x), int(y)), 3)
+    pygame.draw.circle(screen, (255, 200, 0), (int(x), int(y)), 2)
+
+
+def draw_player_sprites(screen, sprites, x, y, player_id, facing):
+    half = PLAYER_SPRITE_SIZE // 2
+    screen.blit(sprites.player(COLORS, 'right' if facing > 0 else 'left'), (x - half, y - half))
+    if player_id == 1:
+        screen.blit(sprites.glow(abs(math.sin(time.time() * 3)) * 10), (x - 20, y - 20))
+    label = sprites.label(f"Cowboy {player_id}", (255, 255, 200))
+    screen.blit(label, (x - label.get_width() // 2, y - 45))
+
+
+def draw_bullet_sprites(screen, sprites, x, y, dx, dy):
+    half = BULLET_SPRITE_SIZE // 2
+    screen.blit(sprites.bullet(dx, dy), (x - half, y - half))
+
+
+def make_scene(rng):
+    players = [(rng.uniform(50, 750), rng.uniform(50, 550), player_id, rng.choice((-1, 1)))
+               for player_id in range(1, PLAYERS + 1)]
+    bullets = []
+    for _ in range(BULLETS):
+        angle = rng.uniform(0, 2 * math.pi)
+        bullets.append((rng.uniform(0, 800), rng.uniform(0, 600), math.cos(angle), math.sin(angle)))
+    return players, bullets
+
+
+def run(draw_player, draw_bullet, screen):
+    players, bullets = make_scene(random.Random(1))
+    player_ms = bullet_ms = 0.0
+    for _ in range(FRAMES):
+        start = time.perf_counter()
+        for player in players:
+            draw_player(screen, *player)
+        middle = time.perf_counter()
+        for bullet in bullets:
+            draw_bullet(screen, *bullet)
+        player_ms += (middle - start) * 1000
+        bullet_ms += (time.perf_counter() - middle) * 1000
+    return player_ms / FRAMES, bullet_ms / FRAMES
+
+
+def main():
+    pygame.init()
+    screen = pygame.Surface((800, 600))
+    font = pygame.font.Font(None, 18)
+    sprites = SpriteCache(font)
+    print(f"{PLAYERS} players, {BULLETS} bullets, {FRAMES} frames")
+    print(f"{'method':>12} {'players ms':>11} {'bullets ms':>11}")
+    print("=" * 36)
+    cases = [
+        ('draw calls', lambda s, *p: draw_player_calls(s, font, *p), draw_bullet_calls),
+        ('sprites', lambda s, *p: draw_player_sprites(s, sprites, *p),
+         lambda s, *b: draw_bullet_sprites(s, sprites, *b))
+    ]
+    for name, draw_player, draw_bullet in cases:
+        player_ms, bullet_ms = run(draw_player, draw_bullet, screen)
+        print(f"{name:>12} {player_ms:>11.3f} {bullet_ms:>11.3f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,72 @@
+import os
+import time
+
+os.environ.setdefault('SDL_VIDEODRIVER', 'dummy')
+import pygame
+
+from textcache import TextCache
+
+PLAYERS = 8
+FRAMES = 300
+# A new bounty every this many frames (a kill a second at 60 FPS).
+SCORE_EVERY = 60
+
+
+def frame_strings(fonts, frame):
+    """The (font, text, color) the client draws in one connected frame."""
+    large, medium, small, tiny = fonts
+    score = frame // SCORE_EVERY * 100
+    strings = [
+        (large, f"Players: {PLAYERS}", (255, 255, 255)),
+        (medium, f"BOUNTY: ${score}", (50, 30, 10)),
+        (small, f"ELIMINATIONS: {score // 100}", (200, 50, 50)),
+        (small, "COWBOY #1", (255, 255, 200)),
+        (small, f"PLAYERS: {PLAYERS}", (200, 200, 200)),
+        (tiny, "READY", (255, 255, 200)),
+        (tiny, "YOU", (255, 255, 255)),
+        (tiny, "Your pos: (400, 300) HP: 100", (255, 255, 255))
+    ]
+    for text in ("WASD: MOVE", "MOUSE: AIM", "CLICK: SHOOT", "R: RESPAWN"):
+        strings.append((tiny, text, (255, 255, 200)))
+    for player_id in range(2, PLAYERS + 1):
+        strings.append((tiny, f"Cowboy {player_id}", (255, 255, 200)))
+        strings.append((tiny, f"Player {player_id}: ({100 * player_id}, 300) HP: 100", (255, 255, 255)))
+    return strings
+
+
+def render_every_frame(screen, fonts):
+    # What the client used to do: render each string, and build the life
+    # bar's font, every frame.
+    for frame in range(FRAMES):
+        hp_font = pygame.font.Font(None, 24)
+        screen.blit(hp_font.render("HP: 100/100", True, (255, 255, 255)), (20, 45))
+        for font, text, color in frame_strings(fonts, frame):
+            screen.blit(font.render(text, True, color), (10, 10))
+
+
+def render_cached(screen, fonts):
+    text_cache = TextCache()
+    for frame in range(FRAMES):
+        screen.blit(text_cache.render(fonts[2], "HP: 100/100", (255, 255, 255)), (20, 45))
+        for font, text, color in frame_strings(fonts, frame):
+            screen.blit(text_cache.render(font, text, color), (10, 10))
+    return text_cache
+
+
+def main():
+    pygame.init()
+    screen = pygame.Surface((800, 600))
+    fonts = [pygame.font.Font(None, size) for size in (48, 32, 24, 18)]
+    print(f"{PLAYERS} players, {FRAMES} frames, {len(frame_strings(fonts, 0)) + 1} strings per frame")
+    print(f"{'method':>14} {'ms/frame':>9} {'rendered':>9}")
+    print("=" * 34)
+    for name, run in (('render', render_every_frame), ('text cache', render_cached)):
+        start = time.perf_counter()
+        text_cache = run(screen, fonts)
+        ms = (time.perf_counter() - start) * 1000 / FRAMES
+        rendered = text_cache.misses if text_cache else FRAMES * (len(frame_strings(fonts, 0)) + 1)
+        print(f"{name:>14} {ms:>9.3f} {rendered:>9}")
+
+
+if __name__ == "__main__":
+    main()
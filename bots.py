@@ -0,0 +1,385 @@
+import argparse
+import asyncio
+import math
+import random
+import tempfile
+import time
+from collections import deque
+
+from movement import InputCoalescer, Predictor, MIN_X, MAX_X, MIN_Y, MAX_Y
+from protocol import OpCode, GamePacket, FrameDecoder, FrameError, Codec
+from snapshots import SnapshotHistory, apply_snapshot
+from server import HOST, PORT
+
+RESPAWN_DELAY = 1.0
+# Recent positions remembered per bot for matching them up in other bots' snapshots.
+MOVE_MEMORY = 64
+CONNECT_BATCH = 50
+
+
+def percentile(samples, q):
+    if not samples:
+        return 0.0
+    ordered = sorted(samples)
+    return ordered[min(len(ordered) - 1, int(q * len(ordered)))]
+
+
+class BotStats:
+    """Counters and latency samples shared by every bot in the harness."""
+
+    def __init__(self):
+        self.packets_sent = 0
+        self.frames_received = 0
+        self.bytes_received = 0
+        self.invalid_packets = 0
+        self.bad_frames = 0
+        self.join_errors = 0
+        self.disconnects = 0
+        self.attacks_sent = 0
+        self.bullets_echoed = 0
+        self.respawns = 0
+        # INPUT sent -> its position seen in another bot's SNAPSHOT (or MOVE).
+        self.move_latency = []
+        # ATTACK sent -> own BULLET broadcast received back.
+        self.attack_latency = []
+
+    def reset(self):
+        self.__init__()
+
+
+def position_key(x, y):
+    # Positions come back through float32 in the binary codec.
+    return round(x, 1), round(y, 1)
+
+
+class Bot(asyncio.Protocol):
+    """One scripted cowboy: wanders, shoots at whoever it can see and respawns.
+
+    It moves the way the pygame client does: sequenced INPUTs predicted with
+    a Predictor, sent through an InputCoalescer and reconciled against the
+    input_seq in each snapshot.
+    """
+
+    def __init__(self, harness, bot_number):
+        self.harness = harness
+        self.stats = harness.stats
+        self.rng = random.Random(bot_number)
+        self.transport = None
+        self.decoder = FrameDecoder()
+        self.player_id = None
+        self.codec = Codec.JSON
+        self.joined = asyncio.get_running_loop().create_future()
+        self.closed = False
+        self.predictor = Predictor()
+        self.input_coalescer = InputCoalescer()
+        self.health = 100
+        self.move_x = self.move_y = 0
+        self.pick_heading()
+        self.direction = self.sent_direction = 'right'
+        self.snapshot_history = SnapshotHistory()
+        self.last_snapshot_tick = 0
+        self.others = {}
+        self.sent_moves = {}
+        self.move_order = deque()
+        self.pending_attacks = deque()
+        self.respawn_at = None
+
+    def connection_made(self, transport):
+        self.transport = transport
+        self.send(OpCode.JOIN, {'codecs': [Codec.BINARY]}, Codec.JSON)
+
+    def connection_lost(self, exc):
+        self.closed = True
+        if self.player_id is not None:
+            self.harness.bots.pop(self.player_id, None)
+        if not self.joined.done():
+            self.joined.set_result(False)
+
+    def data_received(self, data):
+        self.stats.bytes_received += len(data)
+        try:
+            frames = self.decoder.feed(data)
+        except FrameError:
+            self.stats.bad_frames += 1
+            self.transport.close()
+            return
+        now = time.perf_counter()
+        for frame in frames:
+            self.stats.frames_received += 1
+            packet = GamePacket.decode(frame)
+            if packet is None:
+                self.stats.invalid_packets += 1
+            else:
+                self.handle_packet(packet, now)
+
+    def send(self, op_code, data, codec=None):
+        if self.closed:
+            return
+        packet = GamePacket(op_code, self.player_id or 0, data)
+        if self.harness.trace:
+            packet.seq, packet.ts = self.stats.packets_sent, time.time()
+        self.transport.write(packet.to_frame(codec or self.codec))
+        self.stats.packets_sent += 1
+
+    def handle_packet(self, packet, now):
+        if packet.op_code == OpCode.JOIN:
+            if 'error' in packet.data:
+                self.stats.join_errors += 1
+                self.transport.close()
+                return
+            self.player_id = packet.data['assigned_id']
+            self.codec = packet.data.get('codec', Codec.JSON)
+            self.predictor.reset(packet.data['spawn_x'], packet.data['spawn_y'])
+            self.harness.bots[self.player_id] = self
+            self.joined.set_result(True)
+
+        elif packet.op_code == OpCode.SNAPSHOT:
+            baseline_tick = packet.data.get('baseline', 0)
+            baseline = self.snapshot_history.get(baseline_tick) if baseline_tick else {}
+            if baseline is None:
+                return
+            tick = packet.data['tick']
+            state = apply_snapshot(baseline, packet.data)
+            self.snapshot_history.add(tick, state)
+            self.last_snapshot_tick = max(self.last_snapshot_tick, tick)
+            self.send(OpCode.ACK, {'tick': tick})
+            if self.player_id in state:
+                x, y, _, _, input_seq = state[self.player_id]
+                self.predictor.reconcile(x, y, input_seq)
+            for player_id, x, y, *_ in packet.data.get('players', []):
+                if player_id != self.player_id and x is not None and y is not None:
+                    self.observe_move(player_id, x, y, now)
+            # The state is also the next delta's baseline: leave it whole.
+            self.others = {player_id: fields for player_id, fields in state.items() if player_id != self.player_id}
+
+        elif packet.op_code == OpCode.MOVE:
+            # Immediate forwarding (--tick-rate 0) and join snapshots.
+            data = packet.data
+            if packet.sender_id == self.player_id:
+                # A correction: the server moved us somewhere else.
+                self.predictor.reconcile(data['x'], data['y'], data.get('input_seq', 0))
+                return
+            self.others[packet.sender_id] = (data['x'], data['y'], data['health'], data['direction'])
+            self.observe_move(packet.sender_id, data['x'], data['y'], now)
+
+        elif packet.op_code == OpCode.BULLET:
+            if packet.sender_id == self.player_id and self.pending_attacks:
+                self.stats.attack_latency.append(now - self.pending_attacks.popleft())
+                self.stats.bullets_echoed += 1
+
+        elif packet.op_code == OpCode.HIT:
+            if packet.data.get('target_id') == self.player_id:
+                self.health = max(0, self.health - packet.data.get('damage', 10))
+                if self.health <= 0 and self.respawn_at is None:
+                    self.respawn_at = now + RESPAWN_DELAY
+
+        elif packet.op_code == OpCode.RESPAWN:
+            if packet.sender_id == self.player_id:
+                self.health = 100
+                self.predictor.reset(packet.data['x'], packet.data['y'])
+                self.respawn_at = None
+                self.stats.respawns += 1
+
+    def observe_move(self, player_id, x, y, now):
+        sender = self.harness.bots.get(player_id)
+        if sender is None:
+            return
+        sent_at = sender.sent_moves.get(position_key(x, y))
+        if sent_at is not None:
+            self.stats.move_latency.append(now - sent_at)
+
+    def step(self, dt, fire_chance):
+        if self.player_id is None or self.closed:
+            return
+        now = time.perf_counter()
+        if self.health <= 0:
+            if self.respawn_at is not None and now >= self.respawn_at:
+                self.send(OpCode.RESPAWN, {})
+                # Try again later if the RESPAWN is refused.
+                self.respawn_at = now + RESPAWN_DELAY
+            return
+
+        if self.rng.random() < 0.05:
+            self.pick_heading()
+        dt_ms = round(dt * 1000)
+        seq, x, y = self.predictor.apply(self.move_x, self.move_y, dt_ms)
+        self.input_coalescer.add(seq, self.move_x, self.move_y, dt_ms)
+        # Turn around at the walls.
+        if (x, self.move_x) in ((MIN_X, -1), (MAX_X, 1)):
+            self.move_x = -self.move_x
+        if (y, self.move_y) in ((MIN_Y, -1), (MAX_Y, 1)):
+            self.move_y = -self.move_y
+        if self.move_x:
+            self.direction = 'right' if self.move_x > 0 else 'left'
+        self.send_inputs(now)
+
+        if self.others and self.rng.random() < fire_chance:
+            target_x, target_y, *_ = self.others[self.rng.choice(list(self.others))]
+            dx, dy = target_x - x, target_y - y
+            distance = max(0.1, math.hypot(dx, dy))
+            self.pending_attacks.append(now)
+            self.stats.attacks_sent += 1
+            self.send(OpCode.ATTACK, {
+                'dx': dx / distance,
+                'dy': dy / distance,
+                'tick': self.last_snapshot_tick
+            })
+
+    def pick_heading(self):
+        # One of the eight directions the client's keys allow.
+        move_x = move_y = 0
+        while not (move_x or move_y):
+            move_x, move_y = self.rng.choice((-1, 0, 1)), self.rng.choice((-1, 0, 1))
+        self.move_x, self.move_y = move_x, move_y
+
+    def send_inputs(self, now):
+        if not self.input_coalescer.due(now, self.direction != self.sent_direction):
+            return
+        inputs = self.input_coalescer.take(now)
+        if not inputs:
+            return
+        self.sent_direction = self.direction
+        self.remember_move(now)
+        for seq, move_x, move_y, dt_ms in inputs:
+            self.send(OpCode.INPUT, {
+                'seq': seq,
+                'move_x': move_x,
+                'move_y': move_y,
+                'dt_ms': dt_ms,
+                'direction': self.direction
+            })
+
+    def remember_move(self, now):
+        key = position_key(*self.predictor.position())
+        if key not in self.sent_moves:
+            self.move_order.append(key)
+            if len(self.move_order) > MOVE_MEMORY:
+                self.sent_moves.pop(self.move_order.popleft(), None)
+        self.sent_moves[key] = now
+
+    def close(self):
+        if self.transport is not None and not self.closed:
+            self.transport.close()
+
+
+class BotHarness:
+    def __init__(self, host=HOST, port=PORT, bot_count=200, move_rate=20.0, fire_rate=1.0, trace=False):
+        self.host = host
+        # Stamp packets with seq/ts for a server running with --trace.
+        self.trace = trace
+        self.port = port
+        self.bot_count = bot_count
+        self.move_rate = move_rate
+        self.fire_rate = fire_rate
+        self.stats = BotStats()
+        # Joined bots by player id, so a bot can find who sent a position.
+        self.bots = {}
+        self.all_bots = []
+
+    async def connect(self):
+        loop = asyncio.get_running_loop()
+        for start in range(0, self.bot_count, CONNECT_BATCH):
+            batch = range(start, min(self.bot_count, start + CONNECT_BATCH))
+            results = await asyncio.gather(
+                *(loop.create_connection(lambda n=n: Bot(self, n), self.host, self.port) for n in batch),
+                return_exceptions=True)
+            for result in results:
+                if isinstance(result, Exception):
+                    self.stats.disconnects += 1
+                else:
+                    self.all_bots.append(result[1])
+        await asyncio.wait_for(asyncio.gather(*(bot.joined for bot in self.all_bots)), 60)
+
+    async def drive(self, bot, duration):
+        interval = 1.0 / self.move_rate
+        fire_chance = self.fire_rate * interval
+        # Spread bots over the interval so they do not all send at once.
+        await asyncio.sleep(bot.rng.uniform(0, interval))
+        end = time.perf_counter() + duration
+        next_step = time.perf_counter()
+        while time.perf_counter() < end and not bot.closed:
+            bot.step(interval, fire_chance)
+            next_step += interval
+            await asyncio.sleep(max(0.0, next_step - time.perf_counter()))
+
+    async def run(self, duration, warmup=1.0):
+        await self.connect()
+        joined = sum(1 for bot in self.all_bots if bot.player_id is not None)
+        await asyncio.sleep(warmup)
+        self.stats.reset()
+        start = time.perf_counter()
+        await asyncio.gather(*(self.drive(bot, duration) for bot in self.all_bots))
+        # Let in-flight broadcasts land before counting.
+        await asyncio.sleep(0.5)
+        elapsed = time.perf_counter() - start
+        self.stats.disconnects += sum(1 for bot in self.all_bots if bot.closed)
+        for bot in self.all_bots:
+            bot.close()
+        return self.report(joined, elapsed)
+
+    def report(self, joined, elapsed):
+        stats = self.stats
+        return {
+            'bots': self.bot_count,
+            'joined': joined,
+            'sent_per_sec': stats.packets_sent / elapsed,
+            'received_per_sec': stats.frames_received / elapsed,
+            'received_bytes_per_sec': stats.bytes_received / elapsed,
+            'move_p50_ms': percentile(stats.move_latency, 0.50) * 1000,
+            'move_p99_ms': percentile(stats.move_latency, 0.99) * 1000,
+            'attack_p50_ms': percentile(stats.attack_latency, 0.50) * 1000,
+            'attack_p99_ms': percentile(stats.attack_latency, 0.99) * 1000,
+            'bullets_missing': stats.attacks_sent - stats.bullets_echoed,
+            'invalid_packets': stats.invalid_packets,
+            'bad_frames': stats.bad_frames,
+            'join_errors': stats.join_errors,
+            'disconnects': stats.disconnects,
+            'respawns': stats.respawns,
+            'corrections': sum(bot.predictor.corrections for bot in self.all_bots)
+        }
+
+
+def print_report(result):
+    print(f"🤖 {result['joined']}/{result['bots']} bots joined")
+    print(f"📤 Sent:     {result['sent_per_sec']:,.0f} packets/s")
+    print(f"📥 Received: {result['received_per_sec']:,.0f} frames/s "
+          f"({result['received_bytes_per_sec'] / 1024:,.0f} KiB/s)")
+    print(f"⏱️  INPUT -> other bots:  p50 {result['move_p50_ms']:.1f} ms  p99 {result['move_p99_ms']:.1f} ms")
+    print(f"⏱️  ATTACK -> BULLET echo: p50 {result['attack_p50_ms']:.1f} ms  p99 {result['attack_p99_ms']:.1f} ms")
+    print(f"❌ Dropped: {result['bullets_missing']} bullets never echoed, {result['disconnects']} disconnects, "
+          f"{result['join_errors']} join errors")
+    print(f"❌ Invalid: {result['invalid_packets']} packets, {result['bad_frames']} bad frames")
+    print(f"🔄 Respawns: {result['respawns']}, position corrections: {result['corrections']}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Headless bots for Desert Arena load testing")
+    parser.add_argument('--host', default=HOST)
+    parser.add_argument('--port', type=int, default=PORT)
+    parser.add_argument('--bots', type=int, default=200)
+    parser.add_argument('--duration', type=float, default=10.0)
+    parser.add_argument('--move-rate', type=float, default=20.0,
+                        help="movement steps per second per bot; INPUTs go out at most movement.SEND_RATE a second")
+    parser.add_argument('--fire-rate', type=float, default=1.0, help="shots per second per bot")
+    parser.add_argument('--spawn', choices=['threaded', 'asyncio'],
+                        help="start a local server with this engine instead of using a running one")
+    parser.add_argument('--trace', action='store_true', help="stamp packets with seq/ts for server --trace")
+    args = parser.parse_args()
+
+    harness = BotHarness(args.host, args.port, args.bots, args.move_rate, args.fire_rate, args.trace)
+    if args.spawn is None:
+        print_report(asyncio.run(harness.run(args.duration)))
+        return
+
+    from bench_engines import start_server
+    with tempfile.TemporaryDirectory() as workdir:
+        process = start_server(args.spawn, args.port, workdir, tick_rate=30)
+        try:
+            print_report(asyncio.run(harness.run(args.duration)))
+        finally:
+            process.terminate()
+            process.wait()
+
+
+if __name__ == "__main__":
+    main()
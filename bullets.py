@@ -0,0 +1,102 @@
+import threading
+
+import numpy as np
+
+# Most bullets in flight at once; spawns past this are dropped.
+MAX_BULLETS = 2048
+# Pixels a bullet moves per frame (480 px/s at 60 FPS, like the server).
+BULLET_STEP = 8.0
+WORLD_WIDTH, WORLD_HEIGHT = 800, 600
+# Distance at which a bullet stops at a player.
+HIT_RADIUS = 25
+NO_OWNER = -1
+
+
+class BulletPool:
+    """Fixed-capacity bullets in NumPy arrays, moved and culled in batches.
+
+    Live bullets fill the first ``count`` slots. ``update`` steps all of
+    them at once, tests them against every player position with one
+    bullets-by-players distance matrix, and swap-removes the ones that left
+    the arena, reached a player or were marked spent. BULLET and HIT packets
+    arrive on the receive thread, so every method takes the lock.
+    """
+
+    def __init__(self, capacity=MAX_BULLETS, step=BULLET_STEP, hit_radius=HIT_RADIUS):
+        self.capacity = capacity
+        self.step = step
+        self.hit_radius = hit_radius
+        self.count = 0
+        self.position = np.zeros((capacity, 2), dtype=np.float32)
+        self.direction = np.zeros((capacity, 2), dtype=np.float32)
+        self.owner = np.full(capacity, NO_OWNER, dtype=np.int64)
+        self.spent = np.zeros(capacity, dtype=bool)
+        self.lock = threading.Lock()
+
+    def __len__(self):
+        return self.count
+
+    def spawn(self, x, y, dx, dy, owner):
+        with self.lock:
+            index = self.count
+            if index >= self.capacity:
+                return
+            self.position[index] = (x, y)
+            self.direction[index] = (dx, dy)
+            self.owner[index] = owner if owner is not None else NO_OWNER
+            self.spent[index] = False
+            self.count = index + 1
+
+    def mark_spent_near(self, owner, x, y, within):
+        """Mark ``owner``'s bullet closest to (x, y), if any is ``within`` px, as spent."""
+        with self.lock:
+            count = self.count
+            if not count:
+                return
+            offsets = self.position[:count] - (x, y)
+            distance_sq = np.einsum('ij,ij->i', offsets, offsets)
+            distance_sq[(self.owner[:count] != owner) | self.spent[:count]] = np.inf
+            closest = int(np.argmin(distance_sq))
+            if distance_sq[closest] < within * within:
+                self.spent[closest] = True
+
+    def update(self, player_ids, player_positions):
+        """Move every bullet one frame and drop those that are done.
+
+        ``player_positions`` is an (n, 2) array of living players and
+        ``player_ids`` their ids; a bullet never stops at its own shooter.
+        """
+        with self.lock:
+            count = self.count
+            if not count:
+                return
+            position = self.position[:count]
+            position += self.direction[:count] * self.step
+
+            done = self.spent[:count].copy()
+            done |= (position[:, 0] < 0) | (position[:, 0] > WORLD_WIDTH)
+            done |= (position[:, 1] < 0) | (position[:, 1] > WORLD_HEIGHT)
+            if len(player_ids):
+                offsets = position[:, None, :] - player_positions[None, :, :]
+                distance_sq = np.einsum('ijk,ijk->ij', offsets, offsets)
+                reached = distance_sq < self.hit_radius * self.hit_radius
+                reached &= self.owner[:count, None] != player_ids[None, :]
+                done |= reached.any(axis=1)
+
+            dead = np.flatnonzero(done)
+            if not len(dead):
+                return
+            alive = count - len(dead)
+            holes = dead[dead < alive]
+            if len(holes):
+                movers = np.arange(alive, count)[~done[alive:]]
+                for array in (self.position, self.direction, self.owner, self.spent):
+                    array[holes] = array[movers]
+            self.count = alive
+
+    def snapshot(self):
+        """(x, y, dx, dy) lists of the bullets in flight, for drawing."""
+        with self.lock:
+            count = self.count
+            return (self.position[:count, 0].tolist(), self.position[:count, 1].tolist(),
+                    self.direction[:count, 0].tolist(), self.direction[:count, 1].tolist())
@@ -0,0 +1,61 @@
+import socket
+import threading
+import time
+
+import pytest
+
+from protocol import Codec
+from records import PlayerRecord
+
+
+class FakeSocket:
+    def __init__(self):
+        self.sent = []
+
+    def sendall(self, data, key=None):
+        self.sent.append(data)
+
+
+@pytest.fixture
+def make_player():
+    """Factory for a PlayerRecord whose socket only records what is sent."""
+    def make():
+        return PlayerRecord(socket=FakeSocket(), codec=Codec.BINARY, x=100, y=100)
+    return make
+
+
+@pytest.fixture
+def free_port():
+    with socket.socket() as sock:
+        sock.bind(('127.0.0.1', 0))
+        return sock.getsockname()[1]
+
+
+@pytest.fixture
+def start_server(tmp_path, monkeypatch):
+    """Runs a GameServer on a thread until the test ends.
+
+    Servers run from tmp_path, so the score database they create is thrown
+    away with it.
+    """
+    monkeypatch.chdir(tmp_path)
+    servers = []
+
+    def start(server):
+        threading.Thread(target=server.run, daemon=True).start()
+        servers.append(server)
+        deadline = time.time() + 5
+        while True:
+            try:
+                socket.create_connection(('127.0.0.1', server.port), timeout=1).close()
+                return
+            except OSError:
+                if time.time() > deadline:
+                    raise
+                time.sleep(0.05)
+
+    yield start
+    for server in servers:
+        server.running = False
+        # Wake the accept loop so it sees running is off.
+        socket.create_connection(('127.0.0.1', server.port)).close()
@@ -0,0 +1,110 @@
+import logging
+import logging.handlers
+import queue
+import threading
+import time
+
+LOG_FORMAT = '%(asctime)s %(levelname)-7s [%(name)s] %(message)s'
+# At most RATE_LIMIT records per message key every RATE_INTERVAL seconds.
+RATE_LIMIT = 5
+RATE_INTERVAL = 1.0
+ROOT_LOGGER = 'arena'
+
+_listener = None
+
+
+def get_logger(name):
+    """Logger under the 'arena' hierarchy, e.g. get_logger('server')."""
+    return logging.getLogger(f'{ROOT_LOGGER}.{name}')
+
+
+class RateLimitFilter(logging.Filter):
+    """Drops records once a message key has been logged RATE_LIMIT times this interval.
+
+    The key is ``record.rate_key`` when given through ``extra=``, otherwise
+    the unformatted message template, so every call site is limited on its
+    own. The first record let through after a quiet spell reports how many
+    were dropped.
+    """
+
+    def __init__(self, limit=RATE_LIMIT, interval=RATE_INTERVAL):
+        super().__init__()
+        self.limit = limit
+        self.interval = interval
+        self.lock = threading.Lock()
+        # key -> [window start, records in window, suppressed since last emit]
+        self.windows = {}
+
+    def filter(self, record):
+        key = getattr(record, 'rate_key', record.msg)
+        now = time.monotonic()
+        with self.lock:
+            window = self.windows.get(key)
+            if window is None or now - window[0] >= self.interval:
+                suppressed = window[2] if window is not None else 0
+                self.windows[key] = [now, 1, 0]
+            elif window[1] < self.limit:
+                window[1] += 1
+                suppressed = window[2]
+                window[2] = 0
+            else:
+                window[2] += 1
+                return False
+        if suppressed:
+            record.suppressed = suppressed
+        return True
+
+
+class DeferredFormatQueueHandler(logging.handlers.QueueHandler):
+    """QueueHandler that leaves formatting to the listener thread.
+
+    The stock handler formats every record before queueing it; here the
+    record is queued as-is so the thread that logged it only pays for
+    creating the record.
+    """
+
+    def prepare(self, record):
+        return record
+
+
+class SuppressedCountFormatter(logging.Formatter):
+    def format(self, record):
+        message = super().format(record)
+        suppressed = getattr(record, 'suppressed', 0)
+        if suppressed:
+            message += f" ({suppressed} similar messages suppressed)"
+        return message
+
+
+def setup_logging(level=logging.INFO, limit=RATE_LIMIT, interval=RATE_INTERVAL, stream=None):
+    """Route the 'arena' loggers through a rate limit and a background writer thread.
+
+    Safe to call more than once; the last call wins.
+    """
+    global _listener
+    stop_logging()
+
+    output = logging.StreamHandler(stream)
+    output.setFormatter(SuppressedCountFormatter(LOG_FORMAT))
+    records = queue.SimpleQueue()
+    handler = DeferredFormatQueueHandler(records)
+    handler.addFilter(RateLimitFilter(limit, interval))
+
+    root = logging.getLogger(ROOT_LOGGER)
+    for old in list(root.handlers):
+        root.removeHandler(old)
+    root.addHandler(handler)
+    root.setLevel(level)
+    root.propagate = False
+
+    _listener = logging.handlers.QueueListener(records, output)
+    _listener.start()
+    return _listener
+
+
+def stop_logging():
+    """Flush queued records and stop the writer thread."""
+    global _listener
+    if _listener is not None:
+        _listener.stop()
+        _listener = None
@@ -0,0 +1,143 @@
+import threading
+from collections import deque
+
+from movement import SEND_RATE
+
+# Remote players are drawn this many seconds in the past, so there is
+# usually a sample on each side of the drawn moment to blend between.
+INTERPOLATION_DELAY = 0.1
+# When samples run out, players keep moving at their last velocity for at
+# most this long, then glide back to where they were last seen.
+MAX_EXTRAPOLATION = 0.1
+# Samples kept per entity; only the last INTERPOLATION_DELAY's worth is used.
+BUFFER_SIZE = 32
+
+
+def still_after(send_rate):
+    """How long a position must repeat to mean the player stopped.
+
+    Snapshots can go out more often than players send input (``send_rate``
+    a second, 0 for every frame), so a moving player repeats between
+    sends. Repeated for 1.5 send intervals, the player has stopped (caught
+    before the drawn moment, INTERPOLATION_DELAY behind, reaches the stop).
+    """
+    return 1.5 / send_rate if send_rate else 0.0
+
+
+STILL_AFTER = still_after(SEND_RATE)
+
+
+class Interpolator:
+    """Timestamped position samples per entity, sampled at a delayed time.
+
+    ``push`` records where an entity was reported at time ``now`` (the
+    receiver's clock, e.g. time.monotonic()). ``sample`` returns where to
+    draw it: blended between the two samples around ``now - delay``, or, if
+    the newest sample is older than that, extrapolated along the last
+    velocity for up to ``max_extrapolation`` seconds. Updates go quiet when
+    a player stops, so past that bound the extrapolation winds back down to
+    the last reported position instead of leaving the player overshot.
+    ``mark_tick`` and ``render_tick`` do the same bookkeeping for snapshot
+    ticks, so a shot can name the tick that was on screen when it was fired.
+
+    Packets arrive on the receive thread while the main loop samples, so
+    every method takes the lock.
+    """
+
+    def __init__(self, delay=INTERPOLATION_DELAY, max_extrapolation=MAX_EXTRAPOLATION, size=BUFFER_SIZE,
+                 still_after=STILL_AFTER):
+        self.delay = delay
+        self.max_extrapolation = max_extrapolation
+        self.size = size
+        self.still_after = still_after
+        self.samples = {}
+        # (arrival time, tick), oldest first.
+        self.ticks = deque(maxlen=size)
+        self.lock = threading.Lock()
+
+    def __len__(self):
+        return len(self.samples)
+
+    def __contains__(self, entity_id):
+        return entity_id in self.samples
+
+    def push(self, entity_id, x, y, now):
+        with self.lock:
+            samples = self.samples.get(entity_id)
+            if samples is None:
+                samples = self.samples[entity_id] = deque(maxlen=self.size)
+            elif samples:
+                last_time, last_x, last_y = samples[-1]
+                if now <= last_time:
+                    # Same arrival time: keep only the newer report.
+                    samples.pop()
+                elif x == last_x and y == last_y and now - last_time < self.still_after:
+                    return
+            samples.append((now, x, y))
+
+    def snap(self, entity_id, x, y, now):
+        """Move an entity without blending from its old position (respawns)."""
+        with self.lock:
+            self.samples[entity_id] = deque([(now, x, y)], maxlen=self.size)
+
+    def remove(self, entity_id):
+        with self.lock:
+            self.samples.pop(entity_id, None)
+
+    def clear(self):
+        with self.lock:
+            self.samples.clear()
+            self.ticks.clear()
+
+    def mark_tick(self, tick, now):
+        """Record that the snapshot for ``tick`` arrived at ``now``."""
+        with self.lock:
+            self.ticks.append((now, tick))
+
+    def render_tick(self, now):
+        """The newest tick drawn at ``now``: the last to arrive by ``now - delay``.
+
+        Before any tick has been drawn it is the oldest one known, and 0 when
+        there are none (no snapshots, so nothing to rewind to).
+        """
+        render_time = now - self.delay
+        with self.lock:
+            for arrived, tick in reversed(self.ticks):
+                if arrived <= render_time:
+                    return tick
+            return self.ticks[0][1] if self.ticks else 0
+
+    def sample(self, entity_id, now):
+        """(x, y) to draw ``entity_id`` at, or None if it has no samples."""
+        with self.lock:
+            samples = self.samples.get(entity_id)
+            return self._sample(samples, now - self.delay) if samples else None
+
+    def positions(self, now):
+        """{entity_id: (x, y)} for every entity, all sampled at the same time."""
+        render_time = now - self.delay
+        with self.lock:
+            return {entity_id: self._sample(samples, render_time)
+                    for entity_id, samples in self.samples.items() if samples}
+
+    def _sample(self, samples, render_time):
+        newest_time, newest_x, newest_y = samples[-1]
+        if render_time >= newest_time:
+            if len(samples) < 2:
+                return newest_x, newest_y
+            previous_time, previous_x, previous_y = samples[-2]
+            # Ramp out to max_extrapolation, then back down to zero.
+            elapsed = render_time - newest_time
+            ahead = max(0.0, min(elapsed, 2 * self.max_extrapolation - elapsed))
+            scale = ahead / (newest_time - previous_time)
+            return newest_x + (newest_x - previous_x) * scale, newest_y + (newest_y - previous_y) * scale
+
+        # Newest first: the drawn moment is almost always near the end.
+        for index in range(len(samples) - 2, -1, -1):
+            before_time, before_x, before_y = samples[index]
+            if before_time <= render_time:
+                after_time, after_x, after_y = samples[index + 1]
+                fraction = (render_time - before_time) / (after_time - before_time)
+                return before_x + (after_x - before_x) * fraction, before_y + (after_y - before_y) * fraction
+        _, oldest_x, oldest_y = samples[0]
+        return oldest_x, oldest_y
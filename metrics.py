@@ -0,0 +1,162 @@
+import bisect
+import json
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+from gamelog import get_logger
+
+# Histogram bucket edges: 1 us to ~30 s, each 10% wider than the last.
+BUCKET_GROWTH = 1.1
+BUCKET_EDGES = []
+_edge = 1e-6
+while _edge < 30.0:
+    BUCKET_EDGES.append(_edge)
+    _edge *= BUCKET_GROWTH
+
+# Where time is measured for a packet:
+#   transit - from the sender's ts to the server reading the frame
+#   handle  - inside GameServer.handle_packet
+#   enqueue - handing an outgoing frame to its connection (sendall); with a
+#             send queue or transport this is not the network write
+#   write   - the socket write itself, from a connection's OutboundQueue:
+#             'direct' for the non-blocking fast path, 'batch' for a writev
+STAGES = ('transit', 'handle', 'enqueue', 'write')
+
+log = get_logger('metrics')
+
+
+class LatencyHistogram:
+    """Fixed log-spaced buckets: constant memory and O(log n) record."""
+
+    def __init__(self):
+        self.counts = [0] * (len(BUCKET_EDGES) + 1)
+        self.count = 0
+        self.total = 0.0
+        self.bytes = 0
+
+    def record(self, seconds, nbytes=0):
+        self.counts[bisect.bisect_left(BUCKET_EDGES, seconds)] += 1
+        self.count += 1
+        self.total += seconds
+        self.bytes += nbytes
+
+    def percentile(self, q):
+        """Upper edge of the bucket holding the q-th sample, in seconds."""
+        if not self.count:
+            return 0.0
+        rank = q * self.count
+        seen = 0
+        for index, count in enumerate(self.counts):
+            seen += count
+            if seen >= rank:
+                return BUCKET_EDGES[min(index, len(BUCKET_EDGES) - 1)]
+        return BUCKET_EDGES[-1]
+
+    def summary(self):
+        return {
+            'count': self.count,
+            'bytes': self.bytes,
+            'mean_ms': self.total / self.count * 1000 if self.count else 0.0,
+            'p50_ms': self.percentile(0.50) * 1000,
+            'p95_ms': self.percentile(0.95) * 1000,
+            'p99_ms': self.percentile(0.99) * 1000
+        }
+
+
+class PacketMetrics:
+    """Per-stage, per-opcode latency histograms.
+
+    Callers hold a PacketMetrics only while tracing is on and check for None
+    otherwise, so a server with tracing off pays one attribute test per packet.
+    """
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.histograms = {}
+        self.started = time.time()
+        # name -> callable returning a dict of current values, e.g. queue depths.
+        self.gauges = {}
+
+    def add_gauge(self, name, read):
+        self.gauges[name] = read
+
+    def record(self, stage, op_code, seconds, nbytes=0):
+        key = (stage, op_code)
+        with self.lock:
+            histogram = self.histograms.get(key)
+            if histogram is None:
+                histogram = self.histograms[key] = LatencyHistogram()
+            histogram.record(seconds, nbytes)
+
+    def summary(self):
+        with self.lock:
+            items = [(key, histogram.summary()) for key, histogram in self.histograms.items()]
+        report = {'uptime': time.time() - self.started}
+        for (stage, op_code), stats in sorted(items):
+            report.setdefault(stage, {})[op_code] = stats
+        for name, read in list(self.gauges.items()):
+            report[name] = read()
+        return report
+
+    def format(self):
+        report = self.summary()
+        lines = [f"📈 Packet metrics ({report['uptime']:.0f}s)",
+                 f"  {'stage':<8} {'op':<13} {'count':>8} {'bytes':>11} {'p50 ms':>8} {'p95 ms':>8} {'p99 ms':>8}"]
+        for stage in STAGES:
+            for op_code, stats in report.get(stage, {}).items():
+                lines.append(f"  {stage:<8} {op_code:<13} {stats['count']:>8} {stats['bytes']:>11} "
+                             f"{stats['p50_ms']:>8.3f} {stats['p95_ms']:>8.3f} {stats['p99_ms']:>8.3f}")
+        for name in self.gauges:
+            lines.append(f"  {name}: {report.get(name)}")
+        return '\n'.join(lines)
+
+    def dump_every(self, interval, running):
+        """Print the metrics every ``interval`` seconds while ``running()`` is true."""
+        while running():
+            time.sleep(interval)
+            log.info("%s", self.format())
+
+    def serve(self, host, port):
+        """Serve the summary as JSON at http://host:port/stats on a daemon thread."""
+        metrics = self
+
+        class StatsHandler(BaseHTTPRequestHandler):
+            def do_GET(self):
+                if self.path.rstrip('/') not in ('', '/stats'):
+                    self.send_error(404)
+                    return
+                body = json.dumps(metrics.summary(), indent=2).encode('utf-8')
+                self.send_response(200)
+                self.send_header('Content-Type', 'application/json')
+                self.send_header('Content-Length', str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def log_message(self, format, *args):
+                pass
+
+        httpd = ThreadingHTTPServer((host, port), StatsHandler)
+        threading.Thread(target=httpd.serve_forever, daemon=True).start()
+        log.info("📈 Packet metrics at http://%s:%s/stats", host, port)
+        return httpd
+
+
+def timed_sendall(metrics, sock, frame, op_code, key=None):
+    """sock.sendall(frame), timed into ``metrics`` under 'enqueue' when tracing.
+
+    ``key`` marks frames a connection's send queue may coalesce; it is only
+    passed on when set, so plain sockets work too.
+    """
+    if metrics is None:
+        if key is None:
+            sock.sendall(frame)
+        else:
+            sock.sendall(frame, key)
+        return
+    start = time.perf_counter()
+    if key is None:
+        sock.sendall(frame)
+    else:
+        sock.sendall(frame, key)
+    metrics.record('enqueue', op_code, time.perf_counter() - start, len(frame))
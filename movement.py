@@ -0,0 +1,163 @@
+import math
+import threading
+from collections import deque
+
+# Shared by the client's prediction and the server's validation, so both
+# turn the same input into the same position.
+PLAYER_SPEED = 200
+MIN_X, MAX_X = 50, 750
+MIN_Y, MAX_Y = 50, 550
+# Longest step one input may take; longer frames are cut down to this.
+MAX_INPUT_MS = 100
+# How far a player's inputs may run ahead of (or bank behind) the server's
+# clock, to absorb network jitter without allowing speed hacks.
+INPUT_SLACK = 0.25
+# Unacknowledged inputs kept for replay; a client this far behind has
+# bigger problems than a slightly wrong position.
+MAX_PENDING_INPUTS = 256
+# INPUT sends per second while moving; 0 sends every frame.
+SEND_RATE = 20
+# Seconds between sends while standing still, so the server keeps hearing
+# from the player.
+HEARTBEAT_INTERVAL = 1.0
+
+
+def step(x, y, move_x, move_y, dt_ms):
+    """Where an input moving along (move_x, move_y) for ``dt_ms`` ends up.
+
+    ``move_x`` and ``move_y`` are -1, 0 or 1, one per held key, as the client
+    always moved. The arena edges are walls.
+    """
+    distance = PLAYER_SPEED * min(dt_ms, MAX_INPUT_MS) / 1000
+    x = max(MIN_X, min(MAX_X, x + move_x * distance))
+    y = max(MIN_Y, min(MAX_Y, y + move_y * distance))
+    return x, y
+
+
+def sign(value):
+    return (value > 0) - (value < 0)
+
+
+def allowed_ms(move_clock, dt_ms, now):
+    """(milliseconds of ``dt_ms`` the server allows, the player's new move clock).
+
+    ``move_clock`` is the time up to which the player's movement has been
+    simulated. It may not fall further than INPUT_SLACK behind ``now``, so
+    idling does not bank time for a burst, nor run more than INPUT_SLACK
+    ahead of it, so inputs claiming more time than has passed are cut short.
+    """
+    move_clock = max(move_clock, now - INPUT_SLACK)
+    budget_ms = max(0, round((now + INPUT_SLACK - move_clock) * 1000))
+    dt_ms = max(0, min(dt_ms, MAX_INPUT_MS, budget_ms))
+    return dt_ms, move_clock + dt_ms / 1000
+
+
+def limit_move(x, y, to_x, to_y, move_clock, now):
+    """(x, y, move clock) after an absolute move from (x, y) towards (to_x, to_y).
+
+    A MOVE claims the time PLAYER_SPEED needs to cover its longer axis, as
+    ``step`` moves both axes at full speed. It gets what ``allowed_ms``
+    grants an INPUT of that length, stops short along the way if that is
+    less, and stays inside the arena.
+    """
+    claimed_ms = max(abs(to_x - x), abs(to_y - y)) * 1000 / PLAYER_SPEED
+    if claimed_ms:
+        allowed, move_clock = allowed_ms(move_clock, claimed_ms, now)
+        scale = allowed / claimed_ms
+        to_x, to_y = x + (to_x - x) * scale, y + (to_y - y) * scale
+    return max(MIN_X, min(MAX_X, to_x)), max(MIN_Y, min(MAX_Y, to_y)), move_clock
+
+
+class Predictor:
+    """The local player's position, predicted from inputs and corrected by the server.
+
+    Every movement input gets the next sequence number, is applied at once
+    with ``step`` and kept until the server acknowledges it. ``reconcile``
+    takes the server's position after its newest applied input, drops the
+    inputs up to that one and replays the rest on top, so a correct
+    prediction stays where it is and a wrong one is fixed without losing
+    input the server has not seen yet.
+
+    Inputs come from the main loop and corrections from the receive thread,
+    so every method takes the lock.
+    """
+
+    def __init__(self, x=0, y=0):
+        self.x, self.y = x, y
+        self.seq = 0
+        self.pending = deque(maxlen=MAX_PENDING_INPUTS)
+        # Reconciliations that moved the player, for the debug overlay.
+        self.corrections = 0
+        self.lock = threading.Lock()
+
+    def position(self):
+        with self.lock:
+            return self.x, self.y
+
+    def reset(self, x, y):
+        """Put the player at (x, y), forgetting pending inputs (spawns, respawns)."""
+        with self.lock:
+            self.x, self.y = x, y
+            self.pending.clear()
+
+    def apply(self, move_x, move_y, dt_ms):
+        """Predict one input; returns its sequence number and the new (x, y)."""
+        with self.lock:
+            self.seq += 1
+            self.pending.append((self.seq, move_x, move_y, dt_ms))
+            self.x, self.y = step(self.x, self.y, move_x, move_y, dt_ms)
+            return self.seq, self.x, self.y
+
+    def reconcile(self, x, y, acked_seq):
+        """Rebase on the server's (x, y) after input ``acked_seq``; returns the new (x, y)."""
+        with self.lock:
+            pending = self.pending
+            while pending and pending[0][0] <= acked_seq:
+                pending.popleft()
+            for _, move_x, move_y, dt_ms in pending:
+                x, y = step(x, y, move_x, move_y, dt_ms)
+            if abs(x - self.x) > 0.5 or abs(y - self.y) > 0.5:
+                self.corrections += 1
+            self.x, self.y = x, y
+            return x, y
+
+
+class InputCoalescer:
+    """Movement inputs gathered between network sends.
+
+    The predictor still steps every frame; this decides what goes on the
+    wire. Consecutive inputs with the same keys are merged by adding their
+    times, up to MAX_INPUT_MS each, and keep the newest seq, so the
+    server's ack for it covers all of them. ``due`` allows a send at most
+    ``rate`` times a second while there is something new and every
+    ``heartbeat`` seconds otherwise.
+    """
+
+    def __init__(self, rate=SEND_RATE, heartbeat=HEARTBEAT_INTERVAL):
+        self.interval = 1.0 / rate if rate else 0.0
+        self.heartbeat = heartbeat
+        # [seq, move_x, move_y, dt_ms], oldest first.
+        self.inputs = []
+        self.last_sent = -math.inf
+
+    def add(self, seq, move_x, move_y, dt_ms):
+        if self.inputs:
+            last = self.inputs[-1]
+            if last[1] == move_x and last[2] == move_y and last[3] + dt_ms <= MAX_INPUT_MS:
+                last[0] = seq
+                last[3] += dt_ms
+                return
+        self.inputs.append([seq, move_x, move_y, dt_ms])
+
+    def due(self, now, changed=False):
+        """Whether to send now; ``changed`` is news other than movement (a turn)."""
+        elapsed = now - self.last_sent
+        if self.inputs or changed:
+            return elapsed >= self.interval
+        return elapsed >= self.heartbeat
+
+    def take(self, now):
+        """The merged inputs to send, oldest first; marks ``now`` as a send."""
+        inputs, self.inputs = self.inputs, []
+        self.last_sent = now
+        return inputs
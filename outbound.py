@@ -0,0 +1,261 @@
+import os
+import socket
+import threading
+import time
+from collections import deque
+
+from gamelog import get_logger
+
+# Per-connection send queue limits. A frame that would go past either limit
+# is dropped, and a queue that stays full for EVICT_AFTER seconds gets its
+# client disconnected.
+SEND_QUEUE_FRAMES = 256
+SEND_QUEUE_BYTES = 256 * 1024
+EVICT_AFTER = 5.0
+# One writev (sendmsg) call carries at most this many frames.
+MAX_BATCH_FRAMES = 512
+
+log = get_logger('outbound')
+
+
+class OutboundStats:
+    """Thread-safe counters shared by every OutboundQueue of a server."""
+
+    FIELDS = ('frames_queued', 'frames_written', 'batches', 'coalesced', 'dropped', 'evictions', 'peak_depth')
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.frames_queued = 0
+        self.frames_written = 0
+        self.batches = 0
+        self.coalesced = 0
+        self.dropped = 0
+        self.evictions = 0
+        self.peak_depth = 0
+
+    def record(self, frames_queued=0, frames_written=0, batches=0, coalesced=0, dropped=0, evictions=0, depth=0):
+        with self.lock:
+            self.frames_queued += frames_queued
+            self.frames_written += frames_written
+            self.batches += batches
+            self.coalesced += coalesced
+            self.dropped += dropped
+            self.evictions += evictions
+            if depth > self.peak_depth:
+                self.peak_depth = depth
+
+    def totals(self):
+        with self.lock:
+            return {field: getattr(self, field) for field in self.FIELDS}
+
+
+def direct_socket(sock):
+    """A second handle on ``sock``'s connection for sends that must not wait, or None.
+
+    Python polls a socket with a timeout for writability before every send,
+    MSG_DONTWAIT or not, so a full kernel buffer would hold the caller for
+    the whole timeout. The duplicate has no timeout and so never polls.
+    Sockets with a timeout are already O_NONBLOCK at the OS level, so
+    making the duplicate non-blocking changes nothing for ``sock``.
+    """
+    fileno = getattr(sock, 'fileno', None)
+    if fileno is None or fileno() < 0:
+        return None
+    direct = socket.socket(fileno=os.dup(fileno()))
+    direct.settimeout(None if sock.gettimeout() is None else 0.0)
+    return direct
+
+
+class OutboundQueue:
+    """Socket-like sender that queues frames and writes them on its own thread.
+
+    ``sendall`` never blocks on the network, so one slow client cannot stall
+    whoever is broadcasting. The writer thread sends everything queued in a
+    single sendmsg (writev) call and handles partial writes. While nothing is
+    queued or being written, a frame is first tried as a non-blocking send
+    from the caller on a duplicate of the socket (``direct_socket``), which
+    skips the thread handoff and returns at once if the client is not
+    reading. A frame queued
+    with a ``key`` drops any frame with the same key that is still waiting
+    and goes to the back of the queue like any other frame, which is how
+    stale MOVEs and superseded SNAPSHOTs are dropped without ever sending
+    frames out of order.
+    With ``metrics`` (a PacketMetrics), every socket write is timed under
+    the 'write' stage.
+    """
+
+    def __init__(self, sock, stats=None, max_frames=SEND_QUEUE_FRAMES, max_bytes=SEND_QUEUE_BYTES,
+                 evict_after=EVICT_AFTER, name=None, metrics=None):
+        self.sock = sock
+        self.direct = direct_socket(sock)
+        self.metrics = metrics
+        self.stats = stats if stats is not None else OutboundStats()
+        self.max_frames = max_frames
+        self.max_bytes = max_bytes
+        self.evict_after = evict_after
+        self.name = name
+        self.cond = threading.Condition()
+        # Entries are [key, frame] lists. A superseded keyed entry stays where
+        # it is with its frame set to None, and the writer skips it.
+        self.frames = deque()
+        self.keyed = {}
+        self.superseded = 0
+        self.queued_bytes = 0
+        self.saturated_since = None
+        self.closed = False
+        # True while the writer thread is sending a batch outside the lock.
+        self.writing = False
+        self.writer = threading.Thread(target=self.write_loop, daemon=True)
+        self.writer.start()
+
+    def depth(self):
+        return len(self.frames) - self.superseded
+
+    def is_full(self, nbytes=0):
+        return self.depth() >= self.max_frames or self.queued_bytes + nbytes > self.max_bytes
+
+    def sendall(self, data, key=None):
+        with self.cond:
+            if self.closed:
+                raise ConnectionError("connection closed")
+            if key is not None:
+                entry = self.keyed.pop(key, None)
+                if entry is not None:
+                    self.queued_bytes -= len(entry[1])
+                    entry[1] = None
+                    self.superseded += 1
+                    self.stats.record(coalesced=1)
+            if not self.frames and not self.writing:
+                data = self.send_now(data)
+                if not data:
+                    return
+                key = None
+            if self.is_full(len(data)):
+                self.on_full()
+            entry = [key, data]
+            self.frames.append(entry)
+            if key is not None:
+                self.keyed[key] = entry
+            self.queued_bytes += len(data)
+            depth = self.depth()
+            self.cond.notify()
+        self.stats.record(frames_queued=1, depth=depth)
+
+    def send_now(self, data):
+        """Send what the kernel takes right away; returns the unsent rest."""
+        if self.direct is None:
+            return data
+        start = time.perf_counter()
+        try:
+            sent = self.direct.send(data, socket.MSG_DONTWAIT)
+        except (BlockingIOError, InterruptedError, socket.timeout):
+            return data
+        except OSError:
+            # Leave reporting the failure to the writer thread.
+            return data
+        if self.metrics is not None:
+            self.metrics.record('write', 'direct', time.perf_counter() - start, sent)
+        self.stats.record(frames_written=1 if sent == len(data) else 0)
+        return memoryview(data)[sent:] if sent < len(data) else b''
+
+    def on_full(self):
+        # Called with the lock held; always raises.
+        now = time.monotonic()
+        if self.saturated_since is None:
+            self.saturated_since = now
+        elif now - self.saturated_since >= self.evict_after:
+            self.stats.record(dropped=1, evictions=1)
+            log.warning("Evicting %s: send queue full for %.1fs", self.name, now - self.saturated_since)
+            self.abort()
+            raise ConnectionError("send queue saturated")
+        self.stats.record(dropped=1)
+        raise ConnectionError("send queue full")
+
+    def abort(self):
+        """Stop sending and drop the connection so its reader notices and cleans up."""
+        self.closed = True
+        self.frames.clear()
+        self.keyed.clear()
+        self.superseded = 0
+        self.queued_bytes = 0
+        self.cond.notify_all()
+        try:
+            self.sock.shutdown(socket.SHUT_RDWR)
+        except OSError:
+            pass
+
+    def write_loop(self):
+        try:
+            self.write_batches()
+        finally:
+            with self.cond:
+                if self.direct is not None:
+                    self.direct.close()
+                    self.direct = None
+
+    def write_batches(self):
+        while True:
+            with self.cond:
+                while not self.frames and not self.closed:
+                    self.cond.wait()
+                if not self.frames:
+                    return
+                batch = []
+                nbytes = 0
+                while self.frames and len(batch) < MAX_BATCH_FRAMES:
+                    key, frame = self.frames.popleft()
+                    if frame is None:
+                        self.superseded -= 1
+                        continue
+                    if key is not None:
+                        del self.keyed[key]
+                    batch.append(frame)
+                    nbytes += len(frame)
+                    self.queued_bytes -= len(frame)
+                if not self.is_full():
+                    self.saturated_since = None
+                if not batch:
+                    continue
+                count = len(batch)
+                self.writing = True
+            start = time.perf_counter()
+            try:
+                self.write(batch)
+            except OSError as e:
+                log.warning("Send to %s failed: %s", self.name, e)
+                with self.cond:
+                    self.writing = False
+                    self.abort()
+                return
+            if self.metrics is not None:
+                self.metrics.record('write', 'batch', time.perf_counter() - start, nbytes)
+            with self.cond:
+                self.writing = False
+            self.stats.record(frames_written=count, batches=1)
+
+    def write(self, buffers):
+        buffers = [memoryview(frame) for frame in buffers]
+        while buffers:
+            try:
+                sent = self.sock.sendmsg(buffers)
+            except socket.timeout:
+                # The connection's sockets use a short timeout for the reader;
+                # keep waiting unless the queue was shut down meanwhile.
+                if self.closed and not self.frames:
+                    raise
+                continue
+            while sent and buffers:
+                if sent >= len(buffers[0]):
+                    sent -= len(buffers[0])
+                    buffers.pop(0)
+                else:
+                    buffers[0] = buffers[0][sent:]
+                    sent = 0
+
+    def close(self, timeout=1.0):
+        """Let the writer flush what is queued (up to ``timeout``), then stop it."""
+        with self.cond:
+            self.closed = True
+            self.cond.notify_all()
+        if threading.current_thread() is not self.writer:
+            self.writer.join(timeout)
@@ -0,0 +1,140 @@
+import math
+import threading
+
+import numpy as np
+import pygame
+
+# Most particles alive at once; emits past this are dropped.
+MAX_PARTICLES = 20000
+# Added to every particle's vertical speed each frame.
+GRAVITY = 0.1
+# Sizes (radii) are below this; sprites are looked up by color * SIZES + size.
+SIZES = 16
+# Up to this many visible particles, draw() reports one rect per particle;
+# past it, a single rect around all of them.
+RECT_LIMIT = 256
+# Sprite background, made transparent with a colorkey. Colorkeyed RLE
+# sprites blit about twice as fast as per-pixel alpha ones.
+COLORKEY = (255, 0, 255)
+
+
+class ParticleSystem:
+    """Particles in preallocated NumPy arrays, updated a frame at a time.
+
+    Live particles are packed into the first ``count`` slots. ``update``
+    moves all of them with a few array operations and removes dead ones by
+    moving live particles from the tail into their slots, so nothing is
+    shifted. Drawing is a single blits() call over cached circle sprites, one
+    per (color, size), made when a color is first emitted.
+
+    Packets that spawn effects arrive on the network thread while the main
+    loop updates and draws, so every method takes the lock.
+    """
+
+    def __init__(self, capacity=MAX_PARTICLES, gravity=GRAVITY, seed=None):
+        self.capacity = capacity
+        self.gravity = gravity
+        self.count = 0
+        self.position = np.zeros((capacity, 2), dtype=np.float32)
+        self.velocity = np.zeros((capacity, 2), dtype=np.float32)
+        self.life = np.zeros(capacity, dtype=np.int16)
+        self.size = np.zeros(capacity, dtype=np.int16)
+        # Index into self.colors.
+        self.color = np.zeros(capacity, dtype=np.int16)
+        self.colors = []
+        # Indexed by color index * SIZES + size.
+        self.sprites = []
+        self.rng = np.random.default_rng(seed)
+        self.lock = threading.Lock()
+
+    def __len__(self):
+        return self.count
+
+    def color_index(self, color):
+        try:
+            return self.colors.index(color)
+        except ValueError:
+            self.colors.append(color)
+            self.sprites.extend(self.make_sprite(color, size) for size in range(SIZES))
+            return len(self.colors) - 1
+
+    @staticmethod
+    def make_sprite(color, size):
+        sprite = pygame.Surface((size * 2 or 1, size * 2 or 1))
+        sprite.fill(COLORKEY)
+        sprite.set_colorkey(COLORKEY, pygame.RLEACCEL)
+        pygame.draw.circle(sprite, color, (size, size), size)
+        return sprite
+
+    def emit(self, x, y, amount, color, life, speed=(2, 5), size=(2, 4), angle=(0.0, 2 * math.pi)):
+        """Spawn ``amount`` particles at (x, y) flying out at random angles and speeds.
+
+        ``speed`` and ``angle`` are uniform ranges, ``size`` an inclusive
+        integer range, matching the random.uniform/randint calls they replace.
+        """
+        with self.lock:
+            start = self.count
+            amount = min(amount, self.capacity - start)
+            if amount <= 0:
+                return
+            end = start + amount
+            angles = self.rng.uniform(angle[0], angle[1], amount)
+            speeds = self.rng.uniform(speed[0], speed[1], amount)
+            self.position[start:end] = (x, y)
+            self.velocity[start:end, 0] = np.cos(angles) * speeds
+            self.velocity[start:end, 1] = np.sin(angles) * speeds
+            self.life[start:end] = life
+            self.size[start:end] = self.rng.integers(size[0], min(size[1] + 1, SIZES), amount)
+            self.color[start:end] = self.color_index(color)
+            self.count = end
+
+    def update(self):
+        with self.lock:
+            count = self.count
+            if not count:
+                return
+            position, velocity = self.position[:count], self.velocity[:count]
+            position += velocity
+            velocity[:, 1] += self.gravity
+            life = self.life[:count]
+            life -= 1
+
+            dead = np.flatnonzero(life <= 0)
+            if not len(dead):
+                return
+            alive = count - len(dead)
+            # Swap-remove: holes below the new count are filled with the live
+            # particles found at or above it; there are exactly as many of each.
+            holes = dead[dead < alive]
+            if len(holes):
+                tail = np.arange(alive, count)
+                movers = tail[life[alive:] > 0]
+                for array in (self.position, self.velocity, self.life, self.size, self.color):
+                    array[holes] = array[movers]
+            self.count = alive
+
+    def draw(self, surface, camera_x=0, camera_y=0):
+        """Blit every visible particle; returns the screen rects they cover."""
+        with self.lock:
+            count = self.count
+            if not count:
+                return []
+            size = self.size[:count]
+            left = (self.position[:count, 0] - camera_x).astype(np.int32) - size
+            top = (self.position[:count, 1] - camera_y).astype(np.int32) - size
+            width, height = surface.get_size()
+            visible = (left < width) & (top < height) & (left > -2 * size) & (top > -2 * size)
+            if not visible.any():
+                return []
+            left, top, size = left[visible], top[visible], size[visible]
+            keys = (self.color[:count][visible] * SIZES + size).tolist()
+            positions = zip(left.tolist(), top.tolist())
+            if len(keys) > RECT_LIMIT:
+                bounds = pygame.Rect(int(left.min()), int(top.min()), 0, 0)
+                bounds.width = int((left + 2 * size).max()) - bounds.x
+                bounds.height = int((top + 2 * size).max()) - bounds.y
+            else:
+                bounds = None
+            sprites = self.sprites
+        rects = surface.blits(zip(map(sprites.__getitem__, keys), positions), bounds is None)
+        return rects if bounds is None else [bounds.clip(surface.get_rect())]
@@ -5,10 +5,39 @@ import sys
 import time
 import random
 import math
-from protocol import OpCode, GamePacket
+import numpy as np
+from protocol import OpCode, GamePacket, FrameDecoder, Codec
+from snapshots import SnapshotHistory, apply_snapshot
+from records import RemotePlayer
+from interpolation import Interpolator, still_after
+from movement import InputCoalescer, Predictor, HEARTBEAT_INTERVAL, MAX_INPUT_MS, SEND_RATE
+from particles import ParticleSystem
+from bullets import BulletPool
+from sprites import SpriteCache, PLAYER_SPRITE_SIZE, BULLET_SPRITE_SIZE
+from textcache import TextCache
+from gamelog import get_logger, setup_logging, stop_logging
 
 HOST = '127.0.0.1'
 PORT = 5555
+# Room to join; None lets the server matchmake into an open arena.
+ROOM_ID = None
+# Distance at which a bullet counts as hitting a player.
+HIT_RADIUS = 25
+# Stamp outgoing packets with a sequence number and send time so a server
+# started with --trace can measure their transit latency.
+TRACE_PACKETS = False
+# 'DEBUG' logs every received MOVE; keep it at INFO while playing.
+LOG_LEVEL = 'INFO'
+# Redraw only the parts of the screen that changed instead of the whole
+# frame each time; F2 toggles it while playing.
+DIRTY_RECTS = False
+# Screen areas the HUD (draw_ui) and the debug overlay draw into.
+HUD_RECTS = [pygame.Rect(0, 0, 240, 175), pygame.Rect(590, 10, 205, 170)]
+DEBUG_RECTS = [pygame.Rect(0, 475, 560, 125)]
+# Seconds between updates of the render timing and text cache readout.
+TIMING_REFRESH = 0.25
+
+log = get_logger('client')
 
 
 class GameClient:
@@ -26,6 +55,16 @@ class GameClient:
 
         self.client_id = None
         self.player_pos = [400, 300]
+        # Movement is sent as sequenced INPUTs and predicted here; the server's
+        # snapshots correct it.
+        self.predictor = Predictor(*self.player_pos)
+        self.input_coalescer = InputCoalescer(SEND_RATE, HEARTBEAT_INTERVAL)
+        self.sent_direction = None
+        # Packets sent (INPUTs among them) and frames drawn; the debug overlay
+        # shows their rates, as of the last readout refresh.
+        self.packets_sent = self.inputs_sent = self.frames_rendered = 0
+        self.counted_at = (0.0, 0, 0, 0)
+        self.shown_rates = (0, 0, 0)
         self.player_health = 100
         self.player_score = 0
         self.player_direction = 'right'
@@ -36,12 +75,23 @@ class GameClient:
         self.invulnerability_duration = 1000  
         self.hit_flash = False
         self.debug_mode = True 
+        # Set to Codec.JSON to get human-readable traffic while debugging.
+        self.wire_codec = Codec.BINARY
+        self.codec = Codec.JSON
 
         self.other_players = {}
-        self.bullets = []
-        self.particles = []
+        # Reported positions of other players, drawn INTERPOLATION_DELAY in
+        # the past so irregular packets still give smooth movement.
+        self.interpolator = Interpolator(still_after=still_after(SEND_RATE))
+        self.snapshot_history = SnapshotHistory()
+        self.bullets = BulletPool(hit_radius=HIT_RADIUS)
+        self.particles = ParticleSystem()
         self.cacti = []
         self.rocks = []
+        # Baked static scene (see draw_desert_background) and the parts of
+        # it waiting to be re-rendered.
+        self.background = None
+        self.background_dirty = []
         self.generate_desert_objects()
 
         self.camera_x = 0
@@ -49,20 +99,39 @@ class GameClient:
 
         self.connected = False
         self.connection_error = None
+        self.send_lock = threading.Lock()
+        self.packet_seq = 0
 
         self.font_large = pygame.font.Font(None, 48)
         self.font_medium = pygame.font.Font(None, 32)
         self.font_small = pygame.font.Font(None, 24)
         self.font_tiny = pygame.font.Font(None, 18)
-
-        print("🤠 Connecting to Desert Arena...")
+        # Every string the client draws goes through one cache.
+        self.text = TextCache()
+        self.sprites = SpriteCache(self.font_tiny, self.text)
+        # Milliseconds spent drawing the last frame and putting it on screen.
+        self.render_ms = 0.0
+        self.present_ms = 0.0
+        self.shown_render_ms = self.shown_present_ms = 0.0
+        self.shown_rects = 0
+        self.shown_text = (0, 0)
+        self.timings_shown_at = 0.0
+        self.updated_rects = 0
+        self.dirty_rendering = DIRTY_RECTS
+        # Dirty-rect state: rects drawn last frame, the camera they were drawn
+        # with, and what the HUD and debug overlay last showed.
+        self.dirty_rects = []
+        self.last_camera = None
+        self.overlay_state = {}
+
+        log.info("🤠 Connecting to Desert Arena...")
         self.connect_to_server()
 
         if self.connected:
-            print("✅ Connected! Yeehaw!")
+            log.info("✅ Connected! Yeehaw!")
             threading.Thread(target=self.receive_messages, daemon=True).start()
         else:
-            print(f"❌ Failed to connect: {self.connection_error}")
+            log.error("❌ Failed to connect: %s", self.connection_error)
 
     def load_sounds(self):
         try:
@@ -92,21 +161,6 @@ class GameClient:
             self.hit_sound = None
             self.death_sound = None
 
-    def take_damage(self, amount):
-        if not self.is_invulnerable and self.player_health > 0:
-            self.player_health -= amount
-            self.is_invulnerable = True
-            self.invulnerability_timer = pygame.time.get_ticks()
-            self.hit_flash = True
-
-            if self.player_health < 0:
-                self.player_health = 0
-            if self.hit_sound:
-                self.hit_sound.play()
-
-            return True
-        return False
-
     def update_invulnerability(self):
         current_time = pygame.time.get_ticks()
         if self.is_invulnerable:
@@ -114,12 +168,6 @@ class GameClient:
                 self.is_invulnerable = False
                 self.hit_flash = False
 
-    def check_bullet_player_collision(self, bullet, player_x, player_y):
-        player_radius = 15
-        distance = math.sqrt((bullet['x'] - player_x) ** 2 + (bullet['y'] - player_y) ** 2)
-
-        return distance < player_radius
-
     def create_retro_graphics(self):
         self.player_colors = {
             1: {'body': (255, 100, 100), 'hat': (100, 200, 100), 'gun': (150, 150, 150)},
@@ -146,16 +194,23 @@ class GameClient:
             self.desert_pattern.set_at((x, y), color)
 
     def generate_desert_objects(self):
+        # Spikes and rock texture are rolled here, once, so the scene looks
+        # the same every time it is rendered.
         for _ in range(15):
             x = random.randint(50, 750)
             y = random.randint(50, 550)
             height = random.randint(40, 80)
             width = random.randint(20, 40)
+            spikes = []
+            for _ in range(random.randint(3, 8)):
+                spike_x = random.randint(-width // 2, width // 2)
+                spike_y = random.randint(0, height) - height
+                spikes.append((spike_x, spike_y, spike_x + random.randint(-5, 5), spike_y + random.randint(-5, 5)))
             self.cacti.append({
                 'x': x, 'y': y,
                 'width': width, 'height': height,
                 'color': (80, 150, 80),
-                'spikes': random.randint(3, 8)
+                'spikes': spikes
             })
 
         for _ in range(20):
@@ -165,11 +220,25 @@ class GameClient:
             self.rocks.append({
                 'x': x, 'y': y,
                 'size': size,
-                'color': (120, 120, 120)
+                'color': (120, 120, 120),
+                'dots': [(random.randint(-size // 2, size // 2), random.randint(-size // 2, size // 2))
+                         for _ in range(size // 5)]
             })
+        self.invalidate_background()
+
+    def invalidate_background(self, rect=None):
+        """Have the next frame re-render the baked background, or only ``rect`` of it.
 
-    def draw_desert_background(self):
-        self.screen.blit(self.desert_pattern, (0, 0))
+        Call this after changing self.cacti or self.rocks.
+        """
+        if rect is None:
+            self.background = None
+        elif self.background is not None:
+            self.background_dirty.append(pygame.Rect(rect))
+
+    def render_background(self, surface):
+        """Draw the static desert scene in world coordinates."""
+        surface.blit(self.desert_pattern, (0, 0))
         mountain_colors = [(150, 120, 100), (140, 110, 90), (130, 100, 80)]
         for i, color in enumerate(mountain_colors):
             points = [
@@ -181,44 +250,38 @@ class GameClient:
                 (800, 600),
                 (0, 600)
             ]
-            pygame.draw.polygon(self.screen, color, points)
+            pygame.draw.polygon(surface, color, points)
 
         for cactus in self.cacti:
-            x = cactus['x'] - self.camera_x
-            y = cactus['y'] - self.camera_y
-            pygame.draw.rect(self.screen, cactus['color'],
+            x = cactus['x']
+            y = cactus['y']
+            pygame.draw.rect(surface, cactus['color'],
                              (x - cactus['width'] // 2, y - cactus['height'],
                               cactus['width'], cactus['height']))
             arm_height = cactus['height'] // 2
-            pygame.draw.rect(self.screen, cactus['color'],
+            pygame.draw.rect(surface, cactus['color'],
                              (x - cactus['width'] // 2 - 20, y - cactus['height'] + arm_height,
                               20, 15))
-            pygame.draw.rect(self.screen, cactus['color'],
+            pygame.draw.rect(surface, cactus['color'],
                              (x + cactus['width'] // 2, y - cactus['height'] + arm_height,
                               20, 15))
-            for _ in range(cactus['spikes']):
-                spike_x = x + random.randint(-cactus['width'] // 2, cactus['width'] // 2)
-                spike_y = y - cactus['height'] + random.randint(0, cactus['height'])
-                pygame.draw.line(self.screen, (50, 100, 50),
-                                 (spike_x, spike_y),
-                                 (spike_x + random.randint(-5, 5), spike_y + random.randint(-5, 5)), 2)
+            for x0, y0, x1, y1 in cactus['spikes']:
+                pygame.draw.line(surface, (50, 100, 50), (x + x0, y + y0), (x + x1, y + y1), 2)
         for rock in self.rocks:
-            x = rock['x'] - self.camera_x
-            y = rock['y'] - self.camera_y
+            x = rock['x']
+            y = rock['y']
 
-            pygame.draw.circle(self.screen, (80, 80, 80),
+            pygame.draw.circle(surface, (80, 80, 80),
                                (int(x + 3), int(y + 3)), rock['size'] // 2)
 
-            pygame.draw.circle(self.screen, rock['color'],
+            pygame.draw.circle(surface, rock['color'],
                                (int(x), int(y)), rock['size'] // 2)
 
-            for _ in range(rock['size'] // 5):
-                tx = x + random.randint(-rock['size'] // 2, rock['size'] // 2)
-                ty = y + random.randint(-rock['size'] // 2, rock['size'] // 2)
-                pygame.draw.circle(self.screen, (100, 100, 100), (int(tx), int(ty)), 2)
+            for tx, ty in rock['dots']:
+                pygame.draw.circle(surface, (100, 100, 100), (int(x + tx), int(y + ty)), 2)
 
-        pygame.draw.circle(self.screen, (255, 255, 200), (700, 80), 40)
-        pygame.draw.circle(self.screen, (255, 240, 150), (700, 80), 35)
+        pygame.draw.circle(surface, (255, 255, 200), (700, 80), 40)
+        pygame.draw.circle(surface, (255, 240, 150), (700, 80), 35)
 
         for angle in range(0, 360, 30):
             rad = math.radians(angle)
@@ -226,98 +289,59 @@ class GameClient:
             start_y = 80 + 45 * math.sin(rad)
             end_x = 700 + 60 * math.cos(rad)
             end_y = 80 + 60 * math.sin(rad)
-            pygame.draw.line(self.screen, (255, 240, 150, 150),
+            pygame.draw.line(surface, (255, 240, 150, 150),
                              (start_x, start_y), (end_x, end_y), 3)
 
+    def draw_desert_background(self, blit=True):
+        """Blit the baked background, re-rendering it first if it was invalidated.
+
+        Returns True when the background changed since the last call.
+        """
+        # The scene is rendered once into a display-format surface and then
+        # blitted each frame; invalidate_background() schedules a re-render.
+        changed = self.background is None or bool(self.background_dirty)
+        if self.background is None:
+            self.background = pygame.Surface(self.desert_pattern.get_size()).convert()
+            self.render_background(self.background)
+            self.background_dirty.clear()
+        for rect in self.background_dirty:
+            self.background.set_clip(rect)
+            self.render_background(self.background)
+        if self.background_dirty:
+            self.background.set_clip(None)
+            self.background_dirty.clear()
+        if blit:
+            self.screen.blit(self.background, (-self.camera_x, -self.camera_y))
+        return changed
+
     def draw_player(self, x, y, player_id, is_current_player=False):
         colors = self.player_colors.get(player_id, self.default_color)
 
         screen_x = x - self.camera_x
         screen_y = y - self.camera_y
-        
-        if is_current_player and self.hit_flash and self.is_invulnerable:
-
-            if pygame.time.get_ticks() % 200 < 100:  
-                flash_multiplier = 1.5
-                body_color = tuple(min(255, int(c * 1.5)) for c in colors['body'])
-                hat_color = tuple(min(255, int(c * 1.5)) for c in colors['hat'])
-                colors = {'body': body_color, 'hat': hat_color, 'gun': colors['gun']}
-
-        pygame.draw.circle(self.screen, (50, 50, 50, 150),
-                           (int(screen_x + 3), int(screen_y + 3)), 15)
-
-        pygame.draw.circle(self.screen, colors['body'],
-                           (int(screen_x), int(screen_y)), 15)
-
-        hat_points = [
-            (screen_x - 15, screen_y - 10),
-            (screen_x + 15, screen_y - 10),
-            (screen_x + 12, screen_y - 25),
-            (screen_x - 12, screen_y - 25)
-        ]
-        pygame.draw.polygon(self.screen, colors['hat'], hat_points)
-
-        pygame.draw.rect(self.screen, (80, 80, 80),
-                         (screen_x - 18, screen_y - 12, 36, 4))
-
-        pygame.draw.circle(self.screen, (255, 220, 180),
-                           (int(screen_x), int(screen_y - 5)), 8)
 
-        if self.player_direction == 'right' or (player_id != self.client_id and
-                                                self.other_players.get(player_id, {}).get('direction') == 'right'):
-
-            pygame.draw.circle(self.screen, (50, 50, 100),
-                               (int(screen_x + 3), int(screen_y - 5)), 3)
-            pygame.draw.circle(self.screen, (50, 50, 100),
-                               (int(screen_x + 8), int(screen_y - 7)), 2)
-        else:
-            pygame.draw.circle(self.screen, (50, 50, 100),
-                               (int(screen_x - 3), int(screen_y - 5)), 3)
-            pygame.draw.circle(self.screen, (50, 50, 100),
-                               (int(screen_x - 8), int(screen_y - 7)), 2)
-
-        gun_length = 25
-        if self.player_direction == 'right' or (player_id != self.client_id and
-                                                self.other_players.get(player_id, {}).get('direction') == 'right'):
-            gun_end_x = screen_x + gun_length
-            gun_end_y = screen_y - 5
+        if is_current_player:
+            direction = self.player_direction
+            flashing = self.hit_flash and self.is_invulnerable and pygame.time.get_ticks() % 200 < 100
         else:
-            gun_end_x = screen_x - gun_length
-            gun_end_y = screen_y - 5
-        pygame.draw.line(self.screen, colors['gun'],
-                         (screen_x, screen_y - 5),
-                         (gun_end_x, gun_end_y), 5)
-
-        pygame.draw.rect(self.screen, (100, 70, 30),
-                         (screen_x - 3, screen_y - 8, 6, 10))
+            direction = self.other_players.get(player_id, {}).get('direction', 'right')
+            flashing = False
+        half = PLAYER_SPRITE_SIZE // 2
+        rects = [self.screen.blit(self.sprites.player(colors, direction, flashing),
+                                  (screen_x - half, screen_y - half))]
 
         if is_current_player:
             pulse = abs(math.sin(time.time() * 3)) * 10
-            glow_surf = pygame.Surface((40, 40), pygame.SRCALPHA)
-            pygame.draw.circle(glow_surf, (255, 255, 255, 50),
-                               (20, 20), 15 + pulse)
-            self.screen.blit(glow_surf, (screen_x - 20, screen_y - 20))
-
-            you_text = self.font_tiny.render("YOU", True, (255, 255, 255))
-            self.screen.blit(you_text, (screen_x - you_text.get_width() // 2, screen_y - 45))
+            rects.append(self.screen.blit(self.sprites.glow(pulse), (screen_x - 20, screen_y - 20)))
+            label = self.sprites.label("YOU", (255, 255, 255))
         else:
-            id_text = self.font_tiny.render(f"Cowboy {player_id}", True, (255, 255, 200))
-            self.screen.blit(id_text, (screen_x - id_text.get_width() // 2, screen_y - 45))
+            label = self.sprites.label(f"Cowboy {player_id}", (255, 255, 200))
+        rects.append(self.screen.blit(label, (screen_x - label.get_width() // 2, screen_y - 45)))
+        return rects
 
     def draw_bullet(self, x, y, dx, dy):
-        screen_x = x - self.camera_x
-        screen_y = y - self.camera_y
-
-        trail_length = 10
-        for i in range(trail_length):
-            trail_x = screen_x - dx * i * 2
-            trail_y = screen_y - dy * i * 2
-            alpha = 255 * (1 - i / trail_length)
-            pygame.draw.circle(self.screen, (255, 255, 100, int(alpha)),
-                               (int(trail_x), int(trail_y)), 2)
-
-        pygame.draw.circle(self.screen, (255, 255, 0), (int(screen_x), int(screen_y)), 3)
-        pygame.draw.circle(self.screen, (255, 200, 0), (int(screen_x), int(screen_y)), 2)
+        half = BULLET_SPRITE_SIZE // 2
+        return self.screen.blit(self.sprites.bullet(dx, dy), (x - self.camera_x - half, y - self.camera_y - half))
 
     def update_camera(self):
         self.camera_x = self.player_pos[0] - 400
@@ -330,6 +354,14 @@ class GameClient:
             self.socket = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
             self.socket.settimeout(5)
             self.socket.connect((HOST, PORT))
+            self.codec = Codec.JSON
+            self.snapshot_history = SnapshotHistory()
+            self.interpolator.clear()
+            join_data = {'codecs': [self.wire_codec, Codec.JSON]}
+            if ROOM_ID is not None:
+                join_data['room_id'] = ROOM_ID
+            join_packet = GamePacket(OpCode.JOIN, 0, join_data)
+            self.socket.sendall(join_packet.to_frame())
             self.connected = True
             return True
         except Exception as e:
@@ -338,16 +370,18 @@ class GameClient:
             return False
 
     def receive_messages(self):
+        decoder = FrameDecoder()
         while self.running and self.connected:
             try:
-                data = self.socket.recv(1024)
-                if not data:
+                frames = decoder.recv_frames(self.socket)
+                if frames is None:
                     self.connected = False
                     break
 
-                packet = GamePacket.from_json(data)
-                if packet:
-                    self.handle_packet(packet)
+                for frame in frames:
+                    packet = GamePacket.decode(frame)
+                    if packet:
+                        self.handle_packet(packet)
 
             except socket.timeout:
                 continue
@@ -357,36 +391,76 @@ class GameClient:
 
     def handle_packet(self, packet):
         if packet.op_code == OpCode.JOIN:
-            if 'assigned_id' in packet.data:
+            if 'error' in packet.data:
+                self.connection_error = packet.data['error']
+                self.connected = False
+            elif 'assigned_id' in packet.data:
                 self.client_id = packet.data['assigned_id']
+                self.codec = packet.data.get('codec', Codec.JSON)
                 if 'spawn_x' in packet.data and 'spawn_y' in packet.data:
                     self.player_pos = [packet.data['spawn_x'], packet.data['spawn_y']]
-                print(f"🤠 Welcome Cowboy {self.client_id}!")
+                    self.predictor.reset(*self.player_pos)
+                log.info("🤠 Welcome Cowboy %s to %s!", self.client_id, packet.data.get('room_id', 'the desert'))
 
         elif packet.op_code == OpCode.MOVE:
             player_id = packet.sender_id
-
-            print(f"📡 RECEIVED MOVE from player {player_id}:")
-            print(f"   Position: ({packet.data.get('x', 400)}, {packet.data.get('y', 300)})")
-            print(f"   Health: {packet.data.get('health', 100)}")
-
-            self.other_players[player_id] = {
-                'x': packet.data.get('x', 400),
-                'y': packet.data.get('y', 300),
-                'health': packet.data.get('health', 100),
-                'direction': packet.data.get('direction', 'right')
-            }
-
-            print(f"📊 Now tracking {len(self.other_players)} other players")
+            if player_id == self.client_id:
+                # With --tick-rate 0 the server only answers our INPUTs when
+                # it moved us somewhere other than we predicted.
+                if 'input_seq' in packet.data:
+                    self.predictor.reconcile(packet.data['x'], packet.data['y'], packet.data['input_seq'])
+                return
+
+            x, y = packet.data.get('x', 400), packet.data.get('y', 300)
+            player = self.other_players.get(player_id)
+            if player is None:
+                player = self.other_players[player_id] = RemotePlayer(x=x, y=y)
+            player.health = packet.data.get('health', 100)
+            player.direction = packet.data.get('direction', 'right')
+            self.interpolator.push(player_id, x, y, time.monotonic())
+
+            log.debug("📡 MOVE from player %s: (%s, %s) health %s, tracking %d players",
+                      player_id, packet.data.get('x'), packet.data.get('y'), packet.data.get('health'),
+                      len(self.other_players))
+
+        elif packet.op_code == OpCode.SNAPSHOT:
+            # Snapshots are deltas against the last tick we acknowledged; if
+            # that baseline is gone, wait for the server to fall back to full.
+            baseline_tick = packet.data.get('baseline', 0)
+            baseline = self.snapshot_history.get(baseline_tick) if baseline_tick else {}
+            if baseline is None:
+                return
+            tick = packet.data['tick']
+            state = apply_snapshot(baseline, packet.data)
+            self.snapshot_history.add(tick, state)
+            self.send_packet(OpCode.ACK, {'tick': tick})
+
+            now = time.monotonic()
+            self.interpolator.mark_tick(tick, now)
+            for player_id in packet.data.get('removed', []):
+                self.other_players.pop(player_id, None)
+                self.interpolator.remove(player_id)
+            for player_id, *fields in packet.data.get('players', []):
+                x, y, health, direction, input_seq = state[player_id]
+                if player_id == self.client_id:
+                    self.predictor.reconcile(x, y, input_seq)
+                    continue
+                player = self.other_players.get(player_id)
+                if player is None:
+                    player = self.other_players[player_id] = RemotePlayer(x=x, y=y)
+                elif player.health <= 0 < health:
+                    # Respawned: appear at the new spot rather than slide to it.
+                    self.interpolator.snap(player_id, x, y, now)
+                player.health, player.direction = health, direction
+            # Every player gets a sample, moved or not, so one that stopped
+            # is drawn standing still instead of extrapolated.
+            for player_id, (x, y, *_) in state.items():
+                if player_id != self.client_id:
+                    self.interpolator.push(player_id, x, y, now)
 
         elif packet.op_code == OpCode.BULLET:
-            self.bullets.append({
-                'x': packet.data.get('x', 400),
-                'y': packet.data.get('y', 300),
-                'dx': packet.data.get('dx', 0),
-                'dy': packet.data.get('dy', 0),
-                'owner': packet.sender_id
-            })
+            self.bullets.spawn(packet.data.get('x', 400), packet.data.get('y', 300),
+                               packet.data.get('dx', 0), packet.data.get('dy', 0), packet.sender_id)
 
             if packet.sender_id != self.client_id and self.shoot_sound:
                 self.shoot_sound.play()
@@ -396,63 +470,39 @@ class GameClient:
             damage = packet.data.get('damage', 10)
             shooter_id = packet.data.get('shooter_id')
 
+            self.remove_bullet_near(shooter_id, target_id)
+
             if target_id == self.client_id:
                 self.player_health -= damage
                 self.player_health = max(0, self.player_health)
-                print(f"💥 Server says you took {damage} damage! Health: {self.player_health}")
+                log.info("💥 Server says you took %s damage! Health: %s", damage, self.player_health)
+
+                self.hit_flash = True
+                self.is_invulnerable = True
+                self.invulnerability_timer = pygame.time.get_ticks()
 
                 if self.hit_sound:
                     self.hit_sound.play()
 
-                for _ in range(15):
-                    angle = random.uniform(0, 2 * math.pi)
-                    speed = random.uniform(2, 6)
-                    self.particles.append({
-                        'x': self.player_pos[0],
-                        'y': self.player_pos[1],
-                        'vx': math.cos(angle) * speed,
-                        'vy': math.sin(angle) * speed,
-                        'color': (200, 0, 0),
-                        'life': 30,
-                        'size': random.randint(2, 5)
-                    })
+                self.particles.emit(self.player_pos[0], self.player_pos[1], 15, (200, 0, 0), 30,
+                                    speed=(2, 6), size=(2, 5))
 
                 if self.player_health <= 0:
                     if self.death_sound:
                         self.death_sound.play()
 
-                    for _ in range(30):
-                        angle = random.uniform(0, 2 * math.pi)
-                        speed = random.uniform(3, 8)
-                        self.particles.append({
-                            'x': self.player_pos[0],
-                            'y': self.player_pos[1],
-                            'vx': math.cos(angle) * speed,
-                            'vy': math.sin(angle) * speed,
-                            'color': (150, 0, 0),
-                            'life': 50,
-                            'size': random.randint(3, 7)
-                        })
+                    self.particles.emit(self.player_pos[0], self.player_pos[1], 30, (150, 0, 0), 50,
+                                        speed=(3, 8), size=(3, 7))
 
             elif target_id in self.other_players:
                 self.other_players[target_id]['health'] -= damage
                 self.other_players[target_id]['health'] = max(0, self.other_players[target_id]['health'])
-                print(f"🎯 Server says player {target_id} took {damage} damage!")
+                log.debug("🎯 Server says player %s took %s damage!", target_id, damage)
 
                 if target_id in self.other_players:
                     player_data = self.other_players[target_id]
-                    for _ in range(10):
-                        angle = random.uniform(0, 2 * math.pi)
-                        speed = random.uniform(2, 5)
-                        self.particles.append({
-                            'x': player_data['x'],
-                            'y': player_data['y'],
-                            'vx': math.cos(angle) * speed,
-                            'vy': math.sin(angle) * speed,
-                            'color': (200, 0, 0),
-                            'life': 25,
-                            'size': random.randint(2, 4)
-                        })
+                    self.particles.emit(player_data.x, player_data.y, 10, (200, 0, 0), 25,
+                                        speed=(2, 5), size=(2, 4))
 
         elif packet.op_code == OpCode.SCORE_UPDATE:
             player_id = packet.data.get('player_id')
@@ -461,7 +511,7 @@ class GameClient:
 
             if player_id == self.client_id:
                 self.player_score = score
-                print(f"💰 Your score updated: ${score} (Kills: {kills})")
+                log.info("💰 Your score updated: $%s (Kills: %s)", score, kills)
             elif player_id in self.other_players:
                 
                 pass
@@ -474,18 +524,21 @@ class GameClient:
                 self.hit_flash = False
                 if 'x' in packet.data and 'y' in packet.data:
                     self.player_pos = [packet.data.get('x', 400), packet.data.get('y', 300)]
-                print("🤠 You respawned!")
+                    self.predictor.reset(*self.player_pos)
+                log.info("🤠 You respawned!")
             elif player_id in self.other_players:
                 self.other_players[player_id]['health'] = 100
                 if 'x' in packet.data and 'y' in packet.data:
                     self.other_players[player_id]['x'] = packet.data.get('x', 400)
                     self.other_players[player_id]['y'] = packet.data.get('y', 300)
+                    self.interpolator.snap(player_id, packet.data['x'], packet.data['y'], time.monotonic())
 
         elif packet.op_code == OpCode.DISCONNECT:
             player_id = packet.sender_id
             if player_id in self.other_players:
-                print(f"👋 Cowboy {player_id} left the desert")
+                log.info("👋 Cowboy %s left the desert", player_id)
                 del self.other_players[player_id]
+            self.interpolator.remove(player_id)
 
     def send_packet(self, op_code, data):
         if not self.connected or not self.client_id:
@@ -493,110 +546,80 @@ class GameClient:
 
         try:
             packet = GamePacket(op_code, self.client_id, data)
-            self.socket.send(packet.to_json())
+            # ACKs go out from the receive thread, so sends are serialized.
+            with self.send_lock:
+                if TRACE_PACKETS:
+                    self.packet_seq += 1
+                    packet.seq, packet.ts = self.packet_seq, time.time()
+                self.socket.sendall(packet.to_frame(self.codec))
+                self.packets_sent += 1
+                if op_code == OpCode.INPUT:
+                    self.inputs_sent += 1
         except:
             self.connected = False
 
-    def update_bullets(self):
-        for bullet in self.bullets[:]:
-            bullet['x'] += bullet['dx'] * 8
-            bullet['y'] += bullet['dy'] * 8
-
-            if bullet['owner'] != self.client_id and self.player_health > 0:
-                distance = math.sqrt((bullet['x'] - self.player_pos[0]) ** 2 +
-                                     (bullet['y'] - self.player_pos[1]) ** 2)
-
-                if distance < 25: 
-                    print(f"🎯 YOU GOT HIT by player {bullet['owner']}!")
-                    print(f"💥 Health before: {self.player_health}")
-
-
-                    self.player_health -= 10
-                    if self.player_health < 0:
-                        self.player_health = 0
-
-                    print(f"💔 Health after: {self.player_health}")
-
-                    self.hit_flash = True
-                    self.is_invulnerable = True
-                    self.invulnerability_timer = pygame.time.get_ticks()
-
-                    if self.hit_sound:
-                        self.hit_sound.play()
-
-                    for _ in range(15):
-                        angle = random.uniform(0, 2 * math.pi)
-                        speed = random.uniform(2, 6)
-                        self.particles.append({
-                            'x': self.player_pos[0],
-                            'y': self.player_pos[1],
-                            'vx': math.cos(angle) * speed,
-                            'vy': math.sin(angle) * speed,
-                            'color': (200, 0, 0),
-                            'life': 30,
-                            'size': random.randint(2, 5)
-                        })
-
-
-                    self.send_packet(OpCode.HIT, {
-                        'target_id': self.client_id,
-                        'damage': 10,
-                        'shooter_id': bullet['owner']
-                    })
-
-
-                    self.bullets.remove(bullet)
-                    continue
-
-
-            if bullet['owner'] == self.client_id:
-                for player_id, player_data in self.other_players.items():
-                    if player_data['health'] > 0:
-                        distance = math.sqrt((bullet['x'] - player_data['x']) ** 2 +
-                                             (bullet['y'] - player_data['y']) ** 2)
-
-                        if distance < 25:  
-                            print(f"🎯 YOU HIT player {player_id}!")
-
-        
-                            self.send_packet(OpCode.HIT, {
-                                'target_id': player_id,
-                                'damage': 10,
-                                'shooter_id': self.client_id
-                            })
-
-
-                            for _ in range(10):
-                                angle = random.uniform(0, 2 * math.pi)
-                                speed = random.uniform(2, 5)
-                                self.particles.append({
-                                    'x': player_data['x'],
-                                    'y': player_data['y'],
-                                    'vx': math.cos(angle) * speed,
-                                    'vy': math.sin(angle) * speed,
-                                    'color': (200, 0, 0),
-                                    'life': 25,
-                                    'size': random.randint(2, 4)
-                                })
-
-
-                            self.bullets.remove(bullet)
-                            break
+    def bullet_targets(self):
+        """Ids and an (n, 2) position array of every living player, us included."""
+        players = [(player_id, player_data.x, player_data.y)
+                   for player_id, player_data in list(self.other_players.items()) if player_data.health > 0]
+        if self.client_id and self.player_health > 0:
+            players.append((self.client_id, self.player_pos[0], self.player_pos[1]))
+        if not players:
+            return np.empty(0, dtype=np.int64), np.empty((0, 2), dtype=np.float32)
+        ids, xs, ys = zip(*players)
+        return np.array(ids, dtype=np.int64), np.column_stack((xs, ys)).astype(np.float32)
 
+    def update_bullets(self):
+        # Hits are decided by the server and arrive as HIT packets. Locally a
+        # bullet just stops at the first player it reaches so it does not
+        # appear to fly through them.
+        self.bullets.update(*self.bullet_targets())
+
+    def remove_bullet_near(self, shooter_id, target_id):
+        """Retire the shooter's bullet closest to a player the server says it hit."""
+        if target_id == self.client_id:
+            target_x, target_y = self.player_pos
+        elif target_id in self.other_players:
+            target_x, target_y = self.other_players[target_id].x, self.other_players[target_id].y
+        else:
+            return
+        # update_bullets removes it; this runs on the receive thread.
+        self.bullets.mark_spent_near(shooter_id, target_x, target_y, HIT_RADIUS * 2)
+
+    def send_inputs(self):
+        """Send the inputs gathered since the last send, if one is due.
+
+        Movement goes out at most SEND_RATE times a second however fast the
+        client draws; a player standing still sends a no-op input every
+        HEARTBEAT_INTERVAL, or as soon as the send rate allows after turning.
+        """
+        now = time.monotonic()
+        if not self.input_coalescer.due(now, self.player_direction != self.sent_direction):
+            return
+        inputs = self.input_coalescer.take(now)
+        if not inputs:
+            seq, _, _ = self.predictor.apply(0, 0, 0)
+            inputs = [(seq, 0, 0, 0)]
+        self.sent_direction = self.player_direction
+        for seq, move_x, move_y, dt_ms in inputs:
+            self.send_packet(OpCode.INPUT, {
+                'seq': seq,
+                'move_x': move_x,
+                'move_y': move_y,
+                'dt_ms': dt_ms,
+                'direction': self.player_direction
+            })
 
-            if (bullet['x'] < 0 or bullet['x'] > 800 or
-                    bullet['y'] < 0 or bullet['y'] > 600):
-                self.bullets.remove(bullet)
+    def update_remote_players(self):
+        # Other players are drawn where the interpolator puts them, not at
+        # the newest position a packet reported.
+        for player_id, (x, y) in self.interpolator.positions(time.monotonic()).items():
+            player = self.other_players.get(player_id)
+            if player is not None:
+                player.x, player.y = x, y
 
     def update_particles(self):
-        for particle in self.particles[:]:
-            particle['x'] += particle['vx']
-            particle['y'] += particle['vy']
-            particle['vy'] += 0.1  # Gravity
-            particle['life'] -= 1
-
-            if particle['life'] <= 0:
-                self.particles.remove(particle)
+        self.particles.update()
 
     def shoot_bullet(self, target_x, target_y):
         current_time = pygame.time.get_ticks()
@@ -615,34 +638,20 @@ class GameClient:
             'x': self.player_pos[0] + dx * 20,
             'y': self.player_pos[1] + dy * 20,
             'dx': dx,
-            'dy': dy
+            'dy': dy,
+            'tick': self.interpolator.render_tick(time.monotonic())
         }
 
         self.send_packet(OpCode.ATTACK, bullet_data)
 
-        self.bullets.append({
-            'x': bullet_data['x'],
-            'y': bullet_data['y'],
-            'dx': dx,
-            'dy': dy,
-            'owner': self.client_id
-        })
+        self.bullets.spawn(bullet_data['x'], bullet_data['y'], dx, dy, self.client_id)
 
         if self.shoot_sound:
             self.shoot_sound.play()
 
-        for _ in range(8):
-            angle = random.uniform(math.atan2(dy, dx) - 0.3, math.atan2(dy, dx) + 0.3)
-            speed = random.uniform(2, 5)
-            self.particles.append({
-                'x': bullet_data['x'],
-                'y': bullet_data['y'],
-                'vx': math.cos(angle) * speed,
-                'vy': math.sin(angle) * speed,
-                'color': (255, 200, 100),
-                'life': 15,
-                'size': random.randint(2, 4)
-            })
+        heading = math.atan2(dy, dx)
+        self.particles.emit(bullet_data['x'], bullet_data['y'], 8, (255, 200, 100), 15,
+                            speed=(2, 5), size=(2, 4), angle=(heading - 0.3, heading + 0.3))
 
     def draw_life_bar(self):
         bar_width = 200
@@ -671,37 +680,35 @@ class GameClient:
         pygame.draw.rect(self.screen, (255, 255, 255),
                          (bar_x, bar_y, bar_width, bar_height), 2)
 
-        font = pygame.font.Font(None, 24)
-        health_text = font.render(f"HP: {self.player_health}/100",
-                                  True, (255, 255, 255))
+        health_text = self.text.render(self.font_small, f"HP: {self.player_health}/100", (255, 255, 255))
         self.screen.blit(health_text, (bar_x, bar_y + bar_height + 5))
 
     def draw_ui(self):
         if not self.connected:
-            error_text = self.font_medium.render("NOT CONNECTED", True, (255, 0, 0))
+            error_text = self.text.render(self.font_medium, "NOT CONNECTED", (255, 0, 0))
             self.screen.blit(error_text, (400, 300))
 
         player_count = len(self.other_players) + 1
-        count_text = self.font_large.render(f"Players: {player_count}", True,
-                                            (255, 255, 255) if player_count > 1 else (255, 100, 100))
+        count_text = self.text.render(self.font_large, f"Players: {player_count}",
+                                      (255, 255, 255) if player_count > 1 else (255, 100, 100))
         self.screen.blit(count_text, (600, 100))
 
         self.draw_life_bar()
 
         pygame.draw.rect(self.screen, (200, 180, 140), (20, 60, 200, 40))
         pygame.draw.rect(self.screen, (150, 120, 90), (20, 60, 200, 40), 3)
-        score_text = self.font_medium.render(f"BOUNTY: ${self.player_score}", True, (50, 30, 10))
+        score_text = self.text.render(self.font_medium, f"BOUNTY: ${self.player_score}", (50, 30, 10))
         self.screen.blit(score_text, (30, 68))
 
         if self.player_score > 0:
-            kills_text = self.font_small.render(f"ELIMINATIONS: {self.player_score // 100}", True, (200, 50, 50))
+            kills_text = self.text.render(self.font_small, f"ELIMINATIONS: {self.player_score // 100}", (200, 50, 50))
             self.screen.blit(kills_text, (30, 95))
 
         if self.client_id:
-            id_text = self.font_small.render(f"COWBOY #{self.client_id}", True, (255, 255, 200))
+            id_text = self.text.render(self.font_small, f"COWBOY #{self.client_id}", (255, 255, 200))
             self.screen.blit(id_text, (20, 110))
 
-        players_text = self.font_small.render(f"PLAYERS: {len(self.other_players) + 1}", True, (200, 200, 200))
+        players_text = self.text.render(self.font_small, f"PLAYERS: {len(self.other_players) + 1}", (200, 200, 200))
         self.screen.blit(players_text, (20, 140))
 
         cooldown_percent = min(1.0, (pygame.time.get_ticks() - self.last_shot) / self.shot_cooldown)
@@ -710,8 +717,8 @@ class GameClient:
         pygame.draw.rect(self.screen, (80, 80, 80), (680, 20, 104, 20))
         pygame.draw.rect(self.screen, (100, 200, 255), (682, 22, ammo_width, 16))
 
-        ammo_text = self.font_tiny.render("READY" if cooldown_percent >= 1.0 else "RELOADING",
-                                          True, (255, 255, 200))
+        ammo_text = self.text.render(self.font_tiny, "READY" if cooldown_percent >= 1.0 else "RELOADING",
+                                     (255, 255, 200))
         self.screen.blit(ammo_text, (690, 24))
 
         pygame.draw.rect(self.screen, (150, 120, 90), (600, 50, 180, 120))
@@ -725,23 +732,23 @@ class GameClient:
         ]
 
         for i, text in enumerate(controls):
-            control_text = self.font_tiny.render(text, True, (255, 255, 200))
+            control_text = self.text.render(self.font_tiny, text, (255, 255, 200))
             self.screen.blit(control_text, (610, 60 + i * 25))
 
     def draw_connection_screen(self):
         self.draw_desert_background()
-        title_shadow = self.font_large.render("DESERT DUEL", True, (100, 50, 0))
-        title_text = self.font_large.render("DESERT DUEL", True, (255, 200, 100))
+        title_shadow = self.text.render(self.font_large, "DESERT DUEL", (100, 50, 0))
+        title_text = self.text.render(self.font_large, "DESERT DUEL", (255, 200, 100))
         self.screen.blit(title_shadow, (403, 103))
         self.screen.blit(title_text, (400, 100))
 
-        subtitle = self.font_medium.render("RETRO SHOOTOUT", True, (255, 255, 200))
+        subtitle = self.text.render(self.font_medium, "RETRO SHOOTOUT", (255, 255, 200))
         self.screen.blit(subtitle, (400 - subtitle.get_width() // 2, 160))
         if self.connection_error:
-            error_text = self.font_medium.render(f"ERROR: {self.connection_error}", True, (255, 100, 100))
+            error_text = self.text.render(self.font_medium, f"ERROR: {self.connection_error}", (255, 100, 100))
             self.screen.blit(error_text, (400 - error_text.get_width() // 2, 220))
         else:
-            status_text = self.font_medium.render("CONNECTING TO SERVER...", True, (255, 255, 100))
+            status_text = self.text.render(self.font_medium, "CONNECTING TO SERVER...", (255, 255, 100))
             self.screen.blit(status_text, (400 - status_text.get_width() // 2, 220))
         pygame.draw.rect(self.screen, (200, 180, 140, 200), (150, 280, 500, 200))
         pygame.draw.rect(self.screen, (150, 120, 90), (150, 280, 500, 200), 4)
@@ -758,12 +765,170 @@ class GameClient:
 
         for i, text in enumerate(instructions):
             color = (50, 30, 10) if i == 0 else (80, 60, 40)
-            inst_text = self.font_small.render(text, True, color)
+            inst_text = self.text.render(self.font_small, text, color)
             self.screen.blit(inst_text, (400 - inst_text.get_width() // 2, 300 + i * 30))
         if int(time.time() * 2) % 2 == 0:
-            cowboy_text = self.font_medium.render("🤠 PRESS R TO RIDE IN! 🤠", True, (255, 200, 100))
+            cowboy_text = self.text.render(self.font_medium, "🤠 PRESS R TO RIDE IN! 🤠", (255, 200, 100))
             self.screen.blit(cowboy_text, (400 - cowboy_text.get_width() // 2, 500))
 
+    def draw_entities(self):
+        """Draw players, bullets and particles; returns the screen rects touched."""
+        rects = []
+        for player_id, player_data in self.other_players.items():
+            if player_data.health > 0:
+                screen_x = player_data.x - self.camera_x
+                screen_y = player_data.y - self.camera_y
+                rects.append(pygame.draw.circle(self.screen, (255, 0, 0),
+                                                (int(screen_x), int(screen_y)), 25, 2))
+                rects.extend(self.draw_player(
+                    player_data.x,
+                    player_data.y,
+                    player_id,
+                    is_current_player=False
+                ))
+
+        if self.client_id and self.player_health > 0:
+            rects.extend(self.draw_player(
+                self.player_pos[0],
+                self.player_pos[1],
+                self.client_id,
+                is_current_player=True
+            ))
+
+        for x, y, dx, dy in zip(*self.bullets.snapshot()):
+            rects.append(self.draw_bullet(x, y, dx, dy))
+
+        rects.extend(self.particles.draw(self.screen, self.camera_x, self.camera_y))
+        return rects
+
+    def debug_lines(self):
+        """(text, color) lines of the debug overlay, top to bottom from y=480."""
+        lines = []
+        if self.debug_mode:
+            mode = f"dirty, {self.shown_rects} rects" if self.dirty_rendering else "full"
+            lines.append((f"Render: {self.shown_render_ms:.1f} ms  Present: {self.shown_present_ms:.1f} ms ({mode})"
+                          f"  Text: {self.shown_text[0]} hits, {self.shown_text[1]} misses", (255, 255, 255)))
+        else:
+            lines.append(None)
+        position = (f"Your pos: ({self.player_pos[0]:.0f}, {self.player_pos[1]:.0f}) HP: {self.player_health}"
+                    f"  Corrections: {self.predictor.corrections}")
+        if self.debug_mode:
+            packets, inputs, frames = self.shown_rates
+            position += f"  Sent: {packets}/s ({inputs} INPUT) for {frames} frames/s"
+        lines.append((position, (255, 255, 255)))
+        for pid, pdata in self.other_players.items():
+            lines.append((f"Player {pid}: ({pdata.x:.0f}, {pdata.y:.0f}) HP: {pdata.health}", (255, 255, 255)))
+        if len(self.other_players) == 0:
+            lines.append(None)
+            lines.append(("Waiting for other players...", (255, 100, 100)))
+        return lines
+
+    def draw_debug_overlay(self, lines):
+        for i, line in enumerate(lines):
+            if line is not None:
+                text, color = line
+                self.screen.blit(self.text.render(self.font_tiny, text, color), (10, 480 + i * 20))
+
+    def draw_cursor(self, mouse_pos):
+        return [
+            pygame.draw.circle(self.screen, (255, 255, 255), mouse_pos, 3, 1),
+            pygame.draw.line(self.screen, (255, 255, 255),
+                             (mouse_pos[0] - 8, mouse_pos[1]),
+                             (mouse_pos[0] + 8, mouse_pos[1]), 1),
+            pygame.draw.line(self.screen, (255, 255, 255),
+                             (mouse_pos[0], mouse_pos[1] - 8),
+                             (mouse_pos[0], mouse_pos[1] + 8), 1)
+        ]
+
+    def hud_state(self):
+        """Everything draw_ui shows; the HUD is only redrawn when this changes."""
+        reload = min(100, (pygame.time.get_ticks() - self.last_shot) * 100 // self.shot_cooldown)
+        return (self.player_health, self.player_score, self.client_id, len(self.other_players), reload)
+
+    def refresh_timings(self):
+        # The readout changes a few times a second so it stays legible, and
+        # so it is not rasterized again every frame.
+        now = time.monotonic()
+        if now - self.timings_shown_at >= TIMING_REFRESH:
+            self.timings_shown_at = now
+            self.shown_render_ms, self.shown_present_ms = self.render_ms, self.present_ms
+            self.shown_rects = self.updated_rects
+            self.shown_text = (self.text.hits, self.text.misses)
+            counted_at, packets, inputs, frames = self.counted_at
+            elapsed = now - counted_at
+            self.shown_rates = (round((self.packets_sent - packets) / elapsed),
+                                round((self.inputs_sent - inputs) / elapsed),
+                                round((self.frames_rendered - frames) / elapsed))
+            self.counted_at = (now, self.packets_sent, self.inputs_sent, self.frames_rendered)
+
+    def render_full(self, mouse_pos):
+        self.refresh_timings()
+        self.draw_desert_background()
+        self.dirty_rects = self.draw_entities()
+        self.draw_ui()
+        self.draw_debug_overlay(self.debug_lines())
+        self.dirty_rects += self.draw_cursor(mouse_pos)
+        # Anything the dirty-rect path remembers is stale after a full frame.
+        self.overlay_state = {}
+
+        if self.player_health <= 0:
+            death_overlay = pygame.Surface((800, 600), pygame.SRCALPHA)
+            death_overlay.fill((0, 0, 0, 150))
+            self.screen.blit(death_overlay, (0, 0))
+
+            death_text = self.text.render(self.font_large, "YOU WERE ELIMINATED!", (255, 50, 50))
+            self.screen.blit(death_text, (400 - death_text.get_width() // 2, 250))
+
+            respawn_text = self.text.render(self.font_medium, "PRESS R TO RESPAWN", (255, 255, 100))
+            self.screen.blit(respawn_text, (400 - respawn_text.get_width() // 2, 320))
+
+    def render_dirty(self, mouse_pos):
+        """Redraw only what changed since the last frame; returns the rects to update.
+
+        Whatever was drawn last frame is covered with the cached background
+        and everything moving is drawn again. The HUD and the debug overlay
+        are redrawn only when their contents change or something moved
+        across them. Frames that change the whole screen (a rebaked
+        background, a moved camera, the death screen) fall back to a full
+        redraw.
+        """
+        camera = (self.camera_x, self.camera_y)
+        if (self.draw_desert_background(blit=False) or camera != self.last_camera or
+                self.player_health <= 0 or not self.overlay_state):
+            self.last_camera = camera
+            self.render_full(mouse_pos)
+            # The death screen covers everything, so frames stay full until
+            # the player is back.
+            if self.player_health > 0:
+                self.overlay_state = {'hud': self.hud_state(), 'debug': self.debug_lines()}
+            return None
+
+        self.refresh_timings()
+        erased = self.dirty_rects
+        for rect in erased:
+            self.screen.blit(self.background, rect, rect.move(camera))
+        drawn = self.draw_entities()
+        moved = erased + drawn
+
+        rects = list(moved)
+        overlays = [('hud', HUD_RECTS, self.hud_state(), lambda state: self.draw_ui()),
+                    ('debug', DEBUG_RECTS, self.debug_lines(), self.draw_debug_overlay)]
+        for name, regions, state, draw in overlays:
+            if state == self.overlay_state.get(name) and not any(rect.collidelist(regions) != -1 for rect in moved):
+                continue
+            self.overlay_state[name] = state
+            for region in regions:
+                self.screen.blit(self.background, region, region.move(camera))
+                self.screen.set_clip(region)
+                self.draw_entities()
+            self.screen.set_clip(None)
+            draw(state)
+            rects.extend(regions)
+
+        cursor = self.draw_cursor(mouse_pos)
+        self.dirty_rects = drawn + cursor
+        return rects + cursor
+
     def run(self):
         while self.running:
             dt = self.clock.tick(60) / 1000.0
@@ -776,7 +941,10 @@ class GameClient:
                     self.running = False
 
                 elif event.type == pygame.KEYDOWN:
-                    if event.key == pygame.K_r:
+                    if event.key == pygame.K_F2:
+                        self.dirty_rendering = not self.dirty_rendering
+                        self.overlay_state = {}
+                    elif event.key == pygame.K_r:
                         if not self.connected:
                             if self.connect_to_server():
                                 threading.Thread(target=self.receive_messages, daemon=True).start()
@@ -795,106 +963,44 @@ class GameClient:
                     self.player_direction = 'right'
                 else:
                     self.player_direction = 'left'
-                move_x, move_y = 0, 0
-                speed = 200 * dt
-
                 keys = pygame.key.get_pressed()
-                if keys[pygame.K_a]: move_x -= speed
-                if keys[pygame.K_d]: move_x += speed
-                if keys[pygame.K_w]: move_y -= speed
-                if keys[pygame.K_s]: move_y += speed
+                move_x = keys[pygame.K_d] - keys[pygame.K_a]
+                move_y = keys[pygame.K_s] - keys[pygame.K_w]
 
                 if move_x != 0 or move_y != 0:
-                    self.player_pos[0] += move_x
-                    self.player_pos[1] += move_y
-                    self.player_pos[0] = max(50, min(750, self.player_pos[0]))
-                    self.player_pos[1] = max(50, min(550, self.player_pos[1]))
-                    self.send_packet(OpCode.MOVE, {
-                        'x': self.player_pos[0],
-                        'y': self.player_pos[1],
-                        'health': self.player_health,
-                        'direction': self.player_direction
-                    })
-
+                    dt_ms = min(round(dt * 1000), MAX_INPUT_MS)
+                    seq, _, _ = self.predictor.apply(move_x, move_y, dt_ms)
+                    self.input_coalescer.add(seq, move_x, move_y, dt_ms)
+                self.send_inputs()
+            # Predicted inputs and server corrections both land in the predictor.
+            self.player_pos = list(self.predictor.position())
+
+            self.update_remote_players()
             self.update_camera()
             self.update_bullets()
             self.update_particles()
             self.update_invulnerability()
 
-            if self.connected:
-                self.draw_desert_background()
-
-                for player_id, player_data in self.other_players.items():
-                    if player_data['health'] > 0:
-                        screen_x = player_data['x'] - self.camera_x
-                        screen_y = player_data['y'] - self.camera_y
-                        pygame.draw.circle(self.screen, (255, 0, 0),
-                                           (int(screen_x), int(screen_y)), 25, 2)
-                        self.draw_player(
-                            player_data['x'],
-                            player_data['y'],
-                            player_id,
-                            is_current_player=False
-                        )
-
-                if self.client_id and self.player_health > 0:
-                    self.draw_player(
-                        self.player_pos[0],
-                        self.player_pos[1],
-                        self.client_id,
-                        is_current_player=True
-                    )
-
-                for bullet in self.bullets:
-                    self.draw_bullet(bullet['x'], bullet['y'], bullet['dx'], bullet['dy'])
-
-                for particle in self.particles:
-                    pygame.draw.circle(
-                        self.screen,
-                        particle['color'],
-                        (int(particle['x'] - self.camera_x),
-                         int(particle['y'] - self.camera_y)),
-                        particle['size']
-                    )
-
-                self.draw_ui()
-
-
-                debug_text = f"Your pos: ({self.player_pos[0]:.0f}, {self.player_pos[1]:.0f}) HP: {self.player_health}"
-                debug_surf = self.font_tiny.render(debug_text, True, (255, 255, 255))
-                self.screen.blit(debug_surf, (10, 500))
-
-                for i, (pid, pdata) in enumerate(self.other_players.items()):
-                    debug_text = f"Player {pid}: ({pdata['x']:.0f}, {pdata['y']:.0f}) HP: {pdata['health']}"
-                    debug_surf = self.font_tiny.render(debug_text, True, (255, 255, 255))
-                    self.screen.blit(debug_surf, (10, 520 + i * 20))
-
-                if len(self.other_players) == 0:
-                    debug_text = "Waiting for other players..."
-                    debug_surf = self.font_tiny.render(debug_text, True, (255, 100, 100))
-                    self.screen.blit(debug_surf, (10, 540))
-
-                pygame.draw.circle(self.screen, (255, 255, 255), mouse_pos, 3, 1)
-                pygame.draw.line(self.screen, (255, 255, 255),
-                                 (mouse_pos[0] - 8, mouse_pos[1]),
-                                 (mouse_pos[0] + 8, mouse_pos[1]), 1)
-                pygame.draw.line(self.screen, (255, 255, 255),
-                                 (mouse_pos[0], mouse_pos[1] - 8),
-                                 (mouse_pos[0], mouse_pos[1] + 8), 1)
-                if self.player_health <= 0:
-                    death_overlay = pygame.Surface((800, 600), pygame.SRCALPHA)
-                    death_overlay.fill((0, 0, 0, 150))
-                    self.screen.blit(death_overlay, (0, 0))
-
-                    death_text = self.font_large.render("YOU WERE ELIMINATED!", True, (255, 50, 50))
-                    self.screen.blit(death_text, (400 - death_text.get_width() // 2, 250))
-
-                    respawn_text = self.font_medium.render("PRESS R TO RESPAWN", True, (255, 255, 100))
-                    self.screen.blit(respawn_text, (400 - respawn_text.get_width() // 2, 320))
-            else:
+            render_start = time.perf_counter()
+            if not self.connected:
                 self.draw_connection_screen()
-
-            pygame.display.flip()
+                rects = None
+            elif self.dirty_rendering:
+                rects = self.render_dirty(mouse_pos)
+            else:
+                self.render_full(mouse_pos)
+                rects = None
+            self.render_ms = (time.perf_counter() - render_start) * 1000
+
+            present_start = time.perf_counter()
+            if rects is None:
+                pygame.display.flip()
+                self.updated_rects = 0
+            else:
+                pygame.display.update(rects)
+                self.updated_rects = len(rects)
+            self.present_ms = (time.perf_counter() - present_start) * 1000
+            self.frames_rendered += 1
         if hasattr(self, 'socket'):
             try:
                 if self.connected:
@@ -924,5 +1030,9 @@ if __name__ == "__main__":
     print("- Real-time multiplayer combat")
     print("=" * 60)
 
-    client = GameClient()
-    client.run()
+    setup_logging(LOG_LEVEL)
+    try:
+        client = GameClient()
+        client.run()
+    finally:
+        stop_logging()
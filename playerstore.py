@@ -0,0 +1,101 @@
+import threading
+from contextlib import contextmanager
+
+# Number of independently locked shards. Players are spread over them by id,
+# so threads touching different players rarely wait on each other.
+DEFAULT_STRIPES = 16
+
+
+class PlayerStore:
+    """Player records by id, sharded over striped locks.
+
+    Reads and writes of the mapping itself are safe from any thread. For a
+    read-modify-write of a record's fields (health, score, ...), hold the
+    record's stripe with ``locked(player_id)``. Iteration walks the stripes
+    one at a time and only copies a stripe's entries while holding its lock,
+    so it never sees a dict changing size and never copies the whole store
+    at once.
+    """
+
+    def __init__(self, stripes=DEFAULT_STRIPES):
+        self.stripes = [{} for _ in range(stripes)]
+        # Reentrant so code holding a record can look up another one that
+        # happens to share its stripe.
+        self.locks = [threading.RLock() for _ in range(stripes)]
+
+    def _stripe(self, player_id):
+        # Multiplicative hash, not a bare modulo: router workers hand out ids
+        # with a stride of worker_count, which would land on only a few stripes.
+        return (hash(player_id) * 2654435761 >> 16) % len(self.stripes)
+
+    def __setitem__(self, player_id, record):
+        index = self._stripe(player_id)
+        with self.locks[index]:
+            self.stripes[index][player_id] = record
+
+    def __getitem__(self, player_id):
+        record = self.get(player_id)
+        if record is None:
+            raise KeyError(player_id)
+        return record
+
+    def __delitem__(self, player_id):
+        if self.pop(player_id, None) is None:
+            raise KeyError(player_id)
+
+    def __contains__(self, player_id):
+        index = self._stripe(player_id)
+        with self.locks[index]:
+            return player_id in self.stripes[index]
+
+    def __len__(self):
+        # Each stripe's len() is atomic; the total is a moment-in-time estimate.
+        return sum(len(stripe) for stripe in self.stripes)
+
+    def __iter__(self):
+        return self.keys()
+
+    def get(self, player_id, default=None):
+        index = self._stripe(player_id)
+        with self.locks[index]:
+            return self.stripes[index].get(player_id, default)
+
+    def pop(self, player_id, default=None):
+        index = self._stripe(player_id)
+        with self.locks[index]:
+            return self.stripes[index].pop(player_id, default)
+
+    @contextmanager
+    def locked(self, player_id):
+        """Yield the record (or None) with its stripe locked."""
+        index = self._stripe(player_id)
+        with self.locks[index]:
+            yield self.stripes[index].get(player_id)
+
+    def items(self):
+        for lock, stripe in zip(self.locks, self.stripes):
+            with lock:
+                entries = list(stripe.items())
+            yield from entries
+
+    def keys(self):
+        for player_id, _ in self.items():
+            yield player_id
+
+    def values(self):
+        for _, record in self.items():
+            yield record
+
+    def collect(self, read):
+        """{player_id: read(record)}, each record read under its stripe lock.
+
+        Players for which ``read`` returns None are left out.
+        """
+        result = {}
+        for lock, stripe in zip(self.locks, self.stripes):
+            with lock:
+                for player_id, record in stripe.items():
+                    value = read(record)
+                    if value is not None:
+                        result[player_id] = value
+        return result
@@ -1,5 +1,15 @@
 import json
+import struct
+import threading
 import time
+
+# Every packet on the wire is prefixed with its payload length so a reader can
+# split a TCP byte stream back into packets no matter how it was segmented.
+FRAME_HEADER = struct.Struct('!I')
+MAX_FRAME_SIZE = 64 * 1024
+RECV_BUFFER_SIZE = 64 * 1024
+
+
 class OpCode:
     JOIN = "JOIN"
     MOVE = "MOVE"
@@ -8,26 +18,322 @@ class OpCode:
     HIT = "HIT"
     RESPAWN = "RESPAWN"
     DISCONNECT = "DISCONNECT"
-    SCORE_UPDATE = "SCORE_UPDATE" 
+    SCORE_UPDATE = "SCORE_UPDATE"
+    SNAPSHOT = "SNAPSHOT"
+    ACK = "ACK"
+    INPUT = "INPUT"
+
+
+class Codec:
+    JSON = "json"
+    BINARY = "binary"
+
+
+# Codecs this build can speak, in order of preference.
+SUPPORTED_CODECS = [Codec.BINARY, Codec.JSON]
+
+# Binary packets start with a byte that can never open a JSON document, so a
+# receiver can tell the two encodings apart from the first byte of a frame.
+BINARY_MAGIC = 0xB5
+BINARY_HEADER = struct.Struct('!BBI')
+JSON_BODY_FLAG = 0x80
+# Set when the header is followed by a trace block: sequence number and the
+# sender's wall-clock send time. Only sent while latency tracing is on.
+TRACE_FLAG = 0x40
+TRACE_HEADER = struct.Struct('!Id')
+
+OP_IDS = {
+    OpCode.JOIN: 1,
+    OpCode.MOVE: 2,
+    OpCode.ATTACK: 3,
+    OpCode.BULLET: 4,
+    OpCode.HIT: 5,
+    OpCode.RESPAWN: 6,
+    OpCode.DISCONNECT: 7,
+    OpCode.SCORE_UPDATE: 8,
+    OpCode.SNAPSHOT: 9,
+    OpCode.ACK: 10,
+    OpCode.INPUT: 11,
+}
+OP_NAMES = {op_id: op_code for op_code, op_id in OP_IDS.items()}
+
+DIRECTIONS = ['right', 'left']
+DIRECTION_IDS = {direction: i for i, direction in enumerate(DIRECTIONS)}
+
+# Fixed body layouts for the high-rate packets. Positions travel as float32,
+# health and damage as int16 and player ids as uint32. Packets whose data does
+# not match the layout exactly fall back to a JSON body inside a binary frame.
+BINARY_LAYOUTS = {
+    OpCode.MOVE: (struct.Struct('!ffhB'), ('x', 'y', 'health', 'direction')),
+    # tick: the last snapshot the shooter had applied, for lag compensation.
+    OpCode.ATTACK: (struct.Struct('!ffffI'), ('x', 'y', 'dx', 'dy', 'tick')),
+    OpCode.BULLET: (struct.Struct('!ffff'), ('x', 'y', 'dx', 'dy')),
+    OpCode.HIT: (struct.Struct('!IhI'), ('target_id', 'damage', 'shooter_id')),
+    OpCode.RESPAWN: (struct.Struct('!ffh'), ('x', 'y', 'health')),
+    OpCode.SCORE_UPDATE: (struct.Struct('!IiI'), ('player_id', 'score', 'kills')),
+    OpCode.ACK: (struct.Struct('!I'), ('tick',)),
+    # One movement input: keys held (-1, 0 or 1 per axis) for dt_ms.
+    OpCode.INPUT: (struct.Struct('!IbbHB'), ('seq', 'move_x', 'move_y', 'dt_ms', 'direction')),
+}
+
+
+# SNAPSHOT bodies are the tick, the tick they are a delta against (0 for a full
+# snapshot), one entry per changed player and the ids of removed players. An
+# entry is [player_id, x, y, health, direction, input_seq]; a field set to None
+# is left out of the binary form and flagged absent in the entry's bit mask.
+# input_seq is the player's newest INPUT the server has applied.
+SNAPSHOT_HEADER = struct.Struct('!IIH')
+SNAPSHOT_REMOVED_HEADER = struct.Struct('!H')
+SNAPSHOT_FIELD_FORMATS = ('f', 'f', 'h', 'B', 'I')
+SNAPSHOT_ENTRY_STRUCTS = [
+    struct.Struct('!IB' + ''.join(fmt for bit, fmt in enumerate(SNAPSHOT_FIELD_FORMATS) if mask & (1 << bit)))
+    for mask in range(1 << len(SNAPSHOT_FIELD_FORMATS))
+]
+DIRECTION_FIELD = 3
+
+
+def pack_snapshot(data):
+    if len(data) != 4:
+        raise ValueError("unexpected snapshot fields")
+    entries = data['players']
+    parts = [SNAPSHOT_HEADER.pack(data['tick'], data['baseline'], len(entries))]
+    for entry in entries:
+        mask = 0
+        values = []
+        for bit, value in enumerate(entry[1:]):
+            if value is not None:
+                mask |= 1 << bit
+                values.append(DIRECTION_IDS[value] if bit == DIRECTION_FIELD else value)
+        parts.append(SNAPSHOT_ENTRY_STRUCTS[mask].pack(entry[0], mask, *values))
+    removed = data['removed']
+    parts.append(SNAPSHOT_REMOVED_HEADER.pack(len(removed)))
+    parts.append(struct.pack(f'!{len(removed)}I', *removed))
+    return b''.join(parts)
+
+
+def unpack_snapshot(body):
+    tick, baseline, count = SNAPSHOT_HEADER.unpack_from(body)
+    offset = SNAPSHOT_HEADER.size
+    entries = []
+    for _ in range(count):
+        entry_struct = SNAPSHOT_ENTRY_STRUCTS[body[offset + 4]]
+        player_id, mask, *present = entry_struct.unpack_from(body, offset)
+        offset += entry_struct.size
+        values = iter(present)
+        entry = [player_id]
+        for bit in range(len(SNAPSHOT_FIELD_FORMATS)):
+            if mask & (1 << bit):
+                value = next(values)
+                entry.append(DIRECTIONS[value] if bit == DIRECTION_FIELD else value)
+            else:
+                entry.append(None)
+        entries.append(entry)
+    (removed_count,) = SNAPSHOT_REMOVED_HEADER.unpack_from(body, offset)
+    removed = list(struct.unpack_from(f'!{removed_count}I', body, offset + SNAPSHOT_REMOVED_HEADER.size))
+    return {'tick': tick, 'baseline': baseline, 'players': entries, 'removed': removed}
+
+
+# Packets with a variable-length body get their own pack/unpack pair.
+BINARY_CODERS = {
+    OpCode.SNAPSHOT: (pack_snapshot, unpack_snapshot),
+}
+
+
+def negotiate_codec(offered, supported=SUPPORTED_CODECS):
+    """Pick the first codec from the peer's preference list that we support."""
+    for codec in offered or []:
+        if codec in supported:
+            return codec
+    return Codec.JSON
+
+
+class WireStats:
+    """Thread-safe counters of packet serializations, sends and snapshot bytes."""
+
+    FIELDS = ('serializations', 'sends', 'snapshot_bytes_sent', 'snapshot_bytes_full')
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.serializations = 0
+        self.sends = 0
+        self.snapshot_bytes_sent = 0
+        self.snapshot_bytes_full = 0
+
+    def record(self, serializations=0, sends=0, snapshot_bytes_sent=0, snapshot_bytes_full=0):
+        with self.lock:
+            self.serializations += serializations
+            self.sends += sends
+            self.snapshot_bytes_sent += snapshot_bytes_sent
+            self.snapshot_bytes_full += snapshot_bytes_full
+
+    def totals(self):
+        with self.lock:
+            return {field: getattr(self, field) for field in self.FIELDS}
+
+    def add(self, other):
+        self.record(**other.totals())
+
+
+class FrameError(Exception):
+    pass
+
+
+def encode_frame(payload):
+    return FRAME_HEADER.pack(len(payload)) + payload
+
+
+class FrameDecoder:
+    """Incremental decoder for length-prefixed frames.
+
+    Bytes are appended to one reusable buffer; every complete frame in it is
+    returned and partial frames are kept until the rest arrives.
+    """
+
+    def __init__(self, max_frame_size=MAX_FRAME_SIZE, recv_size=RECV_BUFFER_SIZE):
+        self.max_frame_size = max_frame_size
+        self.buffer = bytearray()
+        self._chunk = bytearray(recv_size)
+        self._chunk_view = memoryview(self._chunk)
+
+    def feed(self, data):
+        buffer = self.buffer
+        buffer += data
+        frames = []
+        offset = 0
+        available = len(buffer)
+        header_size = FRAME_HEADER.size
+
+        while available - offset >= header_size:
+            (length,) = FRAME_HEADER.unpack_from(buffer, offset)
+            if length > self.max_frame_size:
+                raise FrameError(f"frame of {length} bytes exceeds limit of {self.max_frame_size}")
+            end = offset + header_size + length
+            if end > available:
+                break
+            frames.append(bytes(buffer[offset + header_size:end]))
+            offset = end
+
+        if offset:
+            del buffer[:offset]
+        return frames
+
+    def get_buffer(self):
+        return self._chunk_view
+
+    def buffer_updated(self, nbytes):
+        """Decode ``nbytes`` that were just written into ``get_buffer()``."""
+        return self.feed(self._chunk_view[:nbytes])
+
+    def recv_frames(self, sock):
+        """Read once from ``sock`` and return the complete frames, or None on EOF."""
+        received = sock.recv_into(self._chunk)
+        if not received:
+            return None
+        return self.buffer_updated(received)
+
+    def pending(self):
+        return len(self.buffer)
 
 
 class GamePacket:
-    def __init__(self, op_code, sender_id, data):
+    def __init__(self, op_code, sender_id, data, seq=None, ts=None):
         self.op_code = op_code
         self.sender_id = sender_id
         self.data = data
+        # Optional trace fields: per-sender sequence number and time.time()
+        # at send. Left as None unless the sender has tracing enabled.
+        self.seq = seq
+        self.ts = ts
 
     def to_json(self):
-        return json.dumps({
+        obj = {
             'op_code': self.op_code,
             'sender_id': self.sender_id,
             'data': self.data
-        }).encode('utf-8')
+        }
+        if self.ts is not None:
+            obj['seq'] = self.seq or 0
+            obj['ts'] = self.ts
+        return json.dumps(obj).encode('utf-8')
+
+    def binary_header(self, op_id):
+        if self.ts is None:
+            return BINARY_HEADER.pack(BINARY_MAGIC, op_id, self.sender_id)
+        return (BINARY_HEADER.pack(BINARY_MAGIC, op_id | TRACE_FLAG, self.sender_id) +
+                TRACE_HEADER.pack(self.seq or 0, self.ts))
+
+    def to_binary(self):
+        op_id = OP_IDS[self.op_code]
+        coder = BINARY_CODERS.get(self.op_code)
+        if coder is not None:
+            try:
+                return self.binary_header(op_id) + coder[0](self.data)
+            except (KeyError, IndexError, TypeError, ValueError, struct.error):
+                pass
+
+        layout = BINARY_LAYOUTS.get(self.op_code)
+        if layout is not None and len(self.data) == len(layout[1]):
+            body_struct, fields = layout
+            try:
+                values = [self.data[field] for field in fields]
+                if 'direction' in fields:
+                    index = fields.index('direction')
+                    values[index] = DIRECTION_IDS[values[index]]
+                return self.binary_header(op_id) + body_struct.pack(*values)
+            except (KeyError, struct.error):
+                pass
+
+        body = json.dumps(self.data).encode('utf-8')
+        return self.binary_header(op_id | JSON_BODY_FLAG) + body
+
+    def encode(self, codec=Codec.JSON):
+        if codec == Codec.BINARY:
+            return self.to_binary()
+        return self.to_json()
+
+    def to_frame(self, codec=Codec.JSON):
+        return encode_frame(self.encode(codec))
 
     @staticmethod
     def from_json(data):
         try:
             obj = json.loads(data.decode('utf-8'))
-            return GamePacket(obj['op_code'], obj['sender_id'], obj['data'])
+            return GamePacket(obj['op_code'], obj['sender_id'], obj['data'], obj.get('seq'), obj.get('ts'))
         except:
             return None
+
+    @staticmethod
+    def from_binary(data):
+        try:
+            magic, op_id, sender_id = BINARY_HEADER.unpack_from(data)
+            if magic != BINARY_MAGIC:
+                return None
+            op_code = OP_NAMES[op_id & ~(JSON_BODY_FLAG | TRACE_FLAG)]
+            seq = ts = None
+            offset = BINARY_HEADER.size
+            if op_id & TRACE_FLAG:
+                seq, ts = TRACE_HEADER.unpack_from(data, offset)
+                offset += TRACE_HEADER.size
+            body = data[offset:]
+
+            if op_id & JSON_BODY_FLAG:
+                return GamePacket(op_code, sender_id, json.loads(bytes(body).decode('utf-8')), seq, ts)
+
+            coder = BINARY_CODERS.get(op_code)
+            if coder is not None:
+                return GamePacket(op_code, sender_id, coder[1](body), seq, ts)
+
+            body_struct, fields = BINARY_LAYOUTS[op_code]
+            packet_data = dict(zip(fields, body_struct.unpack(body)))
+            if 'direction' in packet_data:
+                packet_data['direction'] = DIRECTIONS[packet_data['direction']]
+            return GamePacket(op_code, sender_id, packet_data, seq, ts)
+        except:
+            return None
+
+    @staticmethod
+    def decode(data):
+        """Decode a frame payload in whichever codec it was written with."""
+        if data and data[0] == BINARY_MAGIC:
+            return GamePacket.from_binary(data)
+        return GamePacket.from_json(data)
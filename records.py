@@ -0,0 +1,86 @@
+import time
+
+
+class SlotRecord:
+    """Fixed-field record that also reads and writes like a dict.
+
+    Subclasses list their fields in ``__slots__``, so a record carries no
+    per-instance __dict__. ``record['x']`` and ``record.x`` are the same
+    field; hot loops should prefer the attribute form.
+    """
+
+    __slots__ = ()
+
+    # Item access maps straight onto the C-level attribute lookups, so
+    # record['x'] costs about what a dict lookup does. A missing field raises
+    # AttributeError rather than KeyError.
+    __getitem__ = object.__getattribute__
+    __setitem__ = object.__setattr__
+
+    def __init__(self, **fields):
+        for name, default in self.DEFAULTS.items():
+            setattr(self, name, fields.pop(name, default))
+        if fields:
+            raise TypeError(f"unknown {type(self).__name__} fields: {', '.join(fields)}")
+
+    def __contains__(self, name):
+        return name in self.DEFAULTS
+
+    def __repr__(self):
+        return f"{type(self).__name__}({', '.join(f'{k}={v!r}' for k, v in self.items())})"
+
+    def get(self, name, default=None):
+        return getattr(self, name, default)
+
+    def keys(self):
+        return self.DEFAULTS.keys()
+
+    def items(self):
+        return [(name, getattr(self, name)) for name in self.DEFAULTS]
+
+    def update(self, fields=(), **more):
+        for name, value in dict(fields, **more).items():
+            setattr(self, name, value)
+
+
+class PlayerRecord(SlotRecord):
+    """A connected player on the server: connection, room and game state."""
+
+    DEFAULTS = {
+        'socket': None,
+        'address': None,
+        'codec': None,
+        'room_id': None,
+        'acked_tick': 0,
+        'x': 0,
+        'y': 0,
+        'health': 100,
+        'score': 0,
+        'total_score': 0,
+        'username': '',
+        'kills': 0,
+        'deaths': 0,
+        'direction': 'right',
+        'last_seen': 0.0,
+        # Newest INPUT applied, and the time its movement has been simulated to.
+        'input_seq': 0,
+        'move_clock': 0.0
+    }
+    __slots__ = tuple(DEFAULTS)
+
+    def __init__(self, **fields):
+        super().__init__(**fields)
+        if not self.last_seen:
+            self.last_seen = time.time()
+
+
+class RemotePlayer(SlotRecord):
+    """What a client knows about another player."""
+
+    DEFAULTS = {
+        'x': 400,
+        'y': 300,
+        'health': 100,
+        'direction': 'right'
+    }
+    __slots__ = tuple(DEFAULTS)
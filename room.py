@@ -1,99 +1,476 @@
+import math
+import random
 import threading
-from protocol import OpCode, GamePacket
+import time
+from concurrent.futures import ThreadPoolExecutor
+from protocol import OpCode, GamePacket, WireStats
+from metrics import timed_sendall
+from playerstore import PlayerStore
+from gamelog import get_logger
+from movement import allowed_ms, limit_move, sign, step
+from snapshots import SnapshotHistory, build_snapshot_packet, player_state
+from spatial import SpatialHash
+
+DEFAULT_MAX_PLAYERS = 8
+
+# Bullet simulation. Clients move bullets 8 px per frame at 60 FPS; a bullet
+# hits the first other living player within HIT_RADIUS and is gone once it
+# leaves the arena.
+WORLD_WIDTH, WORLD_HEIGHT = 800, 600
+BULLET_SPEED = 480.0
+BULLET_DAMAGE = 10
+HIT_RADIUS = 25
+# Furthest back, in ticks, a shot is rewound to match what the shooter saw.
+MAX_REWIND_TICKS = 10
+# Bullets leave the gun this far from the shooter's centre, as clients draw them.
+MUZZLE_OFFSET = 20
+
+log = get_logger('room')
+
+
+class RoomFullError(Exception):
+    pass
 
 
 class GameRoom:
-    def __init__(self, room_id):
+    """One arena: its players, their broadcast scope and its snapshot tick.
+
+    ``players`` maps player_id to the server's player record, which carries
+    the connection ('socket'), negotiated 'codec' and game state. It is a
+    PlayerStore: game state is changed with the record's stripe held, so a
+    client thread and the tick never update the same player at once.
+    Everything a room does only touches its own players and its own locks, so
+    rooms can be ticked in parallel.
+    """
+
+    def __init__(self, room_id, max_players=DEFAULT_MAX_PLAYERS, metrics=None):
         self.room_id = room_id
-        self.players = {}
-        self.game_state = {"players": {}}
+        self.max_players = max_players
+        self.metrics = metrics
+        self.players = PlayerStore()
+        # Guards room capacity and the bullet list.
         self.lock = threading.Lock()
-        print(f"Room '{room_id}' created")
+        self.tick_count = 0
+        self.state_dirty = False
+        self.snapshot_history = SnapshotHistory()
+        # Living players' positions per tick, for rewinding shots.
+        self.position_history = SnapshotHistory()
+        self.bullets = []
+        self.stats = WireStats()
+        log.info("Room '%s' created", room_id)
 
-    def add_player(self, player_id, client_socket):
+    def is_full(self):
+        return len(self.players) >= self.max_players
+
+    def add_player(self, player_id, player, welcome=None):
         with self.lock:
-            self.players[player_id] = client_socket
-            self.game_state["players"][player_id] = {"x": 375, "y": 275, "hp": 100, "score": 0}
-        print(f"Player {player_id} joined Room {self.room_id}")
+            if len(self.players) >= self.max_players:
+                raise RoomFullError(f"room {self.room_id} is full")
+            if welcome is not None:
+                welcome(self)
+            self.players[player_id] = player
+            player['room_id'] = self.room_id
+            self.state_dirty = True
+        log.info("Player %s joined Room %s", player_id, self.room_id)
 
     def remove_player(self, player_id):
         with self.lock:
-            if player_id in self.players:
-                del self.players[player_id]
-            if player_id in self.game_state["players"]:
-                del self.game_state["players"][player_id]
-        print(f"Player {player_id} removed from Room {self.room_id}")
-
-    def broadcast(self, packet, exclude_id=None):
-        if not self.players:
+            self.players.pop(player_id)
+            self.state_dirty = True
+        log.info("Player %s removed from Room %s", player_id, self.room_id)
+
+    def members(self):
+        return list(self.players.items())
+
+    def send_to(self, player_id, packet):
+        player = self.players.get(player_id)
+        if player is None:
             return
+        try:
+            timed_sendall(self.metrics, player['socket'], packet.to_frame(player['codec']), packet.op_code)
+        except Exception as e:
+            log.warning("Failed to send %s to %s: %s", packet.op_code, player_id, e)
+        self.stats.record(serializations=1, sends=1)
+
+    def broadcast(self, packet, exclude_id=None, key=None):
+        """Send ``packet`` to every player in the room, serializing it once per codec.
 
-        message = packet.to_json()
-        dead_players = []
+        Frames sent with a ``key`` may be replaced by a newer frame with the
+        same key while still waiting in a connection's send queue.
+        """
+        frames = {}
+        sends = 0
+        for p_id, player in self.players.items():
+            if p_id == exclude_id:
+                continue
+            codec = player.codec
+            frame = frames.get(codec)
+            if frame is None:
+                frame = frames[codec] = packet.to_frame(codec)
+            try:
+                timed_sendall(self.metrics, player.socket, frame, packet.op_code, key)
+                sends += 1
+            except Exception as e:
+                log.warning("Failed to send %s to %s: %s", packet.op_code, p_id, e)
 
-        for p_id, socket in self.players.items():
-            if p_id != exclude_id:
-                try:
-                    socket.send(message)
-                except Exception as e:
-                    print(f"Failed to send to {p_id}: {e}")
-                    dead_players.append(p_id)
+        self.stats.record(serializations=len(frames), sends=sends)
 
-        for p_id in dead_players:
-            self.remove_player(p_id)
+    def handle_move(self, player_id, data, forward=False):
+        """Move a player to the absolute position in a MOVE (bots.py, older clients).
 
-    def handle_move(self, player_id, data):
+        The position is held to the arena and to the same speed limit as
+        INPUT (movement.limit_move), so a MOVE cannot teleport. Health is the
+        server's: only hits and respawns change it.
+        """
+        with self.players.locked(player_id) as player:
+            if player is None:
+                return
+            player.x, player.y, player.move_clock = limit_move(
+                player.x, player.y, data.get('x', player.x), data.get('y', player.y),
+                player.move_clock, time.monotonic())
+            player['direction'] = data.get('direction', player['direction'])
+            player['last_seen'] = time.time()
+            state = {
+                'x': player['x'],
+                'y': player['y'],
+                'health': player['health'],
+                'direction': player['direction']
+            }
+
+        if not forward:
+            # tick() sends the new state out as part of the next snapshot.
+            self.state_dirty = True
+            return
+        move_packet = GamePacket(OpCode.MOVE, player_id, state)
+        self.broadcast(move_packet, exclude_id=player_id, key=(OpCode.MOVE, player_id))
+
+    def handle_input(self, player_id, data, forward=False):
+        """Move a player by one sequenced INPUT, the way its client predicted it.
+
+        The step is cut short if the player's inputs claim more time than has
+        passed (movement.allowed_ms), and dead players do not move. The
+        input's seq goes out as input_seq in the next snapshot so the client
+        can replay what came after it. With forward, the MOVE goes to the
+        rest of the room at once, and back to the mover only when the server
+        moved it somewhere other than its prediction.
+        """
+        seq = data.get('seq', 0)
+        with self.players.locked(player_id) as player:
+            if player is None or seq <= player.input_seq:
+                return
+            dt_ms = data.get('dt_ms', 0)
+            allowed, player.move_clock = allowed_ms(player.move_clock, dt_ms, time.monotonic())
+            corrected = allowed < dt_ms or player.health <= 0
+            if player.health > 0:
+                player.x, player.y = step(player.x, player.y, sign(data.get('move_x', 0)),
+                                          sign(data.get('move_y', 0)), allowed)
+            player.direction = data.get('direction', player.direction)
+            player.input_seq = seq
+            player.last_seen = time.time()
+            sock, codec = player.socket, player.codec
+            state = {
+                'x': player.x,
+                'y': player.y,
+                'health': player.health,
+                'direction': player.direction
+            }
+
+        if not forward:
+            self.state_dirty = True
+            return
+        move_packet = GamePacket(OpCode.MOVE, player_id, state)
+        self.broadcast(move_packet, exclude_id=player_id, key=(OpCode.MOVE, player_id))
+        if corrected:
+            correction = GamePacket(OpCode.MOVE, player_id, dict(state, input_seq=seq))
+            try:
+                timed_sendall(self.metrics, sock, correction.to_frame(codec), OpCode.MOVE)
+            except Exception as e:
+                log.warning("Failed to send a correction to %s: %s", player_id, e)
+
+    def handle_attack(self, player_id, data):
+        """Start simulating a bullet and show it to the room.
+
+        ``data['tick']`` is the snapshot tick the shooter had on screen,
+        which trails the newest one it received by the client's
+        interpolation delay; the bullet is checked against where players
+        were at that tick, so a shooter with some latency hits what they saw. The
+        bullet starts at the shooter's position on the server, MUZZLE_OFFSET
+        along (dx, dy); the 'x' and 'y' a client sends are ignored, so nobody
+        can fire from somewhere they are not.
+        """
+        with self.players.locked(player_id) as player:
+            if player is None or player['health'] <= 0:
+                return
+            origin = player['x'], player['y']
+        dx, dy = data.get('dx', 0.0), data.get('dy', 0.0)
+        length = math.hypot(dx, dy)
+        if not length:
+            return
+        bullet = {
+            'owner': player_id,
+            'x': origin[0] + dx / length * MUZZLE_OFFSET,
+            'y': origin[1] + dy / length * MUZZLE_OFFSET,
+            'dx': dx / length,
+            'dy': dy / length,
+            'rewind': 0
+        }
+        # The bullet's first step runs on the next tick and should see the
+        # players as they were at view_tick.
+        view_tick = data.get('tick', 0)
+        if view_tick:
+            bullet['rewind'] = max(0, min(MAX_REWIND_TICKS, self.tick_count + 1 - view_tick))
         with self.lock:
-            if player_id in self.game_state["players"]:
-                self.game_state["players"][player_id].update(data)
-        update_packet = GamePacket(OpCode.MOVE, player_id, data)
-        self.broadcast(update_packet, exclude_id=player_id)
+            self.bullets.append(bullet)
 
-    def handle_hit(self, attacker_id, data):
-        target_id = data.get("target_id")
-        damage = data.get("damage", 10)
+        bullet_packet = GamePacket(OpCode.BULLET, player_id, {
+            'x': bullet['x'],
+            'y': bullet['y'],
+            'dx': bullet['dx'],
+            'dy': bullet['dy']
+        })
+        self.broadcast(bullet_packet)
 
-        print(f"Room: Player {attacker_id} hits Player {target_id} for {damage} damage")
+    def record_positions(self):
+        positions = self.players.collect(lambda player: (player.x, player.y) if player.health > 0 else None)
+        self.position_history.add(self.tick_count, positions)
 
+    def simulate_bullets(self, dt):
+        """Advance every bullet by ``dt`` seconds and apply the hits they make."""
         with self.lock:
-            if target_id in self.game_state["players"]:
-                if "hp" not in self.game_state["players"][target_id]:
-                    self.game_state["players"][target_id]["hp"] = 100
-                self.game_state["players"][target_id]["hp"] -= damage
-                self.game_state["players"][target_id]["hp"] = max(0, self.game_state["players"][target_id]["hp"])
-
-                print(f"Player {target_id} health now: {self.game_state['players'][target_id]['hp']}")
-                if self.game_state["players"][target_id]["hp"] <= 0:
-                    print(f"Player {target_id} has been defeated!")
-        hit_packet = GamePacket(
-            OpCode.HIT,
-            attacker_id,
-            {
-                'attacker_id': attacker_id,
-                'target_id': target_id,
-                'damage': damage,
-                'target_health': self.game_state["players"][target_id]["hp"] if target_id in self.game_state[
-                    "players"] else 0
-            }
-        )
+            bullets, self.bullets = self.bullets, []
+        if not bullets:
+            return
 
+        # Sub-step so a bullet cannot skip over a player between ticks.
+        distance = BULLET_SPEED * dt
+        steps = max(1, math.ceil(distance / HIT_RADIUS))
+        step = distance / steps
+        grids = {}
+        flying = []
+        hits = []
+        for bullet in bullets:
+            rewind = bullet['rewind']
+            grid = grids.get(rewind)
+            if grid is None:
+                positions = self.position_history.get(self.tick_count - rewind)
+                if positions is None:
+                    positions = self.position_history.get(self.tick_count) or {}
+                grid = grids[rewind] = SpatialHash(HIT_RADIUS * 2)
+                for p_id, (x, y) in positions.items():
+                    grid.insert(p_id, x, y)
+
+            target_id = None
+            for _ in range(steps):
+                bullet['x'] += bullet['dx'] * step
+                bullet['y'] += bullet['dy'] * step
+                for p_id in grid.query_radius(bullet['x'], bullet['y'], HIT_RADIUS):
+                    if p_id != bullet['owner']:
+                        target_id = p_id
+                        break
+                if target_id is not None:
+                    break
+            if target_id is not None:
+                hits.append((bullet['owner'], target_id))
+            elif 0 <= bullet['x'] <= WORLD_WIDTH and 0 <= bullet['y'] <= WORLD_HEIGHT:
+                flying.append(bullet)
+
+        with self.lock:
+            self.bullets = flying + self.bullets
+        for shooter_id, target_id in hits:
+            self.apply_hit(shooter_id, target_id, BULLET_DAMAGE)
+
+    def apply_hit(self, shooter_id, target_id, damage):
+        with self.players.locked(target_id) as target:
+            if target is None or target['health'] <= 0:
+                return
+            target['health'] = max(0, target['health'] - damage)
+            eliminated = target['health'] == 0
+            if eliminated:
+                target['deaths'] += 1
+        self.state_dirty = True
+        log.debug("🎯 Player %s hit player %s for %s damage", shooter_id, target_id, damage)
+
+        if eliminated:
+            log.info("💀 Player %s was eliminated by player %s", target_id, shooter_id)
+            # Taken after the target's stripe is released, so two stripes are
+            # never held at once.
+            with self.players.locked(shooter_id) as shooter:
+                if shooter is not None:
+                    shooter['kills'] += 1
+                    shooter['score'] += 100
+                    score = {'player_id': shooter_id, 'score': shooter['score'], 'kills': shooter['kills']}
+            if shooter is not None:
+                log.info("💰 Player %s earned 100 bounty! Total score: $%s", shooter_id, score['score'])
+                self.send_to(shooter_id, GamePacket(OpCode.SCORE_UPDATE, 0, score))
+
+        hit_packet = GamePacket(OpCode.HIT, shooter_id, {
+            'target_id': target_id,
+            'damage': damage,
+            'shooter_id': shooter_id
+        })
         self.broadcast(hit_packet)
 
-    def handle_collect(self, player_id, data):
+    def handle_respawn(self, player_id):
+        with self.players.locked(player_id) as player:
+            if player is None or player['health'] > 0:
+                return
+            player['health'] = 100
+            player['x'] = random.randint(100, 700)
+            player['y'] = random.randint(100, 500)
+            player['direction'] = 'right'
+            x, y = player['x'], player['y']
+        self.state_dirty = True
+
+        log.info("🔄 Player %s respawned at (%s, %s)", player_id, x, y)
+
+        respawn_packet = GamePacket(OpCode.RESPAWN, player_id, {
+            'x': x,
+            'y': y,
+            'health': 100
+        })
+        # Sent to the respawner too: its health is only ever set by the server.
+        self.broadcast(respawn_packet)
+
+    def handle_ack(self, player_id, data):
+        tick = data.get('tick', 0)
+        with self.players.locked(player_id) as player:
+            if player is not None and tick > player['acked_tick']:
+                player['acked_tick'] = tick
+
+    def tick(self, dt, send_snapshots=True):
+        """Advance the room ``dt`` seconds and send each player one snapshot."""
+        self.tick_count += 1
+        self.record_positions()
+        self.simulate_bullets(dt)
+        if not send_snapshots or not self.state_dirty:
+            return
+        # Clear the flag before reading state so a MOVE that lands while the
+        # snapshot is being built is picked up on the next tick.
+        self.state_dirty = False
+        members = self.members()
+        current = self.players.collect(player_state)
+        self.snapshot_history.add(self.tick_count, current)
+        self.send_snapshots(self.tick_count, current, members)
+
+    def send_snapshots(self, tick, current, members):
+        """Send each player a delta against the last snapshot it acknowledged.
+
+        Players that acknowledged the same tick share one encoded frame per
+        codec, so serializations grow with distinct baselines, not players.
+        With metrics on (--trace), each codec's full snapshot is also encoded
+        once so the stats can show what the deltas saved; that extra work is
+        not counted as a serialization.
+        """
+        frames = {}
+        full_sizes = {} if self.metrics is not None else None
+        sent_bytes = full_bytes = sends = 0
+        for p_id, player in members:
+            codec = player.codec
+            baseline_tick = player.acked_tick
+            key = (baseline_tick, codec)
+            frame = frames.get(key)
+            if frame is None:
+                baseline = self.snapshot_history.get(baseline_tick) if baseline_tick else None
+                packet = build_snapshot_packet(tick, current, baseline_tick, baseline)
+                frame = frames[key] = packet.to_frame(codec)
+            if full_sizes is not None and codec not in full_sizes:
+                full_sizes[codec] = len(build_snapshot_packet(tick, current).to_frame(codec))
+            try:
+                # Safe to supersede: a newer snapshot is a delta against a
+                # baseline the client has acknowledged, so it applies on its own.
+                timed_sendall(self.metrics, player.socket, frame, OpCode.SNAPSHOT, OpCode.SNAPSHOT)
+                sends += 1
+                sent_bytes += len(frame)
+                if full_sizes is not None:
+                    full_bytes += full_sizes[codec]
+            except Exception as e:
+                log.warning("Failed to send SNAPSHOT %s to %s: %s", tick, p_id, e)
+
+        self.stats.record(serializations=len(frames), sends=sends,
+                          snapshot_bytes_sent=sent_bytes, snapshot_bytes_full=full_bytes)
+
+
+class RoomManager:
+    """Routes players into rooms and ticks every room.
+
+    A JOIN naming a room_id goes to that room (created on first use).
+    Without one, the player is matched into the fullest room that still has
+    space, so arenas fill up before new ones open. With ``workers`` > 0,
+    rooms are ticked in parallel on a thread pool.
+    """
+
+    def __init__(self, max_players=DEFAULT_MAX_PLAYERS, workers=0, owns_room=None, metrics=None):
+        self.max_players = max_players
+        self.metrics = metrics
+        # When rooms are spread over several processes, matchmaking only opens
+        # rooms whose names this process owns.
+        self.owns_room = owns_room
+        self.rooms = {}
+        self.lock = threading.Lock()
+        self.next_room_number = 1
+        self.pool = ThreadPoolExecutor(max_workers=workers, thread_name_prefix='room') if workers else None
+        # Counters of rooms that have already been closed.
+        self.retired_stats = WireStats()
+
+    def get(self, room_id):
+        return self.rooms.get(room_id)
+
+    def join(self, player_id, player, room_id=None, welcome=None):
+        """Add a player to ``room_id`` or a matchmade room and return the room.
+
+        ``welcome(room)`` runs once the room is known to have space, before
+        the player is added, so whatever it sends reaches the player ahead
+        of any snapshot or broadcast from the room.
+        """
         with self.lock:
-            if player_id in self.game_state["players"]:
-                if "score" not in self.game_state["players"][player_id]:
-                    self.game_state["players"][player_id]["score"] = 0
-                points = data.get('points', 10)
-                self.game_state["players"][player_id]["score"] += points
-
-        collect_packet = GamePacket(
-            OpCode.COLLECT,
-            player_id,
-            {
-                'player_id': player_id,
-                'points': points,
-                'total_score': self.game_state["players"][player_id]["score"]
-            }
-        )
-        self.broadcast(collect_packet, exclude_id=player_id)
\ No newline at end of file
+            if room_id is None:
+                room = self._matchmake()
+            else:
+                room = self.rooms.get(room_id)
+                if room is None:
+                    room = self.rooms[room_id] = GameRoom(room_id, self.max_players, self.metrics)
+            room.add_player(player_id, player, welcome)
+        return room
+
+    def _matchmake(self):
+        open_rooms = [room for room in self.rooms.values() if not room.is_full()]
+        if open_rooms:
+            return max(open_rooms, key=lambda room: len(room.players))
+        while (f'arena-{self.next_room_number}' in self.rooms or
+               (self.owns_room is not None and not self.owns_room(f'arena-{self.next_room_number}'))):
+            self.next_room_number += 1
+        room_id = f'arena-{self.next_room_number}'
+        room = self.rooms[room_id] = GameRoom(room_id, self.max_players, self.metrics)
+        return room
+
+    def leave(self, player_id, room_id):
+        with self.lock:
+            room = self.rooms.get(room_id)
+            if room is None:
+                return None
+            room.remove_player(player_id)
+            if not room.players:
+                del self.rooms[room_id]
+                self.retired_stats.add(room.stats)
+                log.info("Room '%s' closed", room_id)
+        return room
+
+    def tick_all(self, dt, send_snapshots=True):
+        rooms = list(self.rooms.values())
+        if self.pool is None or len(rooms) < 2:
+            for room in rooms:
+                room.tick(dt, send_snapshots)
+        else:
+            # Wait for every room so no room is ever ticked twice at once.
+            list(self.pool.map(lambda room: room.tick(dt, send_snapshots), rooms))
+
+    def stats(self):
+        total = WireStats()
+        total.add(self.retired_stats)
+        for room in list(self.rooms.values()):
+            total.add(room.stats)
+        return total
+
+    def shutdown(self):
+        if self.pool is not None:
+            self.pool.shutdown(wait=False)
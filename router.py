@@ -0,0 +1,223 @@
+import argparse
+import bisect
+import hashlib
+import itertools
+import json
+import multiprocessing
+import os
+import socket
+import threading
+
+from protocol import OpCode, GamePacket, FrameDecoder, FrameError, MAX_FRAME_SIZE
+from server import GameServer, HOST, PORT, LISTEN_BACKLOG, DEFAULT_TICK_RATE
+from room import DEFAULT_MAX_PLAYERS
+from gamelog import get_logger, setup_logging, stop_logging
+
+# Points each worker gets on the hash ring; more points spread rooms more evenly.
+RING_REPLICAS = 64
+# How long the front door waits for a new connection's JOIN before giving up.
+JOIN_TIMEOUT = 5.0
+# A handoff carries the bytes read while waiting for JOIN: at most one full
+# frame plus one recv worth of whatever followed it.
+HANDOFF_READ_SIZE = 4096
+MAX_HANDOFF = MAX_FRAME_SIZE + HANDOFF_READ_SIZE + 1024
+
+log = get_logger('router')
+
+
+def ring_hash(key):
+    # Python's hash() is salted per process; the ring must agree across workers.
+    return int.from_bytes(hashlib.md5(key.encode()).digest()[:8], 'big')
+
+
+class HashRing:
+    """Consistent hashing of room ids onto worker indexes.
+
+    Every worker builds the same ring, so the front door and the workers agree
+    on who owns a room without talking to each other.
+    """
+
+    def __init__(self, worker_count, replicas=RING_REPLICAS):
+        points = sorted((ring_hash(f'worker-{worker}:{replica}'), worker)
+                        for worker in range(worker_count) for replica in range(replicas))
+        self.hashes = [point for point, _ in points]
+        self.workers = [worker for _, worker in points]
+
+    def lookup(self, room_id):
+        index = bisect.bisect(self.hashes, ring_hash(str(room_id))) % len(self.hashes)
+        return self.workers[index]
+
+
+def run_worker(index, worker_count, channel, options, parent_ends=()):
+    """Worker process: a GameServer that adopts connections handed over on ``channel``.
+
+    ``parent_ends`` are the front door's ends of the channels, inherited
+    through the fork; closing them lets this worker see EOF on its own
+    channel once the front door closes it.
+    """
+    for parent_end in parent_ends:
+        parent_end.close()
+    # The parent's log writer thread does not survive the fork.
+    setup_logging(options['log_level'])
+    ring = HashRing(worker_count)
+    server = GameServer(host=options['host'], port=options['port'], tick_rate=options['tick_rate'],
+                        max_room_size=options['max_room_size'],
+                        player_id_start=index + 1, player_id_step=worker_count,
+                        owns_room=lambda room_id: ring.lookup(room_id) == index)
+    threading.Thread(target=server.tick_loop, daemon=True).start()
+    log.info("🏜️  Worker %s (pid %s) ready", index, os.getpid())
+
+    try:
+        while server.running:
+            message, fds, _, _ = socket.recv_fds(channel, MAX_HANDOFF, 1)
+            if not message:
+                break
+            header, initial_data = message.split(b'\n', 1)
+            address = tuple(json.loads(header)['address'])
+            client_socket = socket.socket(fileno=fds[0])
+            client_socket.settimeout(0.1)
+            client_thread = threading.Thread(target=server.handle_client,
+                                             args=(client_socket, address, initial_data))
+            client_thread.daemon = True
+            client_thread.start()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.running = False
+        log.info("📦 Worker %s wire stats: %s", index, server.wire_stats())
+        stop_logging()
+
+
+class FrontDoor:
+    """Accepts every connection on PORT and hands it to the worker owning its room.
+
+    The front door only reads far enough to see the client's JOIN. Clients
+    naming a room_id go to ring.lookup(room_id). Clients asking for
+    matchmaking go to one worker a room's worth (max_room_size) at a time,
+    so that worker's RoomManager seats them together, and the next batch
+    goes wherever the ring puts it. The socket and the bytes already read
+    are then passed over a Unix socket (SCM_RIGHTS), so after the handoff
+    the front door is out of the data path.
+    """
+
+    def __init__(self, host=HOST, port=PORT, workers=None, tick_rate=DEFAULT_TICK_RATE,
+                 max_room_size=DEFAULT_MAX_PLAYERS, log_level='INFO'):
+        self.host = host
+        self.port = port
+        self.worker_count = workers or os.cpu_count() or 1
+        self.ring = HashRing(self.worker_count)
+        self.options = {'host': host, 'port': port, 'tick_rate': tick_rate, 'max_room_size': max_room_size,
+                        'log_level': log_level}
+        self.channels = []
+        self.channel_locks = []
+        self.processes = []
+        self.matchmaking = itertools.count()
+        self.server_socket = None
+        self.running = True
+
+    def start_workers(self):
+        for index in range(self.worker_count):
+            # SOCK_SEQPACKET keeps one handoff per message, fds included.
+            parent_end, child_end = socket.socketpair(socket.AF_UNIX, socket.SOCK_SEQPACKET)
+            process = multiprocessing.Process(target=run_worker, name=f'arena-worker-{index}',
+                                              args=(index, self.worker_count, child_end, self.options,
+                                                    self.channels + [parent_end]))
+            process.daemon = True
+            process.start()
+            child_end.close()
+            self.channels.append(parent_end)
+            self.channel_locks.append(threading.Lock())
+            self.processes.append(process)
+
+    def listen(self):
+        self.server_socket = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+        self.server_socket.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+        self.server_socket.bind((self.host, self.port))
+        self.server_socket.listen(LISTEN_BACKLOG)
+        log.info("🤠 Desert Arena front door on %s:%s with %s workers", self.host, self.port, self.worker_count)
+
+    def pick_worker(self, join_data):
+        room_id = join_data.get('room_id')
+        if room_id is None:
+            # Only a key on the ring: the worker names the room it matchmakes into.
+            room_id = f"matchmaking-{next(self.matchmaking) // self.options['max_room_size']}"
+        return self.ring.lookup(room_id)
+
+    def read_join(self, client_socket):
+        """Read until the first frame is complete; returns (join_data, bytes_read)."""
+        client_socket.settimeout(JOIN_TIMEOUT)
+        decoder = FrameDecoder()
+        received = bytearray()
+        while True:
+            chunk = client_socket.recv(HANDOFF_READ_SIZE)
+            if not chunk:
+                return None, None
+            received += chunk
+            frames = decoder.feed(chunk)
+            if frames:
+                packet = GamePacket.decode(frames[0])
+                join_data = packet.data if packet and packet.op_code == OpCode.JOIN else {}
+                return join_data, bytes(received)
+
+    def hand_off(self, client_socket, client_address):
+        try:
+            join_data, received = self.read_join(client_socket)
+            if join_data is None:
+                return
+            worker = self.pick_worker(join_data)
+            header = json.dumps({'address': list(client_address)}).encode()
+            with self.channel_locks[worker]:
+                socket.send_fds(self.channels[worker], [header + b'\n' + received], [client_socket.fileno()])
+            log.debug("🤠 %s -> worker %s (room: %s)", client_address, worker, join_data.get('room_id'))
+        except (OSError, FrameError) as e:
+            log.warning("Handoff failed for %s: %s", client_address, e)
+        finally:
+            # The worker holds its own copy of the descriptor now.
+            client_socket.close()
+
+    def run(self):
+        self.start_workers()
+        self.listen()
+        log.info("🤠 Server is running. Press Ctrl+C to stop.")
+        try:
+            while self.running:
+                client_socket, client_address = self.server_socket.accept()
+                threading.Thread(target=self.hand_off, args=(client_socket, client_address), daemon=True).start()
+        except KeyboardInterrupt:
+            log.info("🤠 Server shutting down...")
+        finally:
+            self.running = False
+            self.server_socket.close()
+            for channel in self.channels:
+                channel.close()
+            for process in self.processes:
+                process.join(timeout=2)
+                if process.is_alive():
+                    process.terminate()
+            log.info("🤠 Server stopped.")
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="Desert Arena front door with worker processes")
+    parser.add_argument('--host', default=HOST)
+    parser.add_argument('--port', type=int, default=PORT)
+    parser.add_argument('--workers', type=int, default=os.cpu_count() or 1,
+                        help="worker processes hosting rooms")
+    parser.add_argument('--tick-rate', type=float, default=DEFAULT_TICK_RATE,
+                        help="snapshots per second; 0 forwards every MOVE immediately")
+    parser.add_argument('--max-room-size', type=int, default=DEFAULT_MAX_PLAYERS,
+                        help="players per room before matchmaking opens a new one")
+    parser.add_argument('--log-level', default='INFO', choices=['DEBUG', 'INFO', 'WARNING', 'ERROR'])
+    return parser.parse_args(argv)
+
+
+if __name__ == "__main__":
+    args = parse_args()
+    setup_logging(args.log_level)
+    front_door = FrontDoor(host=args.host, port=args.port, workers=args.workers,
+                           tick_rate=args.tick_rate, max_room_size=args.max_room_size,
+                           log_level=args.log_level)
+    try:
+        front_door.run()
+    finally:
+        stop_logging()
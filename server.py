@@ -1,32 +1,74 @@
+import argparse
 import socket
 import threading
 import json
 import time
 import random
 import sqlite3
-from protocol import OpCode, GamePacket
+from protocol import OpCode, GamePacket, FrameDecoder, FrameError, WireStats, SUPPORTED_CODECS, negotiate_codec
+from room import RoomManager, RoomFullError, DEFAULT_MAX_PLAYERS
+from metrics import PacketMetrics, timed_sendall
+from outbound import OutboundQueue, OutboundStats
+from playerstore import PlayerStore
+from records import PlayerRecord
+from gamelog import get_logger, setup_logging, stop_logging
 
 HOST = '127.0.0.1'
 PORT = 5555
+LISTEN_BACKLOG = 128
+# Snapshots per second sent to every client. 0 forwards each MOVE as it arrives.
+DEFAULT_TICK_RATE = 30
 DATABASE_NAME = "game_data.db"
 
+log = get_logger('server')
 
-class GameServer:
-    def __init__(self):
-        self.server_socket = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
-        self.server_socket.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
-        self.server_socket.bind((HOST, PORT))
-        self.server_socket.listen(5)
 
-        self.clients = {}
-        self.next_player_id = 1
+class GameServer:
+    def __init__(self, host=HOST, port=PORT, codecs=SUPPORTED_CODECS, tick_rate=DEFAULT_TICK_RATE,
+                 max_room_size=DEFAULT_MAX_PLAYERS, room_workers=0,
+                 player_id_start=1, player_id_step=1, owns_room=None, metrics=None):
+        self.host = host
+        self.port = port
+        self.tick_rate = tick_rate
+        # Rooms always simulate bullets; with tick_rate 0 they do it at the
+        # default rate and skip snapshots.
+        self.simulation_rate = tick_rate or DEFAULT_TICK_RATE
+        self.server_socket = None
+
+        # Every connected player by id; which room they play in is kept in
+        # their record's 'room_id' and all game traffic is scoped to it.
+        # Client threads add and remove players concurrently, so this is a
+        # lock-striped store rather than a dict.
+        self.clients = PlayerStore()
+        # PacketMetrics while latency tracing is on, otherwise None.
+        self.metrics = metrics
+        self.rooms = RoomManager(max_players=max_room_size, workers=room_workers, owns_room=owns_room,
+                                 metrics=metrics)
+        # Worker processes behind router.py hand out interleaved ids so they
+        # stay unique across the whole host.
+        self.next_player_id = player_id_start
+        self.player_id_step = player_id_step
+        self.id_lock = threading.Lock()
         self.running = True
+        self.codecs = codecs
+
+        # Send queue counters shared by every connection's OutboundQueue.
+        self.outbound_stats = OutboundStats()
 
+        # Wire counters for traffic sent outside a room (JOIN responses and
+        # join snapshots); rooms keep their own and wire_stats() sums them.
+        self.stats = WireStats()
 
         self.init_db()
 
-        print(f"🤠 Desert Arena Server started on {HOST}:{PORT}")
-        print("Waiting for cowboys to connect...")
+    def listen(self):
+        self.server_socket = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+        self.server_socket.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+        self.server_socket.bind((self.host, self.port))
+        self.server_socket.listen(LISTEN_BACKLOG)
+
+        log.info("🤠 Desert Arena Server started on %s:%s", self.host, self.port)
+        log.info("Waiting for cowboys to connect...")
 
     def init_db(self):
         with sqlite3.connect(DATABASE_NAME) as conn:
@@ -42,7 +84,7 @@ class GameServer:
                 )
             ''')
             conn.commit()
-            print("📊 Database initialized")
+            log.info("📊 Database initialized")
 
     def save_score(self, username, score):
         try:
@@ -54,9 +96,9 @@ class GameServer:
                     WHERE username = ?
                 ''', (score, username))
                 conn.commit()
-                print(f"💾 Saved score for {username}: {score}")
+                log.debug("💾 Saved score for %s: %s", username, score)
         except Exception as e:
-            print(f"❌ Error saving score: {e}")
+            log.error("❌ Error saving score: %s", e)
 
     def get_leaderboard(self, limit=10):
         try:
@@ -70,44 +112,41 @@ class GameServer:
                 ''', (limit,))
                 return cursor.fetchall()
         except Exception as e:
-            print(f"❌ Error getting leaderboard: {e}")
+            log.error("❌ Error getting leaderboard: %s", e)
             return []
 
-    def handle_client(self, client_socket, client_address):
-        player_id = self.next_player_id
-        self.next_player_id += 1
+    def register_client(self, client_socket, client_address, join_data):
+        with self.id_lock:
+            player_id = self.next_player_id
+            self.next_player_id += self.player_id_step
 
-        print(f"🤠 Cowboy {player_id} connected from {client_address}")
+        log.info("🤠 Cowboy %s connected from %s", player_id, client_address)
 
         spawn_x = random.randint(100, 700)
         spawn_y = random.randint(100, 500)
+        codec = negotiate_codec(join_data.get('codecs'), self.codecs)
 
-        self.clients[player_id] = {
-            'socket': client_socket,
-            'address': client_address,
-            'x': spawn_x,
-            'y': spawn_y,
-            'health': 100,
-            'score': 0,  
-            'total_score': 0,  
-            'username': f'Player_{player_id}',  
-            'kills': 0,
-            'deaths': 0,
-            'direction': 'right',
-            'last_seen': time.time()
-        }
-
-    
-        join_response = GamePacket(OpCode.JOIN, 0, {
-            'assigned_id': player_id,
-            'spawn_x': spawn_x,
-            'spawn_y': spawn_y
-        })
-        client_socket.send(join_response.to_json())
-        print(f"  Sent JOIN response to Cowboy {player_id}")
+        player = PlayerRecord(
+            socket=client_socket,
+            address=client_address,
+            codec=codec,
+            x=spawn_x,
+            y=spawn_y,
+            username=f'Player_{player_id}'
+        )
 
-        print(f"  Sending {len(self.clients) - 1} existing players to Cowboy {player_id}")
-        for other_id, other_data in self.clients.items():
+        try:
+            room = self.rooms.join(player_id, player, join_data.get('room_id'),
+                                   welcome=lambda room: self.send_join_response(player_id, player, room))
+        except RoomFullError as e:
+            error_response = GamePacket(OpCode.JOIN, 0, {'error': str(e), 'room_id': join_data.get('room_id')})
+            client_socket.sendall(error_response.to_frame())
+            raise
+        self.clients[player_id] = player
+
+        # The join snapshot goes out as a single buffer of back-to-back frames.
+        snapshot_frames = []
+        for other_id, other_data in room.members():
             if other_id != player_id:
                 existing_player_packet = GamePacket(OpCode.MOVE, other_id, {
                     'x': other_data['x'],
@@ -115,178 +154,206 @@ class GameServer:
                     'health': other_data['health'],
                     'direction': other_data['direction']
                 })
-                try:
-                    client_socket.send(existing_player_packet.to_json())
-                    print(f"  Sent player {other_id} to new player {player_id}")
-                except:
-                    print(f"  Failed to send player {other_id} to new player {player_id}")
+                snapshot_frames.append(existing_player_packet.to_frame(codec))
+        if snapshot_frames:
+            try:
+                timed_sendall(self.metrics, client_socket, b''.join(snapshot_frames), OpCode.MOVE)
+                log.debug("Sent %d existing players to Cowboy %s", len(snapshot_frames), player_id)
+            except:
+                log.warning("Failed to send existing players to Cowboy %s", player_id)
+        self.stats.record(serializations=len(snapshot_frames) + 1, sends=2 if snapshot_frames else 1)
 
-        print(f"  Broadcasting new player {player_id} to {len(self.clients) - 1} existing players")
-        for other_id, other_data in self.clients.items():
-            if other_id != player_id:
-                new_player_packet = GamePacket(OpCode.MOVE, player_id, {
-                    'x': spawn_x,
-                    'y': spawn_y,
-                    'health': 100,
-                    'direction': 'right'
-                })
-                try:
-                    other_data['socket'].send(new_player_packet.to_json())
-                    print(f"  Sent new player {player_id} to player {other_id}")
-                except:
-                    print(f"  Failed to send new player {player_id} to player {other_id}")
+        log.debug("Broadcasting new player %s to %d players in %s", player_id, len(room.players) - 1, room.room_id)
+        new_player_packet = GamePacket(OpCode.MOVE, player_id, {
+            'x': spawn_x,
+            'y': spawn_y,
+            'health': 100,
+            'direction': 'right'
+        })
+        room.broadcast(new_player_packet, exclude_id=player_id)
+
+        return player_id
 
+    def send_join_response(self, player_id, player, room):
+        # The JOIN response is always JSON: the client only learns which codec
+        # was picked by reading it. It goes out before the player joins the
+        # room, so nothing in that codec can reach the client first.
+        join_response = GamePacket(OpCode.JOIN, 0, {
+            'assigned_id': player_id,
+            'spawn_x': player.x,
+            'spawn_y': player.y,
+            'codec': player.codec,
+            'room_id': room.room_id
+        })
+        timed_sendall(self.metrics, player.socket, join_response.to_frame(), OpCode.JOIN)
+        log.debug("Sent JOIN response to Cowboy %s (codec: %s, room: %s)", player_id, player.codec, room.room_id)
+
+    def unregister_client(self, player_id):
+        log.info("🤠 Cowboy %s disconnected", player_id)
+
+        player_data = self.clients.pop(player_id, None)
+        if player_data is not None:
+            total_score = player_data['total_score'] + player_data['score']
+            self.save_score(player_data['username'], total_score)
+            log.info("💾 Saved score for %s: %s", player_data['username'], total_score)
+
+            room = self.rooms.leave(player_id, player_data['room_id'])
+            if room is not None:
+                disconnect_packet = GamePacket(OpCode.DISCONNECT, player_id, {
+                    'player_id': player_id,
+                    'reason': 'left the desert'
+                })
+                room.broadcast(disconnect_packet)
+
+    def dispatch_frames(self, player_id, frames, connection, address):
+        """Decode and handle received frames; returns the (possibly new) player id.
+
+        Clients open with a JOIN carrying their options (the codecs they
+        speak and optionally a room_id). Anything else as the first packet is
+        treated as a legacy client joining with defaults.
+        """
+        metrics = self.metrics
+        for frame in frames:
+            packet = GamePacket.decode(frame)
+            if not packet:
+                log.warning("Invalid packet from Cowboy %s", player_id)
+                continue
+            if metrics is not None:
+                start = time.perf_counter()
+                if packet.ts is not None:
+                    metrics.record('transit', packet.op_code, time.time() - packet.ts)
+            if player_id is None:
+                join_data = packet.data if packet.op_code == OpCode.JOIN else {}
+                player_id = self.register_client(connection, address, join_data)
+                if packet.op_code != OpCode.JOIN:
+                    self.handle_packet(player_id, packet)
+            else:
+                self.handle_packet(player_id, packet)
+            if metrics is not None:
+                metrics.record('handle', packet.op_code, time.perf_counter() - start, len(frame))
+        return player_id
+
+    def handle_client(self, client_socket, client_address, initial_data=b''):
+        player_id = None
+        decoder = FrameDecoder()
+        # Everything sent to this client goes through its own queue and writer
+        # thread; this thread only reads.
+        connection = OutboundQueue(client_socket, self.outbound_stats, name=str(client_address),
+                                   metrics=self.metrics)
         try:
+            # Bytes a front door already read off this socket before handing it over.
+            if initial_data:
+                player_id = self.dispatch_frames(player_id, decoder.feed(initial_data),
+                                                 connection, client_address)
             while self.running:
                 try:
-                    data = client_socket.recv(1024)
-                    if not data:
-                        print(f"  Cowboy {player_id} disconnected (no data)")
+                    frames = decoder.recv_frames(client_socket)
+                    if frames is None:
+                        log.debug("Cowboy %s disconnected (no data)", player_id)
                         break
 
-                    packet = GamePacket.from_json(data)
-                    if packet:
-                        self.handle_packet(player_id, packet)
-                    else:
-                        print(f"  Invalid packet from Cowboy {player_id}")
+                    player_id = self.dispatch_frames(player_id, frames, connection, client_address)
 
                 except socket.timeout:
                     continue
+                except FrameError as e:
+                    log.warning("Bad frame from Cowboy %s: %s", player_id, e)
+                    break
                 except Exception as e:
-                    print(f"  Error from Cowboy {player_id}: {e}")
+                    log.warning("Error from Cowboy %s: %s", player_id, e)
                     break
 
         except Exception as e:
-            print(f"  Exception in handle_client for Cowboy {player_id}: {e}")
+            log.error("Exception in handle_client for Cowboy %s: %s", player_id, e)
         finally:
-            print(f"🤠 Cowboy {player_id} disconnected")
-
-            if player_id in self.clients:
-                player_data = self.clients[player_id]
-                total_score = player_data['total_score'] + player_data['score']
-                self.save_score(player_data['username'], total_score)
-                print(f"💾 Saved score for {player_data['username']}: {total_score}")
-
-                for other_id, other_data in self.clients.items():
-                    if other_id != player_id:
-                        disconnect_packet = GamePacket(OpCode.DISCONNECT, player_id, {
-                            'player_id': player_id,
-                            'reason': 'left the desert'
-                        })
-                        try:
-                            other_data['socket'].send(disconnect_packet.to_json())
-                        except:
-                            pass
-
-                del self.clients[player_id]
+            if player_id is not None:
+                self.unregister_client(player_id)
 
+            connection.close()
             try:
                 client_socket.close()
             except:
                 pass
 
+    def wire_stats(self):
+        totals = self.rooms.stats()
+        totals.add(self.stats)
+        totals = totals.totals()
+        serializations, sends = totals['serializations'], totals['sends']
+        return {
+            'serializations': serializations,
+            'sends': sends,
+            'sends_per_serialization': sends / serializations if serializations else 0.0
+        }
+
+    def queue_stats(self):
+        totals = self.outbound_stats.totals()
+        depths = [player['socket'].depth() for player in self.clients.values()
+                  if hasattr(player['socket'], 'depth')]
+        totals['live_depth'] = sum(depths)
+        totals['max_live_depth'] = max(depths, default=0)
+        return totals
+
+    def snapshot_stats(self):
+        totals = self.rooms.stats().totals()
+        sent, full = totals['snapshot_bytes_sent'], totals['snapshot_bytes_full']
+        if not full:
+            # Full sizes are only measured with --trace.
+            return {'bytes_sent': sent}
+        return {
+            'bytes_sent': sent,
+            'bytes_full': full,
+            'bytes_saved': full - sent,
+            'saving': 1 - sent / full if full else 0.0
+        }
+
     def handle_packet(self, player_id, packet):
-        if packet.op_code == OpCode.MOVE:
-            if player_id in self.clients:
-                self.clients[player_id]['x'] = packet.data.get('x', self.clients[player_id]['x'])
-                self.clients[player_id]['y'] = packet.data.get('y', self.clients[player_id]['y'])
-                self.clients[player_id]['health'] = packet.data.get('health', self.clients[player_id]['health'])
-                self.clients[player_id]['direction'] = packet.data.get('direction',
-                                                                       self.clients[player_id]['direction'])
-                self.clients[player_id]['last_seen'] = time.time()
-
-                for other_id, other_data in self.clients.items():
-                    if other_id != player_id:
-                        move_packet = GamePacket(OpCode.MOVE, player_id, {
-                            'x': self.clients[player_id]['x'],
-                            'y': self.clients[player_id]['y'],
-                            'health': self.clients[player_id]['health'],
-                            'direction': self.clients[player_id]['direction']
-                        })
-                        try:
-                            other_data['socket'].send(move_packet.to_json())
-                        except:
-                            print(f"  Failed to broadcast MOVE from player {player_id} to player {other_id}")
+        player = self.clients.get(player_id)
+        if player is None:
+            return
+        room = self.rooms.get(player['room_id'])
+        if room is None:
+            return
+
+        if packet.op_code == OpCode.INPUT:
+            room.handle_input(player_id, packet.data, forward=not self.tick_rate)
+
+        elif packet.op_code == OpCode.MOVE:
+            room.handle_move(player_id, packet.data, forward=not self.tick_rate)
 
         elif packet.op_code == OpCode.ATTACK:
-            bullet_data = packet.data.copy()
-            bullet_packet = GamePacket(OpCode.BULLET, player_id, bullet_data)
+            room.handle_attack(player_id, packet.data)
 
-            for other_id, other_data in self.clients.items():
-                try:
-                    other_data['socket'].send(bullet_packet.to_json())
-                except:
-                    print(f"  Failed to broadcast BULLET from player {player_id} to player {other_id}")
-
-        elif packet.op_code == OpCode.HIT:
-            target_id = packet.data.get('target_id')
-            damage = packet.data.get('damage', 10)
-            shooter_id = packet.data.get('shooter_id', player_id)
-
-            print(f"🎯 Player {shooter_id} hit player {target_id} for {damage} damage")
-            if target_id in self.clients:
-                self.clients[target_id]['health'] -= damage
-
-                if self.clients[target_id]['health'] <= 0:
-                    self.clients[target_id]['health'] = 0
-
-                    self.clients[target_id]['deaths'] += 1
-                    print(f"💀 Player {target_id} was eliminated by player {shooter_id}")
-
-                    if shooter_id in self.clients:
-                        self.clients[shooter_id]['kills'] += 1
-                        self.clients[shooter_id]['score'] += 100
-                        print(
-                            f"💰 Player {shooter_id} earned 100 bounty! Total score: ${self.clients[shooter_id]['score']}")
-
-
-                        score_packet = GamePacket(OpCode.SCORE_UPDATE, 0, {
-                            'player_id': shooter_id,
-                            'score': self.clients[shooter_id]['score'],
-                            'kills': self.clients[shooter_id]['kills']
-                        })
-                        try:
-                            self.clients[shooter_id]['socket'].send(score_packet.to_json())
-                        except:
-                            print(f"  Failed to send score update to player {shooter_id}")
-
-            hit_packet = GamePacket(OpCode.HIT, player_id, {
-                'target_id': target_id,
-                'damage': damage,
-                'shooter_id': shooter_id
-            })
-
-            for other_id, other_data in self.clients.items():
-                try:
-                    other_data['socket'].send(hit_packet.to_json())
-                except:
-                    print(f"  Failed to broadcast HIT to player {other_id}")
+        elif packet.op_code == OpCode.ACK:
+            room.handle_ack(player_id, packet.data)
 
         elif packet.op_code == OpCode.RESPAWN:
-            if player_id in self.clients:
-                self.clients[player_id]['health'] = 100
-                self.clients[player_id]['x'] = random.randint(100, 700)
-                self.clients[player_id]['y'] = random.randint(100, 500)
-                self.clients[player_id]['direction'] = 'right'
-
-                print(
-                    f"🔄 Player {player_id} respawned at ({self.clients[player_id]['x']}, {self.clients[player_id]['y']})")
-
-                respawn_packet = GamePacket(OpCode.RESPAWN, player_id, {
-                    'x': self.clients[player_id]['x'],
-                    'y': self.clients[player_id]['y'],
-                    'health': 100
-                })
-
-                for other_id, other_data in self.clients.items():
-                    if other_id != player_id:
-                        try:
-                            other_data['socket'].send(respawn_packet.to_json())
-                        except:
-                            print(f"  Failed to broadcast RESPAWN for player {player_id} to player {other_id}")
+            room.handle_respawn(player_id)
+
+        # HITs claimed by clients are dropped: rooms resolve hits themselves
+        # by simulating the bullets from ATTACK packets.
+
+    def tick(self):
+        """Advance every room one step; each room sends its own snapshots."""
+        self.rooms.tick_all(1.0 / self.simulation_rate, send_snapshots=bool(self.tick_rate))
+
+    def tick_loop(self):
+        interval = 1.0 / self.simulation_rate
+        next_tick = time.monotonic()
+        while self.running:
+            self.tick()
+            next_tick += interval
+            delay = next_tick - time.monotonic()
+            if delay > 0:
+                time.sleep(delay)
+            else:
+                # Fell behind: skip the missed ticks instead of bursting.
+                next_tick = time.monotonic()
 
     def run(self):
-        print("🤠 Server is running. Press Ctrl+C to stop.")
+        self.listen()
+        threading.Thread(target=self.tick_loop, daemon=True).start()
+        log.info("🤠 Server is running. Press Ctrl+C to stop.")
         try:
             while self.running:
                 try:
@@ -295,20 +362,76 @@ class GameServer:
                     client_thread = threading.Thread(target=self.handle_client, args=(client_socket, client_address))
                     client_thread.daemon = True
                     client_thread.start()
-                    print(f"🤠 New connection from {client_address}")
+                    log.debug("🤠 New connection from %s", client_address)
                 except socket.timeout:
                     continue
                 except KeyboardInterrupt:
-                    print("\n🤠 Server shutting down...")
+                    log.info("🤠 Server shutting down...")
                     self.running = False
                     break
         except KeyboardInterrupt:
-            print("\n🤠 Server shutting down...")
+            log.info("🤠 Server shutting down...")
         finally:
             self.server_socket.close()
-            print("🤠 Server stopped.")
+            log.info("📦 Wire stats: %s", self.wire_stats())
+            log.info("📦 Snapshot stats: %s", self.snapshot_stats())
+            log.info("📦 Send queue stats: %s", self.queue_stats())
+            if self.metrics is not None:
+                log.info("%s", self.metrics.format())
+            self.rooms.shutdown()
+            log.info("🤠 Server stopped.")
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="Desert Arena game server")
+    parser.add_argument('--host', default=HOST)
+    parser.add_argument('--port', type=int, default=PORT)
+    parser.add_argument('--engine', choices=['threaded', 'asyncio'], default='threaded',
+                        help="threaded: one thread per connection; asyncio: single event loop")
+    parser.add_argument('--tick-rate', type=float, default=DEFAULT_TICK_RATE,
+                        help="snapshots per second; 0 forwards every MOVE immediately")
+    parser.add_argument('--max-room-size', type=int, default=DEFAULT_MAX_PLAYERS,
+                        help="players per room before matchmaking opens a new one")
+    parser.add_argument('--room-workers', type=int, default=0,
+                        help="threads ticking rooms in parallel (threaded engine only)")
+    parser.add_argument('--trace', action='store_true',
+                        help="record per-opcode latency and size histograms")
+    parser.add_argument('--stats-interval', type=float, default=0,
+                        help="with --trace, print the histograms every N seconds")
+    parser.add_argument('--stats-port', type=int, default=0,
+                        help="with --trace, serve the histograms as JSON on this port")
+    parser.add_argument('--log-level', default='INFO', choices=['DEBUG', 'INFO', 'WARNING', 'ERROR'],
+                        help="DEBUG adds per-join and per-hit detail")
+    return parser.parse_args(argv)
+
+
+def make_metrics(args):
+    if not args.trace:
+        return None
+    metrics = PacketMetrics()
+    if args.stats_port:
+        metrics.serve(args.host, args.stats_port)
+    return metrics
 
 
 if __name__ == "__main__":
-    server = GameServer()
-    server.run()
+    args = parse_args()
+    setup_logging(args.log_level)
+    metrics = make_metrics(args)
+    if args.engine == 'asyncio':
+        from async_server import AsyncGameServer
+        server = AsyncGameServer(host=args.host, port=args.port, tick_rate=args.tick_rate,
+                                 max_room_size=args.max_room_size, metrics=metrics)
+    else:
+        server = GameServer(host=args.host, port=args.port, tick_rate=args.tick_rate,
+                            max_room_size=args.max_room_size, room_workers=args.room_workers,
+                            metrics=metrics)
+    if metrics is not None:
+        metrics.add_gauge('send_queues', server.queue_stats)
+    if metrics is not None and args.stats_interval:
+        threading.Thread(target=metrics.dump_every, args=(args.stats_interval, lambda: server.running),
+                         daemon=True).start()
+    try:
+        server.run()
+    finally:
+        stop_logging()
@@ -0,0 +1,75 @@
+from operator import attrgetter
+
+from protocol import OpCode, GamePacket
+
+# How many past snapshots are kept for delta baselines. A client whose last
+# acknowledged tick has fallen out of the ring gets a full snapshot instead.
+SNAPSHOT_HISTORY = 32
+
+# A snapshot state maps player_id -> (x, y, health, direction, input_seq).
+STATE_FIELDS = ('x', 'y', 'health', 'direction', 'input_seq')
+
+
+class SnapshotHistory:
+    """Fixed-size ring buffer of full snapshot states indexed by tick."""
+
+    def __init__(self, size=SNAPSHOT_HISTORY):
+        self.size = size
+        self.ticks = [None] * size
+        self.states = [None] * size
+
+    def add(self, tick, state):
+        slot = tick % self.size
+        self.ticks[slot] = tick
+        self.states[slot] = state
+
+    def get(self, tick):
+        slot = tick % self.size
+        if self.ticks[slot] != tick:
+            return None
+        return self.states[slot]
+
+
+# A player record's state tuple, read with one C-level call (records.PlayerRecord).
+player_state = attrgetter(*STATE_FIELDS)
+
+
+def diff_states(baseline, current):
+    """Return (entries, removed) turning ``baseline`` into ``current``.
+
+    Players missing from the baseline are sent in full; for known players
+    only the fields that changed are sent and the rest are None.
+    """
+    entries = []
+    for player_id, state in current.items():
+        base = baseline.get(player_id)
+        if base is None:
+            entries.append([player_id, *state])
+        elif base != state:
+            entries.append([player_id] + [value if value != old else None for value, old in zip(state, base)])
+    removed = [player_id for player_id in baseline if player_id not in current]
+    return entries, removed
+
+
+def build_snapshot_packet(tick, current, baseline_tick=0, baseline=None):
+    entries, removed = diff_states(baseline or {}, current)
+    return GamePacket(OpCode.SNAPSHOT, 0, {
+        'tick': tick,
+        'baseline': baseline_tick if baseline else 0,
+        'players': entries,
+        'removed': removed
+    })
+
+
+def apply_snapshot(baseline, data):
+    """Rebuild the full state a SNAPSHOT describes on top of ``baseline``."""
+    state = dict(baseline) if data.get('baseline') else {}
+    for player_id in data.get('removed', []):
+        state.pop(player_id, None)
+    for player_id, *fields in data.get('players', []):
+        old = state.get(player_id)
+        if old is None:
+            state[player_id] = tuple(fields)
+        else:
+            state[player_id] = tuple(old_value if value is None else value for value, old_value in zip(fields, old))
+    return state
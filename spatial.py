@@ -0,0 +1,88 @@
+import math
+
+# Twice the client's 25 px hit radius, so a hit query touches at most 3x3 cells.
+DEFAULT_CELL_SIZE = 50
+
+
+class SpatialHash:
+    """Uniform grid index of points for radius queries.
+
+    Keys (player ids, bullet ids, ...) are bucketed by the cell their point
+    falls into. A radius query only visits the cells overlapping the circle's
+    bounding box, and compares squared distances so no square roots are taken.
+    """
+
+    def __init__(self, cell_size=DEFAULT_CELL_SIZE):
+        self.cell_size = cell_size
+        self.cells = {}
+        # key -> (x, y, cell)
+        self.positions = {}
+
+    def __len__(self):
+        return len(self.positions)
+
+    def __contains__(self, key):
+        return key in self.positions
+
+    def __iter__(self):
+        return iter(list(self.positions))
+
+    def cell_of(self, x, y):
+        return (math.floor(x / self.cell_size), math.floor(y / self.cell_size))
+
+    def insert(self, key, x, y):
+        if key in self.positions:
+            self.move(key, x, y)
+            return
+        cell = self.cell_of(x, y)
+        self.cells.setdefault(cell, set()).add(key)
+        self.positions[key] = (x, y, cell)
+
+    def move(self, key, x, y):
+        entry = self.positions.get(key)
+        if entry is None:
+            self.insert(key, x, y)
+            return
+        cell = self.cell_of(x, y)
+        old_cell = entry[2]
+        if cell != old_cell:
+            self._unlink(key, old_cell)
+            self.cells.setdefault(cell, set()).add(key)
+        self.positions[key] = (x, y, cell)
+
+    def remove(self, key):
+        entry = self.positions.pop(key, None)
+        if entry is not None:
+            self._unlink(key, entry[2])
+
+    def clear(self):
+        self.cells.clear()
+        self.positions.clear()
+
+    def _unlink(self, key, cell):
+        bucket = self.cells.get(cell)
+        if bucket is not None:
+            bucket.discard(key)
+            if not bucket:
+                del self.cells[cell]
+
+    def query_radius(self, x, y, radius):
+        """Return the keys whose point lies strictly within ``radius`` of (x, y)."""
+        radius_sq = radius * radius
+        min_cx, min_cy = self.cell_of(x - radius, y - radius)
+        max_cx, max_cy = self.cell_of(x + radius, y + radius)
+        cells = self.cells
+        positions = self.positions
+        found = []
+        for cx in range(min_cx, max_cx + 1):
+            for cy in range(min_cy, max_cy + 1):
+                bucket = cells.get((cx, cy))
+                if not bucket:
+                    continue
+                for key in bucket:
+                    px, py, _ = positions[key]
+                    dx = px - x
+                    dy = py - y
+                    if dx * dx + dy * dy < radius_sq:
+                        found.append(key)
+        return found
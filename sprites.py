@@ -0,0 +1,107 @@
+import math
+
+import pygame
+
+from textcache import TextCache
+
+# Player sprites are drawn around the centre of a square this size.
+PLAYER_SPRITE_SIZE = 64
+# Bullet sprites, trail included, fit a square this size.
+BULLET_SPRITE_SIZE = 48
+# Bullets are pre-rendered for this many headings; the nearest one is used.
+BULLET_HEADINGS = 64
+BULLET_TRAIL = 10
+# The local player's glow pulses between these extra radii.
+GLOW_PULSE = 10
+# Background of the opaque sprites. Colorkeyed RLE surfaces blit several
+# times faster than per-pixel alpha ones.
+COLORKEY = (255, 0, 255)
+
+
+def brighten(color, factor=1.5):
+    return tuple(min(255, int(c * factor)) for c in color)
+
+
+def keyed_surface(size):
+    sprite = pygame.Surface((size, size))
+    sprite.fill(COLORKEY)
+    sprite.set_colorkey(COLORKEY, pygame.RLEACCEL)
+    return sprite
+
+
+def render_player(colors, direction, flashing):
+    """The cowboy facing ``direction``, as draw_player used to draw it on screen."""
+    size = PLAYER_SPRITE_SIZE
+    sprite = keyed_surface(size)
+    x = y = size // 2
+    body, hat = colors['body'], colors['hat']
+    if flashing:
+        body, hat = brighten(body), brighten(hat)
+    facing = 1 if direction == 'right' else -1
+
+    pygame.draw.circle(sprite, (50, 50, 50), (x + 3, y + 3), 15)
+    pygame.draw.circle(sprite, body, (x, y), 15)
+    pygame.draw.polygon(sprite, hat, [(x - 15, y - 10), (x + 15, y - 10), (x + 12, y - 25), (x - 12, y - 25)])
+    pygame.draw.rect(sprite, (80, 80, 80), (x - 18, y - 12, 36, 4))
+    pygame.draw.circle(sprite, (255, 220, 180), (x, y - 5), 8)
+    pygame.draw.circle(sprite, (50, 50, 100), (x + 3 * facing, y - 5), 3)
+    pygame.draw.circle(sprite, (50, 50, 100), (x + 8 * facing, y - 7), 2)
+    pygame.draw.line(sprite, colors['gun'], (x, y - 5), (x + 25 * facing, y - 5), 5)
+    pygame.draw.rect(sprite, (100, 70, 30), (x - 3, y - 8, 6, 10))
+    return sprite
+
+
+def render_bullet(dx, dy):
+    """A bullet heading along (dx, dy) with its trail behind it."""
+    size = BULLET_SPRITE_SIZE
+    sprite = keyed_surface(size)
+    x = y = size // 2
+    for i in range(BULLET_TRAIL):
+        pygame.draw.circle(sprite, (255, 255, 100), (int(x - dx * i * 2), int(y - dy * i * 2)), 2)
+    pygame.draw.circle(sprite, (255, 255, 0), (x, y), 3)
+    pygame.draw.circle(sprite, (255, 200, 0), (x, y), 2)
+    return sprite
+
+
+def render_glow(pulse):
+    sprite = pygame.Surface((40, 40), pygame.SRCALPHA)
+    pygame.draw.circle(sprite, (255, 255, 255, 50), (20, 20), 15 + pulse)
+    return sprite
+
+
+class SpriteCache:
+    """Pre-rendered player, bullet and glow sprites, built on first use.
+
+    Players are keyed by (colors, direction, flashing), bullets by their
+    heading rounded to one of BULLET_HEADINGS and the glow by its
+    whole-pixel pulse, so a frame only blits. Name labels come from
+    ``text``, which the client shares with the rest of its text.
+    """
+
+    def __init__(self, font, text=None):
+        self.font = font
+        self.text = text if text is not None else TextCache()
+        self.players = {}
+        self.bullets = [None] * BULLET_HEADINGS
+        self.glows = [render_glow(pulse) for pulse in range(GLOW_PULSE + 1)]
+
+    def player(self, colors, direction, flashing=False):
+        key = (colors['body'], colors['hat'], colors['gun'], direction, flashing)
+        sprite = self.players.get(key)
+        if sprite is None:
+            sprite = self.players[key] = render_player(colors, direction, flashing)
+        return sprite
+
+    def bullet(self, dx, dy):
+        heading = round(math.atan2(dy, dx) / (2 * math.pi) * BULLET_HEADINGS) % BULLET_HEADINGS
+        sprite = self.bullets[heading]
+        if sprite is None:
+            angle = heading * 2 * math.pi / BULLET_HEADINGS
+            sprite = self.bullets[heading] = render_bullet(math.cos(angle), math.sin(angle))
+        return sprite
+
+    def label(self, text, color):
+        return self.text.render(self.font, text, color)
+
+    def glow(self, pulse):
+        return self.glows[max(0, min(GLOW_PULSE, int(pulse)))]
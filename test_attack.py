@@ -1,6 +1,7 @@
 import socket
 import json
 import time
+from protocol import FrameDecoder, encode_frame
 
 
 def test_attack():
@@ -17,11 +18,16 @@ def test_attack():
             "sender_id": 0,
             "data": {}
         }
-        sock.send(json.dumps(join_packet).encode())
+        sock.sendall(encode_frame(json.dumps(join_packet).encode()))
         print("📤 Sent JOIN packet")
-        response = sock.recv(1024)
-        if response:
-            response_data = json.loads(response.decode())
+        decoder = FrameDecoder()
+        frames = []
+        while not frames:
+            frames = decoder.recv_frames(sock)
+            if frames is None:
+                break
+        if frames:
+            response_data = json.loads(frames[0].decode())
             print(f"📥 Server JOIN response:")
             print(f"   OpCode: {response_data.get('op_code')}")
             print(f"   Sender ID: {response_data.get('sender_id')}")
@@ -41,7 +47,7 @@ def test_attack():
                     "dy": 0.0  
                 }
             }
-            sock.send(json.dumps(attack_packet).encode())
+            sock.sendall(encode_frame(json.dumps(attack_packet).encode()))
             print("📤 Sent ATTACK (bullet) packet")
             print(f"   Bullet from: ({400}, {300})")
             print(f"   Direction: ({1.0}, {0.0})")
@@ -57,8 +63,8 @@ def test_attack():
                     "shooter_id": player_id
                 }
             }
-            sock.send(json.dumps(hit_packet).encode())
-            print("📤 Sent HIT packet")
+            sock.sendall(encode_frame(json.dumps(hit_packet).encode()))
+            print("📤 Sent HIT packet (the server ignores it: hits come from its own bullet simulation)")
             print(f"   Target: Player 2")
             print(f"   Damage: 10")
             print(f"   Shooter: Player {player_id}")
@@ -66,12 +72,12 @@ def test_attack():
             sock.settimeout(1.0)
             try:
                 while True:
-                    data = sock.recv(1024)
-                    if data:
-                        response = json.loads(data.decode())
-                        print(f"📥 Server broadcast: {response.get('op_code')}")
-                    else:
+                    frames = decoder.recv_frames(sock)
+                    if frames is None:
                         break
+                    for frame in frames:
+                        response = json.loads(frame.decode())
+                        print(f"📥 Server broadcast: {response.get('op_code')}")
             except socket.timeout:
                 print("⏰ No more responses from server")
 
@@ -84,7 +90,7 @@ def test_attack():
         print("1. Run two game clients")
         print("2. Shoot at each other")
         print("3. Check if health bars reduce")
-        print("4. Check server console for hit messages")
+        print("4. Check server console for hit messages (resolved server-side)")
 
     except ConnectionRefusedError:
         print("❌ Cannot connect to server")
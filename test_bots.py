@@ -0,0 +1,18 @@
+import asyncio
+
+from bots import BotHarness
+from server import GameServer
+
+
+def test_bot_joins_and_follows_snapshots(free_port, start_server):
+    start_server(GameServer(port=free_port))
+    harness = BotHarness(port=free_port, bot_count=1, fire_rate=0)
+    result = asyncio.run(harness.run(duration=0.5, warmup=0.2))
+
+    assert (result['joined'], result['join_errors'], result['disconnects']) == (1, 0, 0)
+    assert result['invalid_packets'] == result['bad_frames'] == 0
+    bot = harness.all_bots[0]
+    # Snapshots came back, acknowledged the bot's inputs and agreed with its prediction.
+    assert bot.last_snapshot_tick > 0
+    assert bot.predictor.seq > len(bot.predictor.pending)
+    assert result['corrections'] == 0
@@ -0,0 +1,44 @@
+import numpy as np
+
+from bullets import BulletPool
+
+
+def no_players():
+    return np.empty(0, dtype=np.int64), np.empty((0, 2), dtype=np.float32)
+
+
+def test_bullets_move_and_leave_the_arena():
+    pool = BulletPool(step=10)
+    pool.spawn(795, 300, 1, 0, owner=1)
+    pool.spawn(400, 300, 0, 1, owner=1)
+    pool.update(*no_players())
+    assert len(pool) == 1
+    xs, ys, _, _ = pool.snapshot()
+    assert (xs, ys) == ([400.0], [310.0])
+
+
+def test_bullets_stop_at_players_but_not_their_shooter():
+    pool = BulletPool(step=8, hit_radius=25)
+    pool.spawn(100, 100, 1, 0, owner=1)
+    pool.spawn(100, 300, 1, 0, owner=2)
+    pool.spawn(400, 400, 1, 0, owner=2)
+    ids = np.array([1, 2])
+    positions = np.array([[110, 300], [110, 100]], dtype=np.float32)
+    pool.update(ids, positions)
+    # Owner 1's bullet reached player 2 and owner 2's reached player 1; the
+    # third bullet flew on.
+    assert len(pool) == 1
+    assert pool.owner[0] == 2
+    pool.spawn(400, 100, 1, 0, owner=2)
+    pool.update(np.array([2]), np.array([[410, 100]], dtype=np.float32))
+    assert len(pool) == 2
+
+
+def test_spent_bullets_are_removed_on_the_next_update():
+    pool = BulletPool()
+    pool.spawn(100, 100, 1, 0, owner=1)
+    pool.spawn(300, 100, 1, 0, owner=1)
+    pool.mark_spent_near(1, 290, 100, 50)
+    pool.update(*no_players())
+    xs, _, _, _ = pool.snapshot()
+    assert xs == [108.0]
@@ -0,0 +1,20 @@
+import io
+
+from gamelog import get_logger, setup_logging, stop_logging
+
+
+def test_rate_limit_per_message_key():
+    stream = io.StringIO()
+    setup_logging('INFO', limit=3, interval=60, stream=stream)
+    log = get_logger('test')
+    try:
+        for i in range(10):
+            log.warning("Failed to send to %s", i)
+        log.info("Room %s created", 'a')
+        log.debug("never formatted %s", object())
+    finally:
+        stop_logging()
+    lines = stream.getvalue().splitlines()
+    assert sum('Failed to send' in line for line in lines) == 3
+    assert sum('Room a created' in line for line in lines) == 1
+    assert not any('never formatted' in line for line in lines)
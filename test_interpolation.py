@@ -0,0 +1,63 @@
+import pytest
+
+from interpolation import Interpolator, still_after
+
+
+def test_blends_between_the_samples_around_the_delayed_time():
+    motion = Interpolator(delay=0.1)
+    motion.push(1, 0, 0, now=1.0)
+    motion.push(1, 10, 20, now=1.05)
+    motion.push(1, 20, 40, now=1.1)
+    assert motion.sample(1, now=1.125) == pytest.approx((5, 10))
+    assert motion.sample(1, now=1.2) == pytest.approx((20, 40))
+    # Before the oldest sample the entity waits where it first appeared.
+    assert motion.sample(1, now=1.05) == (0, 0)
+    assert motion.sample(2, now=1.2) is None
+
+
+def test_extrapolation_is_bounded_and_settles_back():
+    motion = Interpolator(delay=0.1, max_extrapolation=0.1)
+    motion.push(1, 0, 0, now=1.0)
+    motion.push(1, 10, 0, now=1.05)
+    # 50 ms past the newest sample: 50 ms more at 200 px/s.
+    assert motion.sample(1, now=1.2) == pytest.approx((20, 0))
+    assert motion.sample(1, now=1.25) == pytest.approx((30, 0))
+    assert motion.sample(1, now=1.3) == pytest.approx((20, 0))
+    # Nothing new arrived: the player stopped at the last reported spot.
+    assert motion.sample(1, now=5.0) == pytest.approx((10, 0))
+
+
+def test_snap_and_remove():
+    motion = Interpolator(delay=0.1)
+    motion.push(1, 0, 0, now=1.0)
+    motion.push(1, 10, 0, now=1.05)
+    motion.snap(1, 500, 300, now=1.1)
+    assert motion.positions(now=1.15) == {1: (500, 300)}
+    motion.remove(1)
+    assert 1 not in motion and motion.positions(now=2.0) == {}
+
+
+def test_repeated_positions_only_count_once_the_player_stays_put():
+    motion = Interpolator(delay=0.1, still_after=still_after(20))
+    motion.push(1, 0, 0, now=1.0)
+    # A snapshot between two moves repeats the position: still moving.
+    motion.push(1, 0, 0, now=1.033)
+    motion.push(1, 10, 0, now=1.066)
+    assert motion.sample(1, now=1.133) == pytest.approx((5, 0))
+    # Reported in the same place long enough: stopped there.
+    motion.push(1, 10, 0, now=1.1)
+    motion.push(1, 10, 0, now=1.15)
+    assert motion.sample(1, now=1.25) == pytest.approx((10, 0))
+    assert motion.sample(1, now=1.3) == pytest.approx((10, 0))
+    assert still_after(20) == pytest.approx(0.075) and still_after(0) == 0.0
+
+
+def test_render_tick_trails_the_newest_by_the_delay():
+    motion = Interpolator(delay=0.1)
+    assert motion.render_tick(now=1.0) == 0
+    motion.mark_tick(10, now=1.0)
+    motion.mark_tick(11, now=1.033)
+    motion.mark_tick(12, now=1.066)
+    assert motion.render_tick(now=1.05) == 10
+    assert motion.render_tick(now=1.14) == 11
+    assert motion.render_tick(now=2.0) == 12
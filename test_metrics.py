@@ -0,0 +1,12 @@
+from metrics import PacketMetrics
+
+
+def test_histogram_percentiles_and_bytes():
+    metrics = PacketMetrics()
+    for i in range(1, 101):
+        metrics.record('handle', 'MOVE', i / 1000, nbytes=10)
+    stats = metrics.summary()['handle']['MOVE']
+    assert stats['count'] == 100 and stats['bytes'] == 1000
+    # Buckets are 10% wide, so percentiles land within one bucket of the truth.
+    assert 50 <= stats['p50_ms'] <= 55
+    assert 99 <= stats['p99_ms'] <= 109
@@ -0,0 +1,47 @@
+from movement import InputCoalescer, Predictor, allowed_ms, step, INPUT_SLACK
+
+
+def test_reconcile_replays_inputs_the_server_has_not_applied():
+    predictor = Predictor(100, 100)
+    for _ in range(3):
+        predictor.apply(1, 0, 50)
+    assert predictor.position() == (130, 100)
+    # The server applied the first input and agrees: nothing moves.
+    assert predictor.reconcile(110, 100, 1) == (130, 100)
+    assert predictor.corrections == 0
+    # The server stopped the second input at a wall: the third is replayed from there.
+    assert predictor.reconcile(112, 100, 2) == (122, 100)
+    assert predictor.corrections == 1
+    assert predictor.reconcile(122, 100, 3) == (122, 100)
+    assert not predictor.pending
+
+
+def test_steps_stop_at_the_arena_edge():
+    assert step(745, 300, 1, -1, 100) == (750, 280)
+
+
+def test_inputs_cannot_claim_more_time_than_has_passed():
+    clock = 0.0
+    now = 100.0
+    allowed = 0
+    for _ in range(20):
+        dt_ms, clock = allowed_ms(clock, 100, now)
+        allowed += dt_ms
+    # Two seconds of input at one instant: only the slack either side gets through.
+    assert allowed == round(2 * INPUT_SLACK * 1000)
+    assert allowed_ms(clock, 100, now + 0.05) == (50, clock + 0.05)
+
+
+def test_inputs_are_coalesced_between_sends():
+    inputs = InputCoalescer(rate=20, heartbeat=1.0)
+    assert inputs.due(0.0)
+    inputs.take(0.0)
+    for seq, keys in enumerate([(1, 0), (1, 0), (1, 0), (1, 1), (1, 1)], start=1):
+        inputs.add(seq, *keys, 16)
+    assert not inputs.due(0.04)
+    assert inputs.due(0.05)
+    assert inputs.take(0.05) == [[3, 1, 0, 48], [5, 1, 1, 32]]
+    # Standing still: only a heartbeat, unless the player turned.
+    assert not inputs.due(0.5)
+    assert inputs.due(0.5, changed=True)
+    assert inputs.due(1.05)
@@ -0,0 +1,133 @@
+import socket
+import threading
+import time
+
+import pytest
+
+from metrics import PacketMetrics
+from outbound import OutboundQueue
+
+
+class GatedSocket:
+    """Fake socket whose sends wait for ``gate`` and accept ``chunk`` bytes at a time."""
+
+    def __init__(self, chunk=None):
+        self.gate = threading.Event()
+        self.chunk = chunk
+        self.data = bytearray()
+        self.calls = 0
+        self.shut = False
+
+    def send(self, data, flags=0):
+        # Never ready for a direct send, so every frame goes through the queue.
+        raise BlockingIOError
+
+    def sendmsg(self, buffers):
+        self.gate.wait(5)
+        self.calls += 1
+        payload = b''.join(bytes(buffer) for buffer in buffers)
+        if self.chunk is not None:
+            payload = payload[:self.chunk]
+        self.data += payload
+        return len(payload)
+
+    def shutdown(self, how):
+        self.shut = True
+
+
+def test_partial_writes_are_completed_in_order():
+    sock = GatedSocket(chunk=3)
+    sock.gate.set()
+    queue = OutboundQueue(sock)
+    frames = [bytes([i]) * 10 for i in range(20)]
+    for frame in frames:
+        queue.sendall(frame)
+    queue.close()
+    assert bytes(sock.data) == b''.join(frames)
+
+
+def test_socket_writes_are_timed_by_the_writer():
+    sock = GatedSocket()
+    sock.gate.set()
+    metrics = PacketMetrics()
+    queue = OutboundQueue(sock, metrics=metrics)
+    queue.sendall(b'snapshot')
+    queue.close()
+    assert metrics.summary()['write']['batch']['bytes'] == len(b'snapshot')
+
+
+def test_keyed_frames_coalesce_while_queued():
+    sock = GatedSocket()
+    queue = OutboundQueue(sock)
+    queue.sendall(b'first')
+    while queue.depth():
+        pass
+    # The writer is now blocked on the first frame; these wait in the queue.
+    queue.sendall(b'move-1', key=('MOVE', 7))
+    queue.sendall(b'hit')
+    queue.sendall(b'move-2', key=('MOVE', 7))
+    assert queue.depth() == 2
+    sock.gate.set()
+    queue.close()
+    # The newer MOVE goes where it was queued, after the HIT sent before it.
+    assert bytes(sock.data) == b'firsthitmove-2'
+    assert queue.stats.totals()['coalesced'] == 1
+
+
+def test_saturated_client_is_evicted():
+    sock = GatedSocket()
+    queue = OutboundQueue(sock, max_frames=2, evict_after=0)
+    queue.sendall(b'a')
+    while queue.depth():
+        pass
+    queue.sendall(b'b')
+    queue.sendall(b'c')
+    with pytest.raises(ConnectionError, match="full"):
+        queue.sendall(b'd')
+    with pytest.raises(ConnectionError, match="saturated"):
+        queue.sendall(b'e')
+    assert sock.shut
+    assert queue.stats.totals()['evictions'] == 1
+    sock.gate.set()
+    queue.close()
+
+
+def test_saturation_clock_restarts_once_the_queue_has_room():
+    sock = GatedSocket()
+    queue = OutboundQueue(sock, max_frames=2)
+    queue.sendall(b'a')
+    while queue.depth():
+        pass
+    queue.sendall(b'b')
+    queue.sendall(b'c')
+    with pytest.raises(ConnectionError, match="full"):
+        queue.sendall(b'd')
+    assert queue.saturated_since is not None
+    # The writer takes 'b' and 'c' as soon as 'a' is out: no longer full.
+    sock.gate.set()
+    while queue.depth():
+        pass
+    assert queue.saturated_since is None
+    queue.close()
+
+
+def test_direct_send_never_waits_on_a_client_that_is_not_reading():
+    server_end, client_end = socket.socketpair()
+    # Fill the kernel buffer: the client never reads.
+    for size in (65536, 1024, 1):
+        try:
+            while True:
+                server_end.send(b'x' * size, socket.MSG_DONTWAIT)
+        except BlockingIOError:
+            pass
+    # As the server sets it for its reader.
+    server_end.settimeout(0.1)
+    queue = OutboundQueue(server_end)
+    start = time.perf_counter()
+    queue.sendall(b'snapshot')
+    assert time.perf_counter() - start < 0.05
+    # The kernel took none of it: it went to the writer thread instead.
+    assert queue.stats.totals()['frames_queued'] == 1
+    queue.close()
+    server_end.close()
+    client_end.close()
@@ -0,0 +1,34 @@
+import numpy as np
+
+from particles import ParticleSystem
+
+
+def test_update_moves_with_gravity_and_drops_dead_particles():
+    particles = ParticleSystem(seed=1)
+    particles.emit(100, 100, 5, (255, 0, 0), 1, speed=(0, 0))
+    particles.emit(200, 200, 3, (0, 255, 0), 3, speed=(1, 1), angle=(0, 0))
+    particles.update()
+    # The five one-frame particles at the front were replaced from the tail.
+    assert len(particles) == 3
+    assert np.allclose(particles.position[:3], (201, 200))
+    assert np.allclose(particles.velocity[:3], (1, 0.1))
+    assert particles.life[:3].tolist() == [2, 2, 2]
+    assert particles.colors[particles.color[0]] == (0, 255, 0)
+
+
+def test_swap_remove_keeps_every_live_particle():
+    particles = ParticleSystem(seed=2)
+    for life in (1, 5, 1, 5, 1, 5):
+        particles.emit(0, 0, 4, (255, 255, 255), life)
+    particles.life[:24] = np.arange(24) % 3
+    live = sorted(particles.size[:24][particles.life[:24] > 1].tolist())
+    particles.update()
+    assert len(particles) == len(live)
+    assert sorted(particles.size[:len(particles)].tolist()) == live
+
+
+def test_emits_past_capacity_are_dropped():
+    particles = ParticleSystem(capacity=10)
+    particles.emit(0, 0, 8, (1, 2, 3), 10)
+    particles.emit(0, 0, 8, (1, 2, 3), 10)
+    assert len(particles) == 10
@@ -0,0 +1,134 @@
+import asyncio
+import logging
+import socket
+import threading
+import time
+
+from bots import BotHarness
+from playerstore import PlayerStore
+from protocol import GamePacket, OpCode
+from server import GameServer
+
+
+def test_behaves_like_a_dict():
+    store = PlayerStore(stripes=4)
+    for player_id in range(10):
+        store[player_id] = {'health': 100}
+    assert len(store) == 10
+    assert 3 in store and 42 not in store
+    assert sorted(store) == list(range(10))
+    assert store.pop(3)['health'] == 100
+    assert store.get(3) is None
+    assert store.collect(lambda record: record['health'] if record['health'] else None) == \
+        {player_id: 100 for player_id in range(10) if player_id != 3}
+
+
+def test_strided_ids_still_use_every_stripe():
+    store = PlayerStore()
+    for worker_count in (4, 8, 16):
+        used = {store._stripe(player_id) for player_id in range(1, 64 * worker_count, worker_count)}
+        assert len(used) == len(store.stripes)
+
+
+def test_locked_updates_do_not_lose_writes():
+    store = PlayerStore(stripes=2)
+    store[1] = {'score': 0}
+
+    def add_points():
+        for _ in range(10000):
+            with store.locked(1) as record:
+                record['score'] += 1
+
+    threads = [threading.Thread(target=add_points) for _ in range(4)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    assert store[1]['score'] == 40000
+
+
+def test_iterating_while_players_come_and_go():
+    store = PlayerStore()
+    running = True
+    errors = []
+
+    def churn(offset):
+        player_id = offset
+        while running:
+            store[player_id] = {'x': 0}
+            store.pop(player_id - 4000, None)
+            player_id += 4
+
+    threads = [threading.Thread(target=churn, args=(offset,)) for offset in range(4)]
+    for thread in threads:
+        thread.start()
+    try:
+        for _ in range(50):
+            for _, record in store.items():
+                record['x'] += 1
+    except RuntimeError as e:
+        errors.append(e)
+    finally:
+        running = False
+        for thread in threads:
+            thread.join()
+    assert errors == []
+
+
+def test_bots_fighting_while_players_come_and_go(free_port, start_server, caplog):
+    caplog.set_level(logging.ERROR)
+    port = free_port
+    # One room big enough for every bot and churner, so all of them share a PlayerStore.
+    server = GameServer(port=port, max_room_size=32)
+    start_server(server)
+    churning = threading.Event()
+    churn_errors = []
+
+    def churn():
+        try:
+            while churning.is_set():
+                with socket.create_connection(('127.0.0.1', port)) as sock:
+                    sock.sendall(GamePacket(OpCode.JOIN, 0, {}).to_frame())
+                    sock.recv(4096)
+                    time.sleep(0.01)
+        except OSError as e:
+            churn_errors.append(e)
+
+    async def fight(harness):
+        try:
+            await harness.connect()
+            await asyncio.gather(*(harness.drive(bot, 2.0) for bot in harness.all_bots))
+            churning.clear()
+            # Let bullets still in flight land before comparing.
+            deadline = time.time() + 5
+            while any(room.bullets for room in server.rooms.rooms.values()) and time.time() < deadline:
+                await asyncio.sleep(0.05)
+            await asyncio.sleep(0.3)
+            assert not any(bot.closed for bot in harness.all_bots)
+            room = server.rooms.get('arena-1')
+            return {bot.player_id: room.players[bot.player_id] for bot in harness.all_bots}
+        finally:
+            for bot in harness.all_bots:
+                bot.close()
+
+    harness = BotHarness(port=port, bot_count=8, fire_rate=10.0)
+    churners = [threading.Thread(target=churn) for _ in range(2)]
+    churning.set()
+    for thread in churners:
+        thread.start()
+    try:
+        records = asyncio.run(fight(harness))
+    finally:
+        churning.clear()
+        for thread in churners:
+            thread.join()
+
+    assert churn_errors == []
+    assert [record.getMessage() for record in caplog.records] == []
+    assert harness.stats.join_errors == harness.stats.bad_frames == harness.stats.invalid_packets == 0
+    # Somebody got hit, and every hit and kill reached both the server's record and the bot.
+    assert any(record['health'] < 100 or record['deaths'] for record in records.values())
+    for bot in harness.all_bots:
+        record = records[bot.player_id]
+        assert record['health'] == bot.health
+        assert record['score'] == 100 * record['kills']
@@ -0,0 +1,78 @@
+import pytest
+
+from protocol import OpCode, GamePacket, FrameDecoder, FrameError, Codec, encode_frame, negotiate_codec
+
+
+def make_move(player_id, x, y):
+    return GamePacket(OpCode.MOVE, player_id, {'x': x, 'y': y, 'health': 100, 'direction': 'right'})
+
+
+def test_coalesced_frames_are_all_decoded():
+    stream = b''.join(make_move(i, i * 10, i * 5).to_frame() for i in range(1, 6))
+    frames = FrameDecoder().feed(stream)
+    packets = [GamePacket.from_json(frame) for frame in frames]
+    assert [p.sender_id for p in packets] == [1, 2, 3, 4, 5]
+    assert packets[2].data['x'] == 30
+
+
+def test_split_frame_waits_for_remainder():
+    frame = make_move(7, 1, 2).to_frame()
+    decoder = FrameDecoder()
+    assert decoder.feed(frame[:3]) == []
+    assert decoder.feed(frame[3:10]) == []
+    frames = decoder.feed(frame[10:])
+    assert GamePacket.from_json(frames[0]).sender_id == 7
+    assert decoder.pending() == 0
+
+
+def test_oversized_frame_is_rejected():
+    decoder = FrameDecoder(max_frame_size=16)
+    with pytest.raises(FrameError):
+        decoder.feed(encode_frame(b'x' * 17))
+
+
+def test_binary_move_round_trip():
+    packet = GamePacket.decode(make_move(3, 412.5, 96.25).to_binary())
+    assert packet.op_code == OpCode.MOVE
+    assert packet.sender_id == 3
+    assert packet.data == {'x': 412.5, 'y': 96.25, 'health': 100, 'direction': 'right'}
+
+
+def test_binary_falls_back_to_json_body():
+    packet = GamePacket(OpCode.DISCONNECT, 4, {'player_id': 4, 'reason': 'left the desert'})
+    decoded = GamePacket.decode(packet.to_binary())
+    assert decoded.op_code == OpCode.DISCONNECT
+    assert decoded.data == packet.data
+
+
+def test_binary_move_is_smaller_than_json():
+    packet = make_move(3, 412.5, 96.25)
+    assert len(packet.to_binary()) * 4 < len(packet.to_json())
+
+
+def test_negotiate_codec():
+    assert negotiate_codec([Codec.BINARY, Codec.JSON]) == Codec.BINARY
+    assert negotiate_codec([Codec.BINARY], [Codec.JSON]) == Codec.JSON
+    assert negotiate_codec(None) == Codec.JSON
+
+
+def test_snapshot_round_trip_with_absent_fields():
+    snapshot = {
+        'tick': 12,
+        'baseline': 10,
+        'players': [[1, 10.5, 20.0, 100, 'left', 7], [2, None, None, 90, None, None]],
+        'removed': [5, 6]
+    }
+    packet = GamePacket(OpCode.SNAPSHOT, 0, snapshot)
+    assert GamePacket.decode(packet.to_binary()).data == snapshot
+    assert GamePacket.decode(packet.to_json()).data == snapshot
+
+
+def test_trace_fields_round_trip_in_both_codecs():
+    for codec in (Codec.JSON, Codec.BINARY):
+        packet = GamePacket(OpCode.MOVE, 3, {'x': 1.0, 'y': 2.0, 'health': 100, 'direction': 'left'}, seq=7, ts=1234.5)
+        decoded = GamePacket.decode(packet.encode(codec))
+        assert (decoded.seq, decoded.ts) == (7, 1234.5)
+        assert decoded.data == packet.data
+        untraced = GamePacket.decode(GamePacket(OpCode.ACK, 3, {'tick': 9}).encode(codec))
+        assert (untraced.seq, untraced.ts) == (None, None)
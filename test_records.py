@@ -0,0 +1,21 @@
+import pytest
+
+from records import PlayerRecord, RemotePlayer
+
+
+def test_item_and_attribute_access_are_the_same_field():
+    player = PlayerRecord(x=10, username='Player_1')
+    player['health'] -= 30
+    player.x += 5
+    assert player.health == 70
+    assert player['x'] == 15
+    assert player.get('missing', 'n/a') == 'n/a'
+    assert 'score' in player and 'missing' not in player
+    assert not hasattr(player, '__dict__')
+
+
+def test_unknown_fields_are_rejected():
+    with pytest.raises(TypeError):
+        RemotePlayer(z=1)
+    with pytest.raises(AttributeError):
+        RemotePlayer()['z'] = 1
@@ -0,0 +1,120 @@
+import pytest
+
+from protocol import GamePacket
+from room import RoomManager, RoomFullError
+
+
+def test_matchmaking_fills_rooms_before_opening_new_ones(make_player):
+    rooms = RoomManager(max_players=2)
+    joined = [rooms.join(player_id, make_player()).room_id for player_id in range(1, 6)]
+    assert joined == ['arena-1', 'arena-1', 'arena-2', 'arena-2', 'arena-3']
+
+
+def test_named_room_is_capped(make_player):
+    rooms = RoomManager(max_players=1)
+    rooms.join(1, make_player(), 'vip')
+    with pytest.raises(RoomFullError):
+        rooms.join(2, make_player(), 'vip')
+
+
+def test_broadcast_stays_inside_the_room(make_player):
+    rooms = RoomManager()
+    players = {player_id: make_player() for player_id in range(1, 4)}
+    rooms.join(1, players[1], 'a')
+    rooms.join(2, players[2], 'a')
+    rooms.join(3, players[3], 'b')
+    rooms.get('a').handle_attack(1, {'x': 1.0, 'y': 2.0, 'dx': 1.0, 'dy': 0.0})
+    assert len(players[1]['socket'].sent) == 1
+    assert len(players[2]['socket'].sent) == 1
+    assert players[3]['socket'].sent == []
+
+
+def test_welcome_is_sent_before_the_player_is_in_the_room(make_player):
+    rooms = RoomManager()
+    seen = []
+    room = rooms.join(1, make_player(), 'a', welcome=lambda room: seen.append(1 in room.players))
+    assert seen == [False] and 1 in room.players
+
+
+def test_empty_rooms_are_closed(make_player):
+    rooms = RoomManager()
+    rooms.join(1, make_player(), 'a')
+    rooms.leave(1, 'a')
+    assert rooms.get('a') is None
+
+
+@pytest.fixture
+def arena(make_player):
+    rooms = RoomManager()
+    shooter, target = make_player(), make_player()
+    target.update({'x': 200, 'y': 100, 'deaths': 0})
+    shooter.update({'kills': 0, 'score': 0})
+    rooms.join(1, shooter, 'a')
+    rooms.join(2, target, 'a')
+    return rooms.get('a'), shooter, target
+
+
+def test_server_resolves_bullet_hits(arena):
+    room, shooter, target = arena
+    room.handle_attack(1, {'x': 130.0, 'y': 100.0, 'dx': 1.0, 'dy': 0.0})
+    for _ in range(5):
+        room.tick(1 / 30)
+    assert target['health'] == 90
+    assert room.bullets == []
+
+
+def test_shots_are_rewound_to_the_shooters_tick(arena):
+    room, shooter, target = arena
+    # Close enough that the bullet arrives before the rewound ticks run out.
+    shooter.update({'x': 150})
+    room.tick(1 / 30)
+    seen_tick = room.tick_count
+    target.update({'y': 400})
+    room.tick(1 / 30)
+    missed = {'dx': 1.0, 'dy': 0.0}
+    room.handle_attack(1, missed)
+    room.handle_attack(1, dict(missed, tick=seen_tick))
+    for _ in range(5):
+        room.tick(1 / 30)
+    assert target['health'] == 90
+
+
+def test_moves_cannot_leave_the_arena_or_outrun_inputs(arena):
+    room, shooter, target = arena
+    target.update({'y': 55})
+    room.handle_move(2, {'x': 200, 'y': 40})
+    assert (target.x, target.y) == (200, 50)
+    # A jump across the arena only gets as far as one capped input: 20 px.
+    room.handle_move(2, {'x': 700, 'y': 50})
+    assert (target.x, target.y) == (220, 50)
+
+
+def test_inputs_are_validated_and_acknowledged_in_snapshots(arena):
+    room, shooter, target = arena
+    for seq in range(1, 21):
+        room.handle_input(2, {'seq': seq, 'move_x': 1, 'move_y': 0, 'dt_ms': 100, 'direction': 'left'})
+    room.handle_input(2, {'seq': 5, 'move_x': -1, 'move_y': 0, 'dt_ms': 100, 'direction': 'left'})
+    # Twenty 100 ms inputs at once only get the 0.5 s of slack: 100 px.
+    assert (target.x, target.y, target.input_seq) == (300, 100, 20)
+    room.tick(1 / 30)
+    snapshot = GamePacket.decode(target.socket.sent[-1][4:])
+    assert snapshot.data['players'][-1] == [2, 300.0, 100.0, 100, 'left', 20]
+
+
+def test_bullets_start_at_the_shooter_not_where_the_client_says(arena):
+    room, shooter, target = arena
+    # Claims to fire from right above the target; really stands at (100, 100).
+    room.handle_attack(1, {'x': 200.0, 'y': 80.0, 'dx': 0.0, 'dy': 1.0})
+    bullet = GamePacket.decode(target.socket.sent[-1][4:])
+    assert (bullet.data['x'], bullet.data['y']) == pytest.approx((100, 120))
+    for _ in range(5):
+        room.tick(1 / 30)
+    assert target['health'] == 100
+
+
+def test_full_snapshot_sizes_are_only_measured_with_metrics(arena):
+    room, shooter, target = arena
+    room.tick(1 / 30)
+    totals = room.stats.totals()
+    # Both players share one full-snapshot frame, and nothing else is encoded.
+    assert (totals['serializations'], totals['sends'], totals['snapshot_bytes_full']) == (1, 2, 0)
@@ -0,0 +1,74 @@
+import json
+import socket
+import threading
+import time
+
+from protocol import FrameDecoder, GamePacket, OpCode
+from room import RoomManager
+from router import FrontDoor, HashRing
+
+
+def test_ring_is_deterministic_and_uses_every_worker():
+    rooms = [f'room-{i}' for i in range(400)]
+    owners = [HashRing(4).lookup(room) for room in rooms]
+    assert owners == [HashRing(4).lookup(room) for room in rooms]
+    assert set(owners) == {0, 1, 2, 3}
+
+
+def test_adding_a_worker_only_moves_some_rooms():
+    rooms = [f'room-{i}' for i in range(1000)]
+    before, after = HashRing(4), HashRing(5)
+    moved = sum(before.lookup(room) != after.lookup(room) for room in rooms)
+    assert moved < len(rooms) / 2
+    assert all(after.lookup(room) == 4 for room in rooms if before.lookup(room) != after.lookup(room))
+
+
+def test_matchmaking_only_opens_rooms_the_worker_owns(make_player):
+    ring = HashRing(3)
+    rooms = RoomManager(max_players=1, owns_room=lambda room_id: ring.lookup(room_id) == 2)
+    opened = [rooms.join(player_id, make_player()).room_id for player_id in range(1, 6)]
+    assert len(set(opened)) == 5
+    assert all(ring.lookup(room_id) == 2 for room_id in opened)
+
+
+def test_matchmaking_players_fill_one_worker_before_moving_on():
+    front_door = FrontDoor(workers=4, max_room_size=8)
+    workers = [front_door.pick_worker({}) for _ in range(64)]
+    batches = [workers[i:i + 8] for i in range(0, 64, 8)]
+    assert all(len(set(batch)) == 1 for batch in batches)
+    assert len({batch[0] for batch in batches}) > 1
+
+
+def test_front_door_hands_the_connection_to_a_worker(tmp_path, monkeypatch, free_port):
+    monkeypatch.chdir(tmp_path)
+    port = free_port
+    front_door = FrontDoor(port=port, workers=1)
+    router = threading.Thread(target=front_door.run, daemon=True)
+    router.start()
+    deadline = time.time() + 5
+    while True:
+        try:
+            client = socket.create_connection(('127.0.0.1', port), timeout=5)
+            break
+        except OSError:
+            assert time.time() < deadline
+            time.sleep(0.05)
+    try:
+        client.sendall(GamePacket(OpCode.JOIN, 0, {'codecs': ['json'], 'room_id': 'saloon'}).to_frame())
+        decoder = FrameDecoder()
+        frames = []
+        while not frames:
+            frames = decoder.recv_frames(client)
+        reply = json.loads(frames[0])
+    finally:
+        client.close()
+        front_door.running = False
+        # Wake the accept loop so it shuts the workers down.
+        socket.create_connection(('127.0.0.1', port)).close()
+        router.join(5)
+
+    # The front door never answers a JOIN: only the worker that adopted the
+    # socket (ids start at 1 for worker 0) could have sent this.
+    assert reply['op_code'] == OpCode.JOIN
+    assert reply['data']['assigned_id'] == 1 and reply['data']['room_id'] == 'saloon'
+    assert not any(process.is_alive() for process in front_door.processes)
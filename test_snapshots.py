@@ -0,0 +1,19 @@
+from snapshots import SnapshotHistory, build_snapshot_packet, apply_snapshot
+
+
+def test_delta_only_carries_changed_fields():
+    baseline = {1: (100.0, 200.0, 100, 'right'), 2: (300.0, 300.0, 100, 'left')}
+    current = {1: (104.0, 200.0, 100, 'right'), 3: (500.0, 100.0, 100, 'right')}
+    packet = build_snapshot_packet(8, current, 5, baseline)
+    assert packet.data['baseline'] == 5
+    assert packet.data['players'] == [[1, 104.0, None, None, None], [3, 500.0, 100.0, 100, 'right']]
+    assert packet.data['removed'] == [2]
+    assert apply_snapshot(baseline, packet.data) == current
+
+
+def test_history_forgets_overwritten_ticks():
+    history = SnapshotHistory(size=4)
+    for tick in range(1, 7):
+        history.add(tick, {tick: (0.0, 0.0, 100, 'right')})
+    assert history.get(2) is None
+    assert history.get(6) == {6: (0.0, 0.0, 100, 'right')}
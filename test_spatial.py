@@ -0,0 +1,26 @@
+import random
+
+from spatial import SpatialHash
+
+
+def test_query_radius_matches_brute_force():
+    rng = random.Random(3)
+    grid = SpatialHash(cell_size=40)
+    points = {key: (rng.uniform(-100, 900), rng.uniform(-100, 700)) for key in range(300)}
+    for key, (x, y) in points.items():
+        grid.insert(key, x, y)
+    for _ in range(200):
+        x, y, radius = rng.uniform(0, 800), rng.uniform(0, 600), rng.uniform(1, 120)
+        expected = {key for key, (px, py) in points.items() if (px - x) ** 2 + (py - y) ** 2 < radius ** 2}
+        assert set(grid.query_radius(x, y, radius)) == expected
+
+
+def test_move_and_remove_update_cells():
+    grid = SpatialHash(cell_size=50)
+    grid.insert('a', 10, 10)
+    grid.move('a', 510, 510)
+    assert grid.query_radius(10, 10, 5) == []
+    assert grid.query_radius(505, 505, 10) == ['a']
+    grid.remove('a')
+    grid.remove('a')
+    assert len(grid) == 0 and grid.cells == {}
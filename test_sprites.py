@@ -0,0 +1,25 @@
+import pygame
+
+from sprites import SpriteCache
+
+COLORS = {'body': (255, 100, 100), 'hat': (100, 200, 100), 'gun': (150, 150, 150)}
+
+
+def make_cache():
+    pygame.font.init()
+    return SpriteCache(pygame.font.Font(None, 18))
+
+
+def test_sprites_are_built_once_per_key():
+    sprites = make_cache()
+    right = sprites.player(COLORS, 'right')
+    assert sprites.player(COLORS, 'right') is right
+    assert sprites.player(COLORS, 'left') is not right
+    assert sprites.player(COLORS, 'right', flashing=True) is not right
+    assert sprites.label("YOU", (255, 255, 255)) is sprites.label("YOU", (255, 255, 255))
+
+
+def test_bullets_share_a_sprite_per_heading():
+    sprites = make_cache()
+    assert sprites.bullet(1.0, 0.0) is sprites.bullet(0.9999, 0.001)
+    assert sprites.bullet(1.0, 0.0) is not sprites.bullet(0.0, 1.0)
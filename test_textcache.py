@@ -0,0 +1,32 @@
+import pygame
+
+from textcache import TextCache
+
+
+def make_font():
+    pygame.font.init()
+    return pygame.font.Font(None, 18)
+
+
+def test_repeated_text_is_rendered_once():
+    font = make_font()
+    text = TextCache()
+    hp = text.render(font, "HP: 100/100", (255, 255, 255))
+    assert text.render(font, "HP: 100/100", (255, 255, 255)) is hp
+    assert text.render(font, "HP: 100/100", (255, 0, 0)) is not hp
+    assert text.render(make_font(), "HP: 100/100", (255, 255, 255)) is not hp
+    assert (text.hits, text.misses) == (1, 3)
+    assert text.hit_rate() == 0.25
+
+
+def test_least_recently_used_text_is_evicted():
+    font = make_font()
+    text = TextCache(capacity=2)
+    ready = text.render(font, "READY", (255, 255, 200))
+    text.render(font, "RELOADING", (255, 255, 200))
+    text.render(font, "READY", (255, 255, 200))
+    text.render(font, "BOUNTY: $100", (50, 30, 10))
+    assert len(text) == 2
+    assert text.render(font, "READY", (255, 255, 200)) is ready
+    text.render(font, "RELOADING", (255, 255, 200))
+    assert text.misses == 4
@@ -0,0 +1,42 @@
+from collections import OrderedDict
+
+# Rendered strings kept at once. A frame shows a few dozen; the rest of the
+# room is for scores, HP and debug lines that come back after changing.
+DEFAULT_CAPACITY = 512
+
+
+class TextCache:
+    """Rendered text surfaces keyed by (font, text, color, antialias).
+
+    The client renders the same HUD strings, name labels and debug lines
+    every frame, so each one is rasterized once and the surface reused
+    until it falls out of the least-recently-used end. ``hits`` and
+    ``misses`` count lookups; a steady frame should only add hits. Rendering
+    happens on the main loop only, so there is no lock.
+    """
+
+    def __init__(self, capacity=DEFAULT_CAPACITY):
+        self.capacity = capacity
+        self.surfaces = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+
+    def __len__(self):
+        return len(self.surfaces)
+
+    def render(self, font, text, color, antialias=True):
+        key = (font, text, color, antialias)
+        surface = self.surfaces.get(key)
+        if surface is not None:
+            self.hits += 1
+            self.surfaces.move_to_end(key)
+            return surface
+        self.misses += 1
+        surface = self.surfaces[key] = font.render(text, antialias, color)
+        if len(self.surfaces) > self.capacity:
+            self.surfaces.popitem(last=False)
+        return surface
+
+    def hit_rate(self):
+        lookups = self.hits + self.misses
+        return self.hits / lookups if lookups else 0.0